@@ -3,26 +3,255 @@
 真正的通用Agent框架 - 简化版
 支持Skills和MCP工具的通用Agent基类
 使用更简单、更可靠的实现方式
+
+大模型客户端在第一次调用时才创建（见 get_llm），导入本模块不会加载 langchain_openai / openai，
+命令行入口的 --help 和启动开销因此保持在可控范围内。
+
+提示词布局：固定的角色说明、工具说明和输出要求放在系统消息中（每个提示词只编译一次），
+变化的需求和数据放在用户消息中，同一专家每次请求的前缀逐字节一致，便于服务端前缀缓存命中。
 """
 import os
-import json
+import time
 import asyncio
+import hashlib
+import functools
+import contextlib
+import contextvars
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from llm_client import create_chat_model
+from llm_dispatcher import get_dispatcher, estimate_tokens
+from response_cache import ResponseCache
+from tool_matcher import ToolMatcher, get_batch_tool
+from hedging import HedgedCaller, waiting_for_slot
+from telemetry import span, current_span, record_usage, get_tracer, cached_tokens_of
+from structured_output import parse_json_object, json_schema_format, JSON_OBJECT_FORMAT, TASK_PLAN_SCHEMA
 
 load_dotenv()
 
-ark_api_key = os.getenv("ARK_API_KEY").strip()
-ark_base_url = os.getenv("ARK_BASE_URL").strip()
-ark_chat_model = os.getenv("ARK_CHAT_MODEL").strip()
+ark_api_key = (os.getenv("ARK_API_KEY") or "").strip()
+ark_base_url = (os.getenv("ARK_BASE_URL") or "").strip()
+ark_chat_model = (os.getenv("ARK_CHAT_MODEL") or "").strip()
+
+_llm = None
+
+
+def get_llm():
+    """
+    获取框架使用的大模型，第一次调用时才创建客户端
+    通过 agent_framework.llm = ... 替换过的模型（如测试中的假模型）优先
+    
+    Returns:
+        ChatOpenAI 实例或替换后的模型
+    """
+    global _llm
+    override = globals().get("llm")
+    if override is not None:
+        return override
+    if _llm is None:
+        _llm = create_chat_model(
+            model=ark_chat_model,
+            api_key=ark_api_key,
+            base_url=ark_base_url,
+            temperature=0.7
+        )
+    return _llm
+
+
+# 服务端前缀缓存：设置 LLM_PROMPT_CACHE_KEY 后，请求按系统提示词附带 prompt_cache_key（通过 extra_body 透传），
+# 相同前缀的请求路由到同一缓存；命中的Token数从 usage_metadata.input_token_details.cache_read 记录到 telemetry
+prompt_cache_namespace = (os.getenv("LLM_PROMPT_CACHE_KEY") or "").strip()
+
+_system_messages = {}
+
+
+def compile_system_message(text):
+    """
+    把系统提示词编译为 SystemMessage，内容相同的提示词在进程内共用同一个消息对象
+    
+    Args:
+        text: 系统提示词
+        
+    Returns:
+        SystemMessage
+    """
+    message = _system_messages.get(text)
+    if message is None:
+        from langchain_core.messages import SystemMessage
+        message = _system_messages.setdefault(text, SystemMessage(content=text))
+    return message
+
+
+@functools.lru_cache(maxsize=256)
+def _prefix_digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _bind_prompt_cache(model, messages):
+    """开启前缀缓存且第一条是系统消息时，按系统提示词绑定 prompt_cache_key"""
+    if not prompt_cache_namespace or isinstance(messages, str) or not messages:
+        return model
+    first = messages[0]
+    if getattr(first, "type", None) != "system":
+        return model
+    return model.bind(extra_body={"prompt_cache_key": f"{prompt_cache_namespace}-{_prefix_digest(first.content)}"})
+
+
+def __getattr__(name):
+    # 兼容原来的模块属性 agent_framework.llm，访问时才创建客户端
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 响应缓存默认关闭，通过 enable_response_cache() 或环境变量 AGENT_RESPONSE_CACHE 开启
+response_cache = None
+
+
+def enable_response_cache(path=".cache/llm_responses.sqlite3", ttl=None, max_entries=None, max_bytes=None):
+    """
+    开启全局大模型响应缓存
+    相同模型、温度和消息列表的调用直接返回缓存结果
+    
+    Args:
+        path: SQLite 数据库文件路径
+        ttl: 过期秒数，None 表示永不过期
+        max_entries: 最大缓存条数
+        max_bytes: 最大缓存字节数
+        
+    Returns:
+        ResponseCache实例，可通过 stats() 查看命中情况
+    """
+    global response_cache
+    response_cache = ResponseCache(path=path, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    return response_cache
+
+
+if os.getenv("AGENT_RESPONSE_CACHE"):
+    enable_response_cache(os.getenv("AGENT_RESPONSE_CACHE").strip())
+
+
+# 大模型调用的调度上下文：编排器在运行和派发任务时设置，包含 dispatcher、priority，
+# 以及收集本任务各次调用排队时间的 queue_waits；未设置时使用进程级调度器、默认优先级
+_dispatch_context = contextvars.ContextVar("llm_dispatch_context", default=None)
+
+
+@contextlib.contextmanager
+def dispatch_context(**values):
+    """在当前上下文中覆盖调度参数（dispatcher、priority、queue_waits），退出时恢复"""
+    token = _dispatch_context.set({**(_dispatch_context.get() or {}), **values})
+    try:
+        yield
+    finally:
+        _dispatch_context.reset(token)
+
+
+def _estimate_message_tokens(messages):
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(
+        estimate_tokens(message.content) for message in messages
+        if isinstance(getattr(message, "content", None), str)
+    )
+
+
+@contextlib.asynccontextmanager
+async def _llm_slot(model_name, messages):
+    """
+    经调度器占用一个模型调用槽位，所有大模型调用（专家、协调员、充分性评审、汇总）都经过这里，
+    共同受每个模型的并发上限和请求数/Token限流约束；对冲调用的超时和对冲等待从拿到槽位后开始计时
+
+    Yields:
+        排队等待秒数
+    """
+    context = _dispatch_context.get() or {}
+    dispatcher = context.get("dispatcher") or get_dispatcher()
+    async with contextlib.AsyncExitStack() as stack:
+        # 排队时间不计入对冲调用的超时和耗时统计
+        with waiting_for_slot():
+            queue_wait = await stack.enter_async_context(dispatcher.slot(
+                priority=context.get("priority", 1),
+                model=model_name,
+                estimated_tokens=_estimate_message_tokens(messages)
+            ))
+        if context.get("queue_waits") is not None:
+            context["queue_waits"].append(queue_wait)
+        yield queue_wait
+
 
-llm = ChatOpenAI(
-    model=ark_chat_model,
-    api_key=ark_api_key,
-    base_url=ark_base_url,
-    temperature=0.7
-)
+async def _acall_llm(messages, cache=None, response_format=None):
+    """
+    调用大模型，开启缓存时先查缓存
+    
+    Args:
+        messages: 消息列表或提示词字符串
+        cache: ResponseCache实例，None 表示使用全局缓存
+        response_format: 结构化输出格式（OpenAI 兼容的 response_format），None 表示普通文本
+        
+    Returns:
+        模型输出文本
+    """
+    cache = cache if cache is not None else response_cache
+    
+    cache_key = None
+    llm = get_llm()
+    model_name = getattr(llm, "model_name", ark_chat_model)
+    with span("llm", model=model_name) as llm_span:
+        if cache is not None:
+            cache_key = cache.make_key(model_name, getattr(llm, "temperature", None), messages, extra=response_format)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                llm_span.set(cached=True)
+                return cached
+        
+        model = llm.bind(response_format=response_format) if response_format else llm
+        model = _bind_prompt_cache(model, messages)
+        
+        async with _llm_slot(model_name, messages) as queue_wait:
+            llm_span.set(queue_wait=round(queue_wait, 4))
+            start = time.monotonic()
+            result = await model.ainvoke(messages)
+        record_usage(result)
+        
+        if cache is not None:
+            cache.put(cache_key, result.content, model=model_name, latency=time.monotonic() - start)
+        
+        return result.content
+
+
+async def _astream_llm(messages, cache=None):
+    """
+    流式调用大模型，逐段产出文本
+    命中缓存时一次性产出完整结果，未命中时在流结束后写入缓存
+    
+    Args:
+        messages: 消息列表或提示词字符串
+        cache: ResponseCache实例，None 表示使用全局缓存
+        
+    Yields:
+        模型输出的文本片段
+    """
+    cache = cache if cache is not None else response_cache
+    
+    cache_key = None
+    llm = get_llm()
+    model_name = getattr(llm, "model_name", ark_chat_model)
+    if cache is not None:
+        cache_key = cache.make_key(model_name, getattr(llm, "temperature", None), messages)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    chunks = []
+    async with _llm_slot(model_name, messages):
+        start = time.monotonic()
+        async for chunk in _bind_prompt_cache(llm, messages).astream(messages):
+            record_usage(chunk)
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+    
+    if cache is not None:
+        cache.put(cache_key, "".join(chunks), model=model_name, latency=time.monotonic() - start)
 
 
 class BaseAgent:
@@ -31,11 +260,25 @@ class BaseAgent:
     支持Skills和MCP工具的通用Agent
     """
     
-    def __init__(self, name, role, system_prompt, tools=None):
+    def __init__(self, name, role, system_prompt, tools=None, cache=None, tool_calling=False, max_tool_turns=3):
+        """
+        Args:
+            name: Agent名称
+            role: Agent角色
+            system_prompt: 系统提示词
+            tools: 可用工具列表
+            cache: 响应缓存，None 表示使用全局缓存
+            tool_calling: 是否把工具绑定到模型，由模型通过函数调用自行请求工具
+            max_tool_turns: 函数调用模式下最多允许的工具调用轮数
+        """
         self.name = name
         self.role = role
         self.system_prompt = system_prompt
         self.tools = tools or []
+        self.cache = cache
+        self.tool_calling = tool_calling and bool(self.tools)
+        self.max_tool_turns = max_tool_turns
+        self._tool_matcher = None
         self._build_prompt()
     
     def _build_prompt(self):
@@ -53,48 +296,121 @@ class BaseAgent:
         tool_names = [t.name for t in self.tools]
         print(f"【初始化】{self.role}({self.name}) 构建完成，可用工具: {tool_names}")
     
-    def _call_tools(self, text):
-        """
-        简单的工具调用逻辑
-        分析文本，看是否需要调用工具
+    def _get_tool_matcher(self):
+        """获取编译好的工具触发词匹配器，触发词表变化后自动重新编译"""
+        if self._tool_matcher is None or self._tool_matcher.stale:
+            self._tool_matcher = ToolMatcher(self.tools)
+        return self._tool_matcher
+    
+    async def _call_tools(self, text):
         """
-        results = []
+        工具调用逻辑
+        用各工具声明的触发词扫描文本，命中的触发词按工具分组：声明了批量版本的工具一次调用批量版本，
+        其余逐个调用，所有调用并发执行
         
+        Returns:
+            工具返回结果列表，顺序与工具顺序一致
+        """
         if not self.tools:
-            return results
+            return []
         
-        for tool in self.tools:
-            tool_name = tool.name
-            
-            if tool_name == "search_market_info":
-                industries = ["AI行业", "新能源汽车", "智能家居"]
-                for industry in industries:
-                    if industry in text:
-                        result = tool.invoke(industry)
-                        results.append(result)
+        matches = self._get_tool_matcher().match(text)
+        if not matches:
+            return []
+        
+        grouped = {}
+        for tool, keyword in matches:
+            grouped.setdefault(tool.name, (tool, []))[1].append(keyword)
+        
+        async def call(tool, keywords):
+            batch_tool = get_batch_tool(tool)
+            if batch_tool is None:
+                return await asyncio.gather(*[tool.ainvoke(keyword) for keyword in keywords])
+            return await batch_tool.ainvoke({next(iter(batch_tool.args)): keywords})
+        
+        results = await asyncio.gather(*[call(tool, keywords) for tool, keywords in grouped.values()])
+        return [result for group in results for result in group]
+    
+    async def _prepare_messages(self, input_text):
+        """调用工具获取参考数据，构建发送给大模型的消息列表；各工具的查询在 _call_tools 中并发执行"""
+        from langchain_core.messages import HumanMessage
+        tool_results = await self._call_tools(input_text)
+        system_message = compile_system_message(self.system_prompt_full)
+        
+        augmented_input = input_text
+        if tool_results:
+            augmented_input = input_text + "\n\n参考数据：\n" + "\n".join(tool_results)
+        
+        return [system_message, HumanMessage(content=augmented_input)]
+    
+    async def _run_tool_call(self, tools_by_name, tool_call):
+        """执行模型请求的单个工具调用，返回 ToolMessage"""
+        from langchain_core.messages import ToolMessage
+        
+        tool = tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return ToolMessage(content=f"工具 {tool_call['name']} 不存在", tool_call_id=tool_call["id"])
+        
+        try:
+            return await tool.ainvoke(tool_call)
+        except Exception as e:
+            return ToolMessage(content=f"工具 {tool_call['name']} 调用失败: {e}", tool_call_id=tool_call["id"])
+    
+    async def _run_tool_loop(self, input_text):
+        """
+        函数调用模式：工具绑定到模型，模型请求的工具并行执行后把结果回传，
+        直到模型不再请求工具或达到 max_tool_turns；最后一轮禁止继续调用工具
+        
+        Returns:
+            (最终输出, 每轮统计列表)
+        """
+        from langchain_core.messages import HumanMessage
+        
+        tools_by_name = {tool.name: tool for tool in self.tools}
+        messages = [
+            compile_system_message(self.system_prompt_full),
+            HumanMessage(content=input_text)
+        ]
+        turns = []
+        llm = get_llm()
+        
+        for turn in range(1, self.max_tool_turns + 2):
+            if turn <= self.max_tool_turns:
+                model = llm.bind_tools(self.tools)
+            else:
+                model = llm.bind_tools(self.tools, tool_choice="none")
+            model = _bind_prompt_cache(model, messages)
             
-            elif tool_name == "search_competitor_info":
-                companies = ["OpenAI", "比亚迪", "特斯拉"]
-                for company in companies:
-                    if company in text:
-                        result = tool.invoke(company)
-                        results.append(result)
+            async with _llm_slot(getattr(llm, "model_name", ark_chat_model), messages):
+                start = time.monotonic()
+                response = await model.ainvoke(messages)
+            record_usage(response)
+            usage = getattr(response, "usage_metadata", None) or {}
+            stats = {
+                "turn": turn,
+                "llm_latency": round(time.monotonic() - start, 3),
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cached_tokens": cached_tokens_of(usage),
+                "tool_calls": [call["name"] for call in response.tool_calls],
+                "tool_latency": 0.0
+            }
+            turns.append(stats)
+            messages.append(response)
             
-            elif tool_name == "search_technical_info":
-                topics = ["大模型技术", "自动驾驶技术"]
-                for topic in topics:
-                    if topic in text:
-                        result = tool.invoke(topic)
-                        results.append(result)
+            if not response.tool_calls:
+                break
             
-            elif tool_name == "search_financial_info":
-                topics = ["估值模型", "投资风险"]
-                for topic in topics:
-                    if topic in text:
-                        result = tool.invoke(topic)
-                        results.append(result)
+            print(f"【{self.role}】第 {turn} 轮请求工具: {stats['tool_calls']}")
+            start = time.monotonic()
+            tool_messages = await asyncio.gather(*[
+                self._run_tool_call(tools_by_name, call)
+                for call in response.tool_calls
+            ])
+            stats["tool_latency"] = round(time.monotonic() - start, 3)
+            messages.extend(tool_messages)
         
-        return results
+        return response.content, turns
     
     async def ainvoke(self, input_text):
         """
@@ -104,26 +420,45 @@ class BaseAgent:
             input_text: 输入文本
             
         Returns:
-            Agent执行结果
+            Agent执行结果，函数调用模式下 tool_turns 为每轮的Token与耗时统计
         """
         print(f"\n【{self.role}】接收任务: {input_text[:50]}...")
         
-        tool_results = self._call_tools(input_text)
+        if self.tool_calling:
+            output, turns = await self._run_tool_loop(input_text)
+            print(f"【{self.role}】任务完成")
+            return {"output": output, "tool_turns": turns}
         
-        augmented_input = input_text
-        if tool_results:
-            augmented_input = input_text + "\n\n参考数据：\n" + "\n".join(tool_results)
+        messages = await self._prepare_messages(input_text)
         
-        from langchain_core.messages import SystemMessage, HumanMessage
-        messages = [
-            SystemMessage(content=self.system_prompt_full),
-            HumanMessage(content=augmented_input)
-        ]
+        output = await _acall_llm(messages, self.cache)
         
-        result = await llm.ainvoke(messages)
+        print(f"【{self.role}】任务完成")
+        return {"output": output}
+    
+    async def astream(self, input_text):
+        """
+        流式调用Agent，模型每生成一段文本就立即产出
+        
+        Args:
+            input_text: 输入文本
+            
+        Yields:
+            模型输出的文本片段
+        """
+        if self.tool_calling:
+            # 工具调用轮次需要完整响应才能执行，函数调用模式下一次性产出最终结果
+            yield (await self.ainvoke(input_text))["output"]
+            return
+        
+        print(f"\n【{self.role}】接收任务: {input_text[:50]}...")
+        
+        messages = await self._prepare_messages(input_text)
+        
+        async for chunk in _astream_llm(messages, self.cache):
+            yield chunk
         
         print(f"【{self.role}】任务完成")
-        return {"output": result.content}
     
     def invoke(self, input_text):
         """
@@ -144,12 +479,13 @@ class AgentConfig:
     用于通过配置实例化不同的专家Agent
     """
     
-    def __init__(self, name, role, system_prompt, tools=None, description=""):
+    def __init__(self, name, role, system_prompt, tools=None, description="", tool_calling=False):
         self.name = name
         self.role = role
         self.system_prompt = system_prompt
         self.tools = tools or []
         self.description = description
+        self.tool_calling = tool_calling
     
     def create_agent(self):
         """
@@ -162,17 +498,37 @@ class AgentConfig:
             name=self.name,
             role=self.role,
             system_prompt=self.system_prompt,
-            tools=self.tools
+            tools=self.tools,
+            tool_calling=self.tool_calling
         )
 
 
+def _is_unsupported_parameter(error):
+    """
+    接口以 400 拒绝结构化输出参数本身（如不支持 response_format / json_schema）时返回 True
+    上下文超长、内容审核等其他 400 与输出格式无关，返回 False，不据此降级
+    """
+    import openai
+    if not isinstance(error, openai.BadRequestError):
+        return False
+    if error.param and "response_format" in str(error.param):
+        return True
+    text = " ".join(str(part) for part in (error.code, error.message) if part).lower()
+    return any(name in text for name in ("response_format", "json_schema", "json_object"))
+
+
 class TaskAssignment:
-    """任务分配类"""
+    """
+    任务分配类
+    depends_on 为必须先完成的上游任务 task_id 列表，上游输出会传给本任务
+    """
     
-    def __init__(self, agent_name, task_description, priority=1):
+    def __init__(self, agent_name, task_description, priority=1, task_id=None, depends_on=None):
         self.agent_name = agent_name
         self.task_description = task_description
         self.priority = priority
+        self.task_id = task_id
+        self.depends_on = list(depends_on or [])
 
 
 class CoordinatorAgent(BaseAgent):
@@ -181,8 +537,22 @@ class CoordinatorAgent(BaseAgent):
     通过大模型分析需求、分解任务、指派给专家
     """
     
-    def __init__(self, available_agents, name="coordinator", role="协调员"):
+    def __init__(self, available_agents, name="coordinator", role="协调员", structured_output=True):
+        """
+        Args:
+            available_agents: 可指派的专家Agent配置字典
+            name: Agent名称
+            role: Agent角色
+            structured_output: 优先使用模型的 JSON Schema / JSON 模式输出任务计划，
+                               接口不支持时自动降级为普通文本 + 本地容错解析
+        """
         self.available_agents = available_agents
+        self.structured_output = structured_output
+        # 依次尝试的 response_format，接口以 400 拒绝的格式会被移除，不再重复尝试
+        self._response_formats = [
+            json_schema_format("task_plan", TASK_PLAN_SCHEMA),
+            JSON_OBJECT_FORMAT
+        ] if structured_output else []
         
         system_prompt = self._build_coordinator_prompt()
         
@@ -193,6 +563,32 @@ class CoordinatorAgent(BaseAgent):
             tools=[]
         )
     
+    async def _request_plan(self, input_text):
+        """
+        请求任务分配计划
+        按顺序尝试结构化输出格式，全部不可用时退回普通调用
+        
+        Returns:
+            模型输出文本
+        """
+        messages = await self._prepare_messages(input_text)
+        
+        # 不支持 bind 的模型（如自定义封装）无法传入 response_format，直接普通调用
+        formats = list(self._response_formats) if hasattr(get_llm(), "bind") else []
+        for response_format in formats:
+            try:
+                return await _acall_llm(messages, self.cache, response_format=response_format)
+            except Exception as e:
+                if not _is_unsupported_parameter(e):
+                    # 超时、限流、5xx 等临时错误不代表接口不支持该格式，不降级
+                    raise
+                print(f"【协调员】结构化输出 {response_format['type']} 不可用，降级: {e}")
+                # 多个请求共用协调员时可能已被其他请求移除，按值删除
+                if response_format in self._response_formats:
+                    self._response_formats.remove(response_format)
+        
+        return await _acall_llm(messages, self.cache)
+    
     def _build_coordinator_prompt(self):
         """构建协调员系统提示词"""
         agents_description = "\n".join([
@@ -203,9 +599,11 @@ class CoordinatorAgent(BaseAgent):
         json_template = '''{
     "task_assignments": [
         {
+            "task_id": "t1",
             "agent_name": "agent_name",
             "task_description": "详细的任务描述",
-            "priority": 1
+            "priority": 1,
+            "depends_on": []
         }
     ],
     "explanation": "简要解释任务分配的理由"
@@ -227,6 +625,8 @@ class CoordinatorAgent(BaseAgent):
 - 只返回JSON，不要返回其他内容
 - priority数字越小优先级越高
 - 可以同时指派多个Agent并行执行
+- task_id 在本次计划内唯一
+- depends_on 填写必须先完成的任务的 task_id，上游任务的结果会传给本任务；相互独立的任务不要声明依赖，以便并行执行
 """
     
     async def analyze_and_assign(self, user_request, previous_results=""):
@@ -248,20 +648,25 @@ class CoordinatorAgent(BaseAgent):
         if previous_results:
             input_text = f"用户原始需求: {user_request}\n\n之前的调研结果: {previous_results}\n\n请根据以上信息继续分析并分配任务。"
         
-        result = await self.ainvoke(input_text)
-        content = result["output"]
+        with span("plan"):
+            content = await self._request_plan(input_text)
         
         try:
-            decision = json.loads(content)
+            decision = parse_json_object(content)
             task_assignments_data = decision.get("task_assignments", [])
             explanation = decision.get("explanation", "")
             
             task_assignments = []
-            for ta_data in task_assignments_data:
+            for i, ta_data in enumerate(task_assignments_data, 1):
+                depends_on = ta_data.get("depends_on") or []
+                if isinstance(depends_on, str):
+                    depends_on = [depends_on]
                 ta = TaskAssignment(
                     agent_name=ta_data["agent_name"],
                     task_description=ta_data["task_description"],
-                    priority=ta_data.get("priority", 1)
+                    priority=ta_data.get("priority", 1),
+                    task_id=str(ta_data.get("task_id") or f"t{i}"),
+                    depends_on=[str(d) for d in depends_on]
                 )
                 task_assignments.append(ta)
             
@@ -277,16 +682,45 @@ class CoordinatorAgent(BaseAgent):
             return []
 
 
+SUFFICIENCY_SYSTEM_PROMPT = """你是调研质量评审员。请判断用户消息中的专家结果是否已经完整覆盖用户需求。
+
+只返回JSON，不要返回其他内容：{"sufficient": true 或 false, "missing": "仍缺少的内容，没有则为空字符串"}"""
+
+SUMMARY_SYSTEM_PROMPT = """你是调研报告汇总专家。请根据用户消息中各专家的调研结果，生成一份完整、专业的调研报告。
+
+请生成结构清晰、内容全面的调研报告。"""
+
+INCREMENTAL_SUMMARY_SYSTEM_PROMPT = """你是调研报告汇总专家。请把本轮新增的专家调研结果合并进已有的调研报告，生成一份完整、专业的调研报告。
+
+请保留已有报告中仍然有效的内容，补充或修正新增结果带来的变化，生成结构清晰、内容全面的调研报告。"""
+
+
 class AgentOrchestrator:
     """
     Agent编排器
     管理多个Agent的执行和结果汇总
     """
     
-    def __init__(self, coordinator, agent_configs):
+    def __init__(self, coordinator, agent_configs, dispatcher=None, incremental_summary=False, early_exit=True,
+                 hedger=None):
+        """
+        Args:
+            coordinator: 协调员Agent
+            agent_configs: 专家Agent配置字典
+            dispatcher: 大模型调用调度器，默认使用进程级共享调度器（get_dispatcher），
+                        本编排器发起的所有大模型调用都经它排队
+            incremental_summary: 增量汇总模式，每轮只把本轮新结果合并进上一轮报告
+            early_exit: 推测执行下一轮规划，需求已被覆盖时提前结束多轮调研
+            hedger: 专家调用的对冲/超时/重试策略（HedgedCaller），默认按各专家的历史耗时自适应；
+                    传入 False 关闭
+        """
         self.coordinator = coordinator
         self.agent_configs = agent_configs
         self.agent_instances = {}
+        self.dispatcher = dispatcher or get_dispatcher()
+        self.incremental_summary = incremental_summary
+        self.early_exit = early_exit
+        self.hedger = HedgedCaller() if hedger is None else (hedger or None)
         
         self._initialize_agents()
     
@@ -300,12 +734,13 @@ class AgentOrchestrator:
         
         print(f"【编排器】所有专家Agent初始化完成")
     
-    async def execute_task(self, task_assignment):
+    async def execute_task(self, task_assignment, emit=None):
         """
         执行单个任务
         
         Args:
             task_assignment: 任务分配
+            emit: 事件回调，非空时以流式方式执行并逐段上报输出
             
         Returns:
             任务执行结果
@@ -321,46 +756,179 @@ class AgentOrchestrator:
         
         agent = self.agent_instances[agent_name]
         
+        if emit is not None:
+            await emit({
+                "type": "agent_start",
+                "agent_name": agent_name,
+                "agent_role": agent.role,
+                "task_description": task_assignment.task_description
+            })
+        
         try:
-            result = await agent.ainvoke(task_assignment.task_description)
+            if emit is None and self.hedger is not None:
+                # 非流式调用可以安全地重复发起，由对冲调用器处理长尾、超时和重试；
+                # 每次尝试的模型调用都单独经调度器排队，对冲请求和重试同样受并发上限和限流约束；
+                # 排队时间不计入超时和对冲等待
+                output = (await self.hedger.call(
+                    agent_name,
+                    lambda: agent.ainvoke(task_assignment.task_description)
+                ))["output"]
+            elif emit is None:
+                output = (await agent.ainvoke(task_assignment.task_description))["output"]
+            else:
+                chunks = []
+                async for chunk in agent.astream(task_assignment.task_description):
+                    chunks.append(chunk)
+                    await emit({"type": "token", "agent_name": agent_name, "content": chunk})
+                output = "".join(chunks)
             
-            return {
+            result = {
                 "agent_name": agent_name,
                 "agent_role": agent.role,
                 "success": True,
-                "output": result["output"],
+                "output": output,
                 "task_description": task_assignment.task_description
             }
         except Exception as e:
-            return {
+            result = {
                 "agent_name": agent_name,
                 "success": False,
-                "error": str(e)
+                "error": str(e) or type(e).__name__
             }
+        
+        if emit is not None:
+            await emit({"type": "agent_end", "agent_name": agent_name, "result": result})
+        
+        return result
+    
+    async def _dispatch_task(self, task_assignment, emit=None):
+        """
+        以任务优先级执行单个任务
+        专家的每次模型调用在调度器中按任务优先级排队，受模型并发上限与限流约束；
+        queue_wait 记录第一次调用拿到槽位前的排队时间
+        """
+        queue_waits = []
+        with span("agent", agent=task_assignment.agent_name, task_id=task_assignment.task_id) as agent_span:
+            with dispatch_context(dispatcher=self.dispatcher, priority=task_assignment.priority,
+                                  queue_waits=queue_waits):
+                result = await self.execute_task(task_assignment, emit)
+            queue_wait = queue_waits[0] if queue_waits else 0.0
+            agent_span.set(queue_wait=round(queue_wait, 4), success=result.get("success"))
+        get_tracer().observe("queue_wait", queue_wait)
+        return result
     
-    async def execute_tasks_concurrently(self, task_assignments):
+    async def execute_tasks_concurrently(self, task_assignments, emit=None):
         """
         并发执行多个任务
+        按 depends_on 构成的依赖图调度：每个任务在其上游任务全部完成后立即启动，
+        上游输出作为参考信息附加到任务描述中；没有依赖的任务全部并发执行。
+        并发数与请求速率由调度器控制，优先级数字越小越先执行
         
         Args:
             task_assignments: 任务分配列表
+            emit: 事件回调，非空时各专家以流式方式执行
             
         Returns:
-            任务执行结果列表
+            任务执行结果列表（与输入顺序一致）
         """
         print(f"\n【编排器】并发执行 {len(task_assignments)} 个任务...")
         
-        tasks = [
-            self.execute_task(ta)
-            for ta in task_assignments
-        ]
+        graph = self._build_task_graph(task_assignments)
+        
+        futures = {}
+        
+        async def run_node(ta):
+            upstream = [await futures[dep] for dep in graph[ta.task_id]]
+            result = await self._dispatch_task(self._with_upstream(ta, upstream), emit)
+            result["task_id"] = ta.task_id
+            result["task_description"] = ta.task_description
+            return result
         
-        results = await asyncio.gather(*tasks)
+        # 按拓扑序、同层按优先级提交，使槽位不足时高优先级任务先获得执行机会
+        for ta in self._topological_order(task_assignments, graph):
+            futures[ta.task_id] = asyncio.ensure_future(run_node(ta))
+        
+        results = await asyncio.gather(*[futures[ta.task_id] for ta in task_assignments])
         
         print(f"【编排器】所有任务执行完成")
         
         return results
     
+    def _build_task_graph(self, task_assignments):
+        """
+        构建任务依赖图
+        补全缺失的 task_id，忽略不存在的依赖，并拆除循环依赖
+        
+        Returns:
+            {task_id: [上游 task_id, ...]}
+        """
+        seen = set()
+        for i, ta in enumerate(task_assignments, 1):
+            if not ta.task_id or ta.task_id in seen:
+                ta.task_id = f"t{i}"
+                while ta.task_id in seen:
+                    ta.task_id += "_"
+            seen.add(ta.task_id)
+        
+        graph = {}
+        for ta in task_assignments:
+            deps = []
+            for dep in ta.depends_on:
+                if dep == ta.task_id or dep not in seen:
+                    print(f"【编排器】忽略任务 {ta.task_id} 的无效依赖: {dep}")
+                elif dep not in deps:
+                    deps.append(dep)
+            graph[ta.task_id] = deps
+        
+        ordered = {ta.task_id for ta in self._topological_order(task_assignments, graph)}
+        for task_id in graph:
+            if task_id not in ordered:
+                print(f"【编排器】任务 {task_id} 存在循环依赖，改为不等待上游直接执行")
+                graph[task_id] = []
+        
+        return graph
+    
+    def _topological_order(self, task_assignments, graph):
+        """按依赖关系排序，同一层内按优先级排序；处于循环中的任务不会出现在结果中"""
+        by_id = {ta.task_id: ta for ta in task_assignments}
+        remaining = {task_id: len(deps) for task_id, deps in graph.items()}
+        dependents = {task_id: [] for task_id in graph}
+        for task_id, deps in graph.items():
+            for dep in deps:
+                dependents[dep].append(task_id)
+        
+        order = []
+        ready = [task_id for task_id, count in remaining.items() if count == 0]
+        while ready:
+            ready.sort(key=lambda task_id: by_id[task_id].priority)
+            next_ready = []
+            for task_id in ready:
+                order.append(by_id[task_id])
+                for child in dependents[task_id]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        next_ready.append(child)
+            ready = next_ready
+        
+        return order
+    
+    def _with_upstream(self, task_assignment, upstream_results):
+        """把上游任务的输出附加到任务描述中"""
+        if not upstream_results:
+            return task_assignment
+        
+        upstream_text = "\n\n".join([
+            f"【{r.get('agent_role', r['agent_name'])}】\n{r.get('output', r.get('error', ''))}"
+            for r in upstream_results
+        ])
+        
+        return TaskAssignment(
+            agent_name=task_assignment.agent_name,
+            task_description=f"{task_assignment.task_description}\n\n上游任务结果：\n{upstream_text}",
+            priority=task_assignment.priority,
+            task_id=task_assignment.task_id
+        )
+    
     async def run(self, user_request, max_rounds=2):
         """
         运行完整的调研流程
@@ -372,34 +940,245 @@ class AgentOrchestrator:
         Returns:
             最终调研报告
         """
-        all_results = []
-        previous_summary = ""
+        return await self._run(user_request, max_rounds)
+    
+    async def run_batch(self, user_requests, max_rounds=2, concurrency=None, on_result=None):
+        """
+        批量运行调研流程
+        所有请求共用本编排器的专家实例，最多 concurrency 个请求同时执行；
+        各请求的规划、专家、评审和汇总调用都经本编排器的调度器排队（默认是进程级调度器），
+        同一模型的并发上限与限流额度对整批请求共同生效
         
-        for round_num in range(1, max_rounds + 1):
-            print(f"\n{'='*80}")
-            print(f"【第 {round_num} 轮调研】")
-            print(f"{'='*80}")
-            
-            task_assignments = await self.coordinator.analyze_and_assign(
-                user_request,
-                previous_summary
-            )
-            
-            if not task_assignments:
-                print(f"【编排器】没有任务分配，结束调研")
-                break
+        Args:
+            user_requests: 用户需求列表
+            max_rounds: 每个需求的最大轮数
+            concurrency: 同时执行的需求数，默认读取环境变量 BATCH_CONCURRENCY（4）
+            on_result: 每个需求完成时调用的回调（普通函数或协程函数），参数为单条结果，可用于增量写出报告；
+                       回调抛出的异常只记录日志，不影响其余需求
             
-            results = await self.execute_tasks_concurrently(task_assignments)
+        Returns:
+            结果列表（与输入顺序一致），每条包含 index、request、success、summary 或 error、elapsed
+        """
+        concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        print(f"\n【编排器】批量执行 {len(user_requests)} 个需求，并发数 {concurrency}")
+        
+        async def run_one(index, user_request):
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    summary = await self.run(user_request, max_rounds)
+                    item = {"index": index, "request": user_request, "success": True, "summary": summary}
+                except Exception as e:
+                    print(f"【编排器】需求 {index} 执行失败: {e}")
+                    item = {"index": index, "request": user_request, "success": False, "error": str(e)}
+                item["elapsed"] = round(time.monotonic() - start, 3)
             
-            all_results.extend(results)
+            if on_result is not None:
+                try:
+                    callback_result = on_result(item)
+                    if asyncio.iscoroutine(callback_result):
+                        await callback_result
+                except Exception as e:
+                    print(f"【编排器】需求 {index} 的结果回调失败: {e}")
+            return item
+        
+        results = await asyncio.gather(*[
+            run_one(index, user_request)
+            for index, user_request in enumerate(user_requests, 1)
+        ])
+        
+        succeeded = sum(1 for r in results if r["success"])
+        print(f"【编排器】批量执行完成: 成功 {succeeded}/{len(results)}")
+        
+        return results
+    
+    async def astream_run(self, user_request, max_rounds=2):
+        """
+        以流式事件的方式运行完整的调研流程
+        各专家和汇总器的输出片段一产生就立即产出，无需等待全部专家完成
+        
+        Args:
+            user_request: 用户需求
+            max_rounds: 最大轮数
             
-            summary = self._summarize_results(user_request, all_results)
-            previous_summary = summary
+        Yields:
+            事件字典，type 取值：
+            - round_start: 一轮调研开始，含 round
+            - plan: 协调员完成任务分配，含 round、task_assignments
+            - agent_start / agent_end: 专家开始/结束，agent_end 含 result
+            - token: 专家输出片段，含 agent_name、content
+            - summary_token: 汇总报告片段，含 content
+            - done: 流程结束，含最终报告 summary
+        """
+        queue = asyncio.Queue()
+        
+        async def emit(event):
+            queue.put_nowait(event)
+        
+        async def produce():
+            try:
+                summary = await self._run(user_request, max_rounds, emit)
+                queue.put_nowait({"type": "done", "summary": summary})
+            finally:
+                queue.put_nowait(None)
+        
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+    
+    async def _run(self, user_request, max_rounds, emit=None):
+        """
+        run 与 astream_run 共用的多轮调研流程，emit 非空时上报流式事件
+        
+        开启 early_exit 时，下一轮的任务规划基于本轮原始结果推测执行，与本轮汇总并行；
+        若推测出的计划没有新任务，或只是让已完成的专家再做一遍且充分性评审认为已覆盖需求，则提前结束
+        """
+        with span("run", max_rounds=max_rounds), dispatch_context(dispatcher=self.dispatcher):
+            return await self._run_rounds(user_request, max_rounds, emit)
+    
+    async def _run_rounds(self, user_request, max_rounds, emit=None):
+        """按轮次执行规划、专家任务和汇总，每轮记录一个 round span"""
+        all_results = []
+        previous_summary = ""
+        executed = set()
+        task_assignments = None
+        
+        for round_num in range(1, max_rounds + 1):
+            with span("round", round=round_num):
+                print(f"\n{'='*80}")
+                print(f"【第 {round_num} 轮调研】")
+                print(f"{'='*80}")
+                
+                if emit is not None:
+                    await emit({"type": "round_start", "round": round_num})
+                
+                if task_assignments is None:
+                    task_assignments = await self.coordinator.analyze_and_assign(
+                        user_request,
+                        previous_summary
+                    )
+                
+                if emit is not None:
+                    await emit({
+                        "type": "plan",
+                        "round": round_num,
+                        "task_assignments": [
+                            {
+                                "task_id": ta.task_id,
+                                "agent_name": ta.agent_name,
+                                "task_description": ta.task_description,
+                                "priority": ta.priority,
+                                "depends_on": ta.depends_on
+                            }
+                            for ta in task_assignments
+                        ]
+                    })
+                
+                if not task_assignments:
+                    print(f"【编排器】没有任务分配，结束调研")
+                    break
+                
+                results = await self.execute_tasks_concurrently(task_assignments, emit)
+                
+                all_results.extend(results)
+                executed.update((ta.agent_name, ta.task_description) for ta in task_assignments)
+                
+                if self.incremental_summary:
+                    summary_coro = self._summarize_results(user_request, results, previous_summary, emit)
+                else:
+                    summary_coro = self._summarize_results(user_request, all_results, emit=emit)
+                
+                if not self.early_exit or round_num == max_rounds:
+                    previous_summary = await summary_coro
+                    task_assignments = None
+                    continue
+                
+                summary, next_plan, verdict = await asyncio.gather(
+                    summary_coro,
+                    self.coordinator.analyze_and_assign(user_request, self._results_digest(all_results)),
+                    self._check_sufficiency(user_request, all_results)
+                )
+                previous_summary = summary
+                
+                new_assignments = [
+                    ta for ta in next_plan
+                    if (ta.agent_name, ta.task_description) not in executed
+                ]
+                covered_agents = {r["agent_name"] for r in all_results if r.get("success")}
+                
+                reason = None
+                if not new_assignments:
+                    reason = "下一轮没有新的任务分配"
+                elif verdict and all(ta.agent_name in covered_agents for ta in new_assignments):
+                    reason = "已完成的专家结果已覆盖用户需求"
+                
+                if reason:
+                    print(f"【编排器】提前结束调研: {reason}")
+                    if emit is not None:
+                        await emit({"type": "early_exit", "round": round_num, "reason": reason})
+                    break
+                
+                task_assignments = new_assignments
         
         return previous_summary
     
-    def _summarize_results(self, user_request, results):
-        """汇总结果生成报告"""
+    def _results_digest(self, results, limit=800):
+        """将专家结果压缩为摘要文本，供推测规划和充分性评审使用"""
+        return "\n\n".join([
+            f"【{r.get('agent_role', r['agent_name'])}】\n{r.get('output', r.get('error', ''))[:limit]}"
+            for r in results
+        ])
+    
+    async def _check_sufficiency(self, user_request, results):
+        """
+        判断已有专家结果是否已覆盖用户需求
+        有专家执行失败时直接判定为不充分，否则请大模型给出简短的结构化结论
+        
+        Returns:
+            True 表示已覆盖需求，可以提前结束
+        """
+        if not results or not all(r.get("success") for r in results):
+            return False
+        
+        from langchain_core.messages import HumanMessage
+        messages = [
+            compile_system_message(SUFFICIENCY_SYSTEM_PROMPT),
+            HumanMessage(content=f"用户原始需求：{user_request}\n\n专家结果摘要：\n{self._results_digest(results)}")
+        ]
+        
+        try:
+            with span("sufficiency"):
+                verdict = parse_json_object(await _acall_llm(messages))
+            sufficient = verdict.get("sufficient") is True
+            print(f"【编排器】充分性评审: sufficient={sufficient} {verdict.get('missing', '')}")
+            return sufficient
+        except Exception as e:
+            print(f"【编排器】充分性评审失败: {e}")
+            return False
+    
+    async def _summarize_results(self, user_request, results, previous_summary="", emit=None):
+        """
+        汇总结果生成报告
+        
+        Args:
+            user_request: 用户需求
+            results: 需要汇总的专家结果
+            previous_summary: 上一轮报告，非空时只把 results 增量合并进该报告
+            emit: 事件回调，非空时以流式方式生成并逐段上报报告
+            
+        Returns:
+            调研报告
+        """
         print(f"\n【汇总器】正在生成调研报告...")
         
         results_text = "\n\n".join([
@@ -407,18 +1186,37 @@ class AgentOrchestrator:
             for r in results
         ])
         
-        summary_prompt = f"""你是调研报告汇总专家。请根据以下各专家的调研结果，生成一份完整、专业的调研报告。
+        from langchain_core.messages import HumanMessage
+        if previous_summary:
+            summary_prompt = [
+                compile_system_message(INCREMENTAL_SUMMARY_SYSTEM_PROMPT),
+                HumanMessage(content=f"""用户原始需求：{user_request}
 
-用户原始需求：{user_request}
+已有调研报告：
+{previous_summary}
 
-各专家调研结果：
-{results_text}
+本轮新增的专家调研结果：
+{results_text}""")
+            ]
+        else:
+            summary_prompt = [
+                compile_system_message(SUMMARY_SYSTEM_PROMPT),
+                HumanMessage(content=f"""用户原始需求：{user_request}
 
-请生成结构清晰、内容全面的调研报告。"""
+各专家调研结果：
+{results_text}""")
+            ]
         
-        summary = llm.invoke(summary_prompt)
+        with span("summarize", incremental=bool(previous_summary)):
+            if emit is None:
+                summary = await _acall_llm(summary_prompt)
+            else:
+                chunks = []
+                async for chunk in _astream_llm(summary_prompt):
+                    chunks.append(chunk)
+                    await emit({"type": "summary_token", "content": chunk})
+                summary = "".join(chunks)
         
         print(f"【汇总器】调研报告生成完成")
         
-        return summary.content
-
+        return summary
@@ -4,12 +4,11 @@
 基于 BaseAgent 的具体实现
 """
 from typing import Dict, List
-from langchain.tools import tool
+from langchain_core.tools import tool
 from agent_framework import AgentConfig, BaseAgent
 from skill_loader import create_skill_loader
+from skill_index import search_skill_chunks
 
-# 初始化技能加载器
-_skill_loader = create_skill_loader()
 
 # 硬编码知识库作为备用
 FINANCIAL_KNOWLEDGE_BASE = {
@@ -29,9 +28,27 @@ FINANCIAL_KNOWLEDGE_BASE = {
 }
 
 
+# 主题关键词到技能名的查询扩展表，命中的技能名会追加到检索文本中
+FINANCIAL_TOPIC_ALIASES = {
+    "财务报表": "financial-statements",
+    "利润表": "financial-statements",
+    "资产负债表": "financial-statements",
+    "现金流量表": "financial-statements",
+    "差异分析": "variance-analysis",
+    "日记账": "journal-entry-prep",
+    "账户对账": "reconciliation",
+    "对账": "reconciliation",
+    "月末结账": "close-management",
+    "审计支持": "audit-support",
+    "审计": "audit-support",
+    "SOX": "audit-support",
+}
+
+
 def _get_finance_skill_content(skill_name):
     """从 SKILL.md 获取财务技能内容"""
-    skill = _skill_loader.get_skill("finance", skill_name)
+    # 共享的技能加载器在第一次查询时创建，进程内只扫描一次插件目录
+    skill = create_skill_loader().get_skill("finance", skill_name)
     if skill:
         return skill['content']
     return None
@@ -41,7 +58,7 @@ def _get_finance_skill_content(skill_name):
 def search_financial_knowledge(topic: str) -> str:
     """
     搜索财务相关知识，包括财务报表、差异分析、日记账准备等
-    优先从 SKILL.md 文件加载专业知识
+    优先从 SKILL.md 分块索引中检索最相关的片段
 
     Args:
         topic: 财务主题，例如"财务报表"、"差异分析"、"GAAP"等
@@ -49,31 +66,10 @@ def search_financial_knowledge(topic: str) -> str:
     Returns:
         财务专业知识
     """
-    skill_mapping = {
-        "财务报表": "financial-statements",
-        "利润表": "financial-statements",
-        "资产负债表": "financial-statements",
-        "现金流量表": "financial-statements",
-        "差异分析": "variance-analysis",
-        "日记账": "journal-entry-prep",
-        "账户对账": "reconciliation",
-        "对账": "reconciliation",
-        "月末结账": "close-management",
-        "审计支持": "audit-support",
-        "审计": "audit-support",
-        "SOX": "audit-support",
-    }
-    
-    skill_name = None
-    for key, value in skill_mapping.items():
-        if key.lower() in topic.lower():
-            skill_name = value
-            break
-    
-    if skill_name:
-        content = _get_finance_skill_content(skill_name)
-        if content:
-            return "【财务知识库 - 从SKILL.md加载】\n" + content
+    # 从 SKILL.md 分块索引中检索最相关的片段
+    content = search_skill_chunks(topic, "finance", aliases=FINANCIAL_TOPIC_ALIASES)
+    if content:
+        return "【财务知识库 - SKILL.md相关片段】\n" + content
     
     info = FINANCIAL_KNOWLEDGE_BASE.get(topic, {})
     if info:
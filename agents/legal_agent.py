@@ -4,12 +4,11 @@
 基于 BaseAgent 的具体实现
 """
 from typing import Dict, List
-from langchain.tools import tool
+from langchain_core.tools import tool
 from agent_framework import AgentConfig, BaseAgent
 from skill_loader import create_skill_loader
+from skill_index import search_skill_chunks
 
-# 初始化技能加载器
-_skill_loader = create_skill_loader()
 
 # 硬编码知识库作为备用
 LEGAL_KNOWLEDGE_BASE = {
@@ -30,9 +29,28 @@ LEGAL_KNOWLEDGE_BASE = {
 }
 
 
+# 主题关键词到技能名的查询扩展表，命中的技能名会追加到检索文本中
+LEGAL_TOPIC_ALIASES = {
+    "合同审查": "contract-review",
+    "合同": "contract-review",
+    "contract": "contract-review",
+    "合规检查": "compliance",
+    "合规": "compliance",
+    "compliance": "compliance",
+    "GDPR": "compliance",
+    "NDA分类": "nda-triage",
+    "NDA": "nda-triage",
+    "法律风险评估": "legal-risk-assessment",
+    "风险评估": "legal-risk-assessment",
+    "会议简报": "meeting-briefing",
+    "模板化响应": "canned-responses",
+}
+
+
 def _get_legal_skill_content(skill_name):
     """从 SKILL.md 获取法律技能内容"""
-    skill = _skill_loader.get_skill("legal", skill_name)
+    # 共享的技能加载器在第一次查询时创建，进程内只扫描一次插件目录
+    skill = create_skill_loader().get_skill("legal", skill_name)
     if skill:
         return skill['content']
     return None
@@ -42,7 +60,7 @@ def _get_legal_skill_content(skill_name):
 def search_legal_knowledge(topic: str) -> str:
     """
     搜索法律相关知识，包括合同审查、合规检查、法律风险评估等
-    优先从 SKILL.md 文件加载专业知识
+    优先从 SKILL.md 分块索引中检索最相关的片段
 
     Args:
         topic: 法律主题，例如"合同审查"、"合规检查"、"GDPR"等
@@ -50,32 +68,10 @@ def search_legal_knowledge(topic: str) -> str:
     Returns:
         法律专业知识
     """
-    skill_mapping = {
-        "合同审查": "contract-review",
-        "合同": "contract-review",
-        "contract": "contract-review",
-        "合规检查": "compliance",
-        "合规": "compliance",
-        "compliance": "compliance",
-        "GDPR": "compliance",
-        "NDA分类": "nda-triage",
-        "NDA": "nda-triage",
-        "法律风险评估": "legal-risk-assessment",
-        "风险评估": "legal-risk-assessment",
-        "会议简报": "meeting-briefing",
-        "模板化响应": "canned-responses",
-    }
-    
-    skill_name = None
-    for key, value in skill_mapping.items():
-        if key.lower() in topic.lower():
-            skill_name = value
-            break
-    
-    if skill_name:
-        content = _get_legal_skill_content(skill_name)
-        if content:
-            return "【法律知识库 - 从SKILL.md加载】\n" + content
+    # 从 SKILL.md 分块索引中检索最相关的片段
+    content = search_skill_chunks(topic, "legal", aliases=LEGAL_TOPIC_ALIASES)
+    if content:
+        return "【法律知识库 - SKILL.md相关片段】\n" + content
     
     info = LEGAL_KNOWLEDGE_BASE.get(topic, {})
     if info:
@@ -0,0 +1,152 @@
+"""
+启动耗时分析
+用 python -X importtime 在独立进程中导入各入口模块，汇总总耗时和按顶层包分组的自身耗时，
+并测量命令行入口 --help 的冷启动墙钟时间；超过预算时以非零状态退出，便于在 CI 中卡住启动回归。
+
+用法：
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --repeat 5 --budget-ms 300 --output benchmarks/import_profile.md
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["agent_framework", "agents", "legal_finance_swarm", "research_swarm"]
+DEFAULT_COMMANDS = ["legal_finance_swarm.py --help", "research_swarm.py --help", "run_legal_finance.py --help"]
+
+
+def _env():
+    env = dict(os.environ)
+    # 只测导入，不需要真实的接口配置
+    env.setdefault("ARK_API_KEY", "offline")
+    env.setdefault("ARK_BASE_URL", "http://127.0.0.1:9/v1")
+    env.setdefault("ARK_CHAT_MODEL", "mock-model")
+    return env
+
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        [(模块名, 自身耗时us, 累计耗时us, 嵌套层级), ...]
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_part, cumulative_us, name = line.split("|")
+        self_us = int(self_part.rsplit(":", 1)[1])
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), self_us, int(cumulative_us), depth))
+    return rows
+
+
+def profile_module(module, repeat):
+    """
+    在独立进程中导入模块 repeat 次
+
+    Returns:
+        {"module", "total_ms"（中位数）, "packages": {顶层包: 自身耗时ms}}，取耗时中位数那一次的分组
+    """
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, encoding="utf-8"
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr[-2000:]}")
+        rows = parse_importtime(completed.stderr)
+        total = sum(self_us for _, self_us, _, _ in rows)
+        packages = defaultdict(int)
+        for name, self_us, _, _ in rows:
+            packages[name.split(".")[0]] += self_us
+        runs.append((total, packages))
+
+    runs.sort(key=lambda run: run[0])
+    total, packages = runs[len(runs) // 2]
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "packages": {name: round(us / 1000, 1) for name, us in packages.items()}
+    }
+
+
+def time_command(command, repeat):
+    """测量命令冷启动的墙钟时间（毫秒，中位数）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, *command.split()],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, encoding="utf-8"
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{command} 执行失败:\n{completed.stderr[-2000:]}")
+    return round(statistics.median(samples), 1)
+
+
+def render_report(modules, commands, budget_ms, top):
+    """生成 Markdown 报告"""
+    lines = [
+        "# 启动耗时报告",
+        "",
+        f"Python {sys.version.split()[0]}，由 `python benchmarks/import_profile.py` 生成（取多次运行的中位数）。",
+        "",
+        "## 命令行冷启动",
+        "",
+        f"| 命令 | 墙钟时间 (ms) | 预算 {budget_ms}ms |",
+        "|------|---------------|------|",
+    ]
+    for command, elapsed in commands.items():
+        lines.append(f"| `python {command}` | {elapsed} | {'✅' if elapsed <= budget_ms else '❌'} |")
+
+    lines += ["", "## 模块导入", ""]
+    for result in modules:
+        lines.append(f"### `import {result['module']}` — {result['total_ms']} ms")
+        lines.append("")
+        lines.append("| 顶层包 | 自身耗时 (ms) |")
+        lines.append("|--------|---------------|")
+        ranked = sorted(result["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+        for name, ms in ranked:
+            lines.append(f"| {name} | {ms} |")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析入口模块的导入耗时和命令行冷启动时间")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="要分析的模块")
+    parser.add_argument("--commands", nargs="+", default=DEFAULT_COMMANDS, help="要测量冷启动的命令（相对仓库根目录）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    parser.add_argument("--budget-ms", type=float, default=500, help="命令冷启动预算（毫秒）")
+    parser.add_argument("--top", type=int, default=8, help="每个模块列出的顶层包数量")
+    parser.add_argument("--output", help="把 Markdown 报告写入文件")
+    args = parser.parse_args()
+
+    commands = {command: time_command(command, args.repeat) for command in args.commands}
+    modules = [profile_module(module, args.repeat) for module in args.modules]
+    report = render_report(modules, commands, args.budget_ms, args.top)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"\n【启动耗时】报告已保存: {args.output}")
+
+    over = [command for command, elapsed in commands.items() if elapsed > args.budget_ms]
+    if over:
+        print(f"\n【启动耗时】超出预算 {args.budget_ms}ms: {over}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+编排流程离线压测
+用 mock_llm.MockChatModel 替换 agent_framework.llm，按不同的扇出（每轮指派的专家数）和批量并发度
+驱动 AgentOrchestrator.run，输出吞吐量、单请求耗时 p50/p95/p99 以及框架自身开销。
+
+框架开销 = 同一配置下零延迟假模型的单请求平均耗时，即编排、调度、提示词构造等非模型耗时。
+
+用法：
+    python benchmarks/orchestrator_benchmark.py
+    python benchmarks/orchestrator_benchmark.py --fan-out 1 4 8 --concurrency 1 8 32 --latency-ms 300 --distribution lognormal
+    python benchmarks/orchestrator_benchmark.py --failure-rate 0.05 --tokens-per-second 50 --json results.json
+    python benchmarks/orchestrator_benchmark.py --prefill-tokens-per-second 2000 --prefix-cache
+"""
+import os
+import sys
+import io
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 离线运行，不需要真实的接口配置
+os.environ.setdefault("ARK_API_KEY", "offline")
+os.environ.setdefault("ARK_BASE_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("ARK_CHAT_MODEL", "mock-model")
+
+from agent_framework import AgentConfig, CoordinatorAgent, AgentOrchestrator
+from llm_dispatcher import LLMDispatcher
+from mock_llm import MockChatModel, install_mock_llm, LATENCY_DISTRIBUTIONS
+from telemetry import Tracer
+
+
+def create_orchestrator(fan_out, llm_concurrency, hedge):
+    """创建 fan_out 个专家的编排器"""
+    configs = {
+        f"expert_{i}": AgentConfig(
+            name=f"expert_{i}",
+            role=f"专家{i}",
+            system_prompt=f"你是专家{i}。",
+            description=f"第{i}个领域"
+        )
+        for i in range(max(fan_out, 1))
+    }
+    return AgentOrchestrator(
+        coordinator=CoordinatorAgent(available_agents=configs),
+        agent_configs=configs,
+        dispatcher=LLMDispatcher(max_concurrency=llm_concurrency),
+        hedger=None if hedge else False
+    )
+
+
+async def run_scenario(model, fan_out, concurrency, requests, max_rounds, llm_concurrency, hedge):
+    """
+    运行一组请求
+
+    Returns:
+        {"wall", "elapsed": [单请求耗时], "failed"}
+    """
+    orchestrator = create_orchestrator(fan_out, llm_concurrency, hedge)
+    user_requests = [f"压测需求{i}" for i in range(requests)]
+    start = time.perf_counter()
+    with install_mock_llm(model):
+        results = await orchestrator.run_batch(user_requests, max_rounds=max_rounds, concurrency=concurrency)
+    return {
+        "wall": time.perf_counter() - start,
+        "elapsed": [r["elapsed"] for r in results],
+        "failed": sum(1 for r in results if not r["success"])
+    }
+
+
+def benchmark(args):
+    """遍历扇出 × 并发度组合，返回每个组合的统计"""
+    rows = []
+    for fan_out in args.fan_out:
+        for concurrency in args.concurrency:
+            scenario = dict(
+                fan_out=fan_out,
+                concurrency=concurrency,
+                requests=args.requests,
+                max_rounds=args.max_rounds,
+                llm_concurrency=args.llm_concurrency,
+                hedge=not args.no_hedge
+            )
+            model = MockChatModel(
+                latency_ms=args.latency_ms,
+                distribution=args.distribution,
+                jitter=args.jitter,
+                tokens_per_second=args.tokens_per_second,
+                output_tokens=args.output_tokens,
+                fan_out=fan_out,
+                failure_rate=args.failure_rate,
+                stall_rate=args.stall_rate,
+                stall_seconds=args.stall_seconds,
+                prefill_tokens_per_second=args.prefill_tokens_per_second,
+                prefix_cache=args.prefix_cache,
+                seed=args.seed
+            )
+            baseline_model = MockChatModel(output_tokens=args.output_tokens, fan_out=fan_out)
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                measured = asyncio.run(run_scenario(model, **scenario))
+                baseline = asyncio.run(run_scenario(baseline_model, **scenario))
+
+            tracer = Tracer()
+            for value in measured["elapsed"]:
+                tracer.observe("request", value)
+            histogram = tracer.histogram("request")
+
+            rows.append({
+                "fan_out": fan_out,
+                "concurrency": concurrency,
+                "requests": args.requests,
+                "failed": measured["failed"],
+                "throughput": round(args.requests / measured["wall"], 3),
+                "p50": histogram["p50"],
+                "p95": histogram["p95"],
+                "p99": histogram["p99"],
+                "overhead_ms": round(sum(baseline["elapsed"]) / len(baseline["elapsed"]) * 1000, 3),
+                "llm_calls": model.stats()["calls"],
+                "cache_hit_rate": round(model.stats()["cached_tokens"] / (model.stats()["input_tokens"] or 1), 3),
+            })
+            print_row(rows[-1])
+    return rows
+
+
+def print_header():
+    print(f"{'扇出':>6}{'并发':>6}{'请求':>6}{'失败':>6}{'吞吐(req/s)':>14}"
+          f"{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}{'框架开销(ms)':>14}{'模型调用':>10}{'缓存命中率':>12}")
+
+
+def print_row(row):
+    print(f"{row['fan_out']:>6}{row['concurrency']:>6}{row['requests']:>6}{row['failed']:>6}"
+          f"{row['throughput']:>14}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}"
+          f"{row['overhead_ms']:>14}{row['llm_calls']:>10}{row['cache_hit_rate']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编排流程离线压测（假大模型）")
+    parser.add_argument("--requests", type=int, default=20, help="每个组合的请求数")
+    parser.add_argument("--fan-out", type=int, nargs="+", default=[1, 3, 6], help="每轮指派的专家数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="批量并发度")
+    parser.add_argument("--max-rounds", type=int, default=2, help="最大调研轮数")
+    parser.add_argument("--llm-concurrency", type=int, default=64, help="调度器的大模型并发上限")
+    parser.add_argument("--latency-ms", type=float, default=200, help="首Token延迟（毫秒）")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="延迟分布")
+    parser.add_argument("--jitter", type=float, default=0.5, help="延迟波动（uniform 为相对幅度，lognormal 为 sigma）")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="输出速度，0 表示不模拟")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0, help="输入处理速度，0 表示不模拟")
+    parser.add_argument("--prefix-cache", action="store_true", help="模拟服务端前缀缓存")
+    parser.add_argument("--output-tokens", type=int, default=200, help="每次回复的Token数")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="调用失败比例")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="调用卡顿比例")
+    parser.add_argument("--stall-seconds", type=float, default=5.0, help="卡顿时长（秒）")
+    parser.add_argument("--no-hedge", action="store_true", help="关闭专家调用的对冲/重试")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示编排过程日志")
+    args = parser.parse_args()
+
+    print(f"【压测】延迟 {args.latency_ms}ms ({args.distribution})，失败率 {args.failure_rate}，"
+          f"卡顿率 {args.stall_rate}，每组 {args.requests} 个请求")
+    print_header()
+    rows = benchmark(args)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"【压测】结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+多轮对话记忆
+按会话保存对话轮次，构造提示词时在Token预算内保留最近的原文轮次，更早的轮次压缩为滚动摘要。
+摘要在后台任务中生成，不阻塞当前回答；会话数据持久化在 SQLite 中，恢复会话时只读取摘要和未压缩的轮次。
+"""
+import os
+import time
+import sqlite3
+import asyncio
+import functools
+import threading
+
+from llm_dispatcher import estimate_tokens
+
+
+class ConversationMemory:
+    """
+    会话记忆
+
+    Args:
+        path: SQLite 数据库文件路径
+        token_budget: 历史上下文（摘要 + 最近轮次）的Token预算
+        summarizer: 异步函数 summarizer(previous_summary, turns) -> 新摘要，turns 为 [(role, content), ...]；
+                    None 表示不做摘要，超出预算的轮次直接丢弃
+    """
+
+    def __init__(self, path=".cache/conversations.sqlite3", token_budget=1500, summarizer=None):
+        self.path = path
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self._compactions = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL DEFAULT '',
+                summarized_until INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id)")
+        self._conn.commit()
+
+    def add_turn(self, session_id, role, content):
+        """
+        记录一轮对话
+
+        Args:
+            session_id: 会话ID
+            role: human / ai
+            content: 内容
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, updated_at) VALUES (?, ?)",
+                (session_id, now)
+            )
+            self._conn.execute(
+                "INSERT INTO turns (session_id, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, role, content, estimate_tokens(content), now)
+            )
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+
+    def _load(self, session_id):
+        """读取摘要和摘要之后的全部轮次"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized_until FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            summary, summarized_until = row if row else ("", 0)
+            turns = self._conn.execute(
+                "SELECT id, role, content, tokens FROM turns WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, summarized_until)
+            ).fetchall()
+        return summary, turns
+
+    def _split_recent(self, summary, turns, budget):
+        """从最新的轮次往前取，直到用完预算；返回 (更早的轮次, 最近的轮次)"""
+        remaining = budget - estimate_tokens(summary)
+        index = len(turns)
+        while index > 0 and turns[index - 1][3] <= remaining:
+            remaining -= turns[index - 1][3]
+            index -= 1
+        return turns[:index], turns[index:]
+
+    def get_context(self, session_id):
+        """
+        获取构造提示词所需的历史上下文
+
+        Returns:
+            (滚动摘要, [(role, content), ...] 最近的原文轮次)，总量不超过 token_budget
+        """
+        summary, turns = self._load(session_id)
+        _, recent = self._split_recent(summary, turns, self.token_budget)
+        return summary, [(role, content) for _, role, content, _ in recent]
+
+    def format_context(self, session_id):
+        """把历史上下文格式化为提示词文本，没有历史时返回空字符串"""
+        summary, recent = self.get_context(session_id)
+        parts = []
+        if summary:
+            parts.append(f"更早对话摘要：{summary}")
+        if recent:
+            parts.append("最近对话：\n" + "\n".join(
+                f"{'用户' if role == 'human' else '客服'}: {content}" for role, content in recent
+            ))
+        return "\n\n".join(parts)
+
+    async def compact(self, session_id):
+        """
+        未压缩轮次超出预算时，把较早的轮次合并进滚动摘要
+        只保留约一半预算的最近轮次，为后续对话留出余量，避免每轮都触发压缩
+
+        Returns:
+            是否进行了压缩
+        """
+        summary, turns = self._load(session_id)
+        if sum(t[3] for t in turns) + estimate_tokens(summary) <= self.token_budget:
+            return False
+
+        older, _ = self._split_recent(summary, turns, self.token_budget // 2)
+        if not older:
+            return False
+
+        if self.summarizer is not None:
+            summary = await self.summarizer(summary, [(role, content) for _, role, content, _ in older])
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, summarized_until = ?, updated_at = ? WHERE session_id = ?",
+                (summary, older[-1][0], time.time(), session_id)
+            )
+            self._conn.commit()
+        print(f"【对话记忆】会话 {session_id} 压缩了 {len(older)} 轮对话")
+        return True
+
+    def schedule_compaction(self, session_id):
+        """
+        在后台压缩会话，同一会话同时只运行一个压缩任务
+
+        Returns:
+            后台任务，没有运行中的事件循环时返回 None
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        running = self._compactions.get(session_id)
+        if running is not None and not running.done():
+            return running
+
+        task = loop.create_task(self.compact(session_id))
+        self._compactions[session_id] = task
+        task.add_done_callback(functools.partial(self._compaction_done, session_id))
+        return task
+
+    def _compaction_done(self, session_id, task):
+        # 完成后移除记录，会话数增长时 _compactions 不随之无限增长
+        if self._compactions.get(session_id) is task:
+            del self._compactions[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"【对话记忆】压缩失败: {task.exception()}")
+
+    async def wait_for_compactions(self):
+        """等待所有后台压缩任务完成"""
+        tasks = [t for t in self._compactions.values() if not t.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def clear(self, session_id):
+        """删除会话"""
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,50 @@
+"""
+本地向量模型加载
+使用 models/ 下的 paraphrase-multilingual-MiniLM-L12-v2，
+sentence_transformers 未安装或模型权重缺失时返回 None，由调用方降级为非向量方案
+"""
+import os
+import threading
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "models",
+    "paraphrase-multilingual-MiniLM-L12-v2"
+)
+
+_models = {}
+_lock = threading.Lock()
+
+
+def resolve_model_path(model_path=None):
+    """返回实际使用的模型目录：参数 > 环境变量 EMBEDDING_MODEL_PATH > models/ 下的默认模型"""
+    return model_path or os.getenv("EMBEDDING_MODEL_PATH") or DEFAULT_MODEL_PATH
+
+
+def get_embedding_model(model_path=None):
+    """
+    获取进程内共享的向量模型
+
+    Args:
+        model_path: 模型目录，默认读取环境变量 EMBEDDING_MODEL_PATH，否则使用 models/ 下的模型
+
+    Returns:
+        SentenceTransformer 实例，不可用时返回 None
+    """
+    model_path = resolve_model_path(model_path)
+
+    with _lock:
+        if model_path not in _models:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _models[model_path] = SentenceTransformer(model_path)
+                print(f"【向量模型】已加载: {model_path}")
+            except Exception as e:
+                print(f"【向量模型】不可用，降级为关键词检索: {e}")
+                _models[model_path] = None
+        return _models[model_path]
+
+
+def encode(model, texts):
+    """编码文本为归一化向量（numpy 数组）"""
+    return model.encode(list(texts), normalize_embeddings=True, show_progress_bar=False)
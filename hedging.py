@@ -0,0 +1,293 @@
+"""
+对冲请求与自适应超时
+按 key（通常是专家名）统计最近的调用耗时：
+- 调用超过该专家的 p95 仍未返回时，发起一个相同的对冲请求，先完成的结果胜出，另一个被取消
+- 超时时间由 p99 乘以系数得到，并限制在 [min_timeout, max_timeout] 内；样本不足时使用默认超时
+- 超时、限流、服务端错误和连接错误后按带抖动的指数退避重试，其余错误（如 400/401）直接抛出
+
+耗时只计算调用真正执行的时间：被调用方通过 waiting_for_slot() 标记在调度器中排队的区间，
+排队时间不计入超时、对冲等待和耗时样本，排队中的调用不会被判超时或触发对冲
+"""
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import threading
+import contextlib
+import contextvars
+from collections import defaultdict, deque
+
+from telemetry import current_span
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return float(value.strip())
+
+
+# 当前任务所属的对冲尝试，由 HedgedCaller 在每次尝试的任务中设置
+_current_attempt = contextvars.ContextVar("hedged_attempt", default=None)
+
+# 与 openai 客户端自身的重试策略一致：请求超时、锁冲突、限流和服务端错误
+RETRYABLE_STATUS = (408, 409, 429)
+
+
+def is_retryable(error):
+    """
+    判断调用失败后是否值得重试
+    超时、限流（429）、服务端错误（5xx）和连接错误返回 True；
+    400/401/403/404 等请求本身的问题重试也不会成功，返回 False
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    # 只检查已加载的客户端库，未加载时异常不可能来自它们，也避免为此导入
+    for module_name, class_name in (("openai", "APIConnectionError"), ("httpx", "TransportError")):
+        module = sys.modules.get(module_name)
+        if module is not None and isinstance(error, getattr(module, class_name)):
+            return True
+    return False
+
+
+@contextlib.contextmanager
+def waiting_for_slot():
+    """
+    标记当前被对冲的调用正在排队等待调度器槽位，区间内的时间不计入该次尝试的耗时
+    不在对冲调用中时不做任何事
+    """
+    attempt = _current_attempt.get()
+    if attempt is None:
+        yield
+        return
+    attempt.enter_queue()
+    try:
+        yield
+    finally:
+        attempt.leave_queue()
+
+
+class _Attempt:
+    """一次尝试的计时：从发起时开始，扣除排队等待槽位的时间"""
+
+    def __init__(self, changed):
+        self.launched = time.monotonic()
+        self.queued = 0.0
+        self.queued_at = None
+        self.depth = 0
+        self.changed = changed
+
+    @property
+    def waiting(self):
+        return self.queued_at is not None
+
+    def enter_queue(self):
+        self.depth += 1
+        if self.depth == 1:
+            self.queued_at = time.monotonic()
+            self.changed.set()
+
+    def leave_queue(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self.queued += time.monotonic() - self.queued_at
+            self.queued_at = None
+            self.changed.set()
+
+    def elapsed(self):
+        """已执行的秒数（不含排队）"""
+        now = time.monotonic()
+        waiting = now - self.queued_at if self.queued_at is not None else 0.0
+        return now - self.launched - self.queued - waiting
+
+
+class LatencyTracker:
+    """
+    按 key 记录最近的调用耗时
+
+    Args:
+        window: 每个 key 保留的最近样本数
+        min_samples: 计算百分位所需的最少样本数，样本不足时返回 None
+    """
+
+    def __init__(self, window=200, min_samples=10):
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key, q):
+        """返回 key 的第 q 百分位耗时（秒），样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(q / 100.0 * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgedCaller:
+    """
+    带对冲、自适应超时和重试的异步调用器
+
+    Args:
+        tracker: LatencyTracker，默认新建
+        hedge_percentile: 超过该百分位耗时仍未返回时发起对冲请求
+        timeout_percentile: 超时时间参考的百分位
+        timeout_multiplier: 超时时间 = 参考百分位耗时 × 系数
+        min_timeout / max_timeout: 超时时间上下限（秒）
+        default_timeout: 样本不足时的超时时间（秒），默认读取 AGENT_CALL_TIMEOUT（120）
+        max_retries: 最多重试次数，默认读取 AGENT_CALL_RETRIES（2）
+        backoff_base / backoff_max: 退避基数和上限（秒），第 n 次重试等待 [0, min(max, base×2^n)] 内的随机时长
+    """
+
+    def __init__(self, tracker=None, hedge_percentile=95, timeout_percentile=99, timeout_multiplier=3.0,
+                 min_timeout=10.0, max_timeout=300.0, default_timeout=None, max_retries=None,
+                 backoff_base=0.5, backoff_max=8.0):
+        self.tracker = tracker or LatencyTracker()
+        self.hedge_percentile = hedge_percentile
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default_timeout = default_timeout if default_timeout is not None else _env_float("AGENT_CALL_TIMEOUT", 120.0)
+        self.max_retries = max_retries if max_retries is not None else int(_env_float("AGENT_CALL_RETRIES", 2))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "retries": 0, "timeouts": 0}
+
+    def timeout_for(self, key):
+        """key 当前的自适应超时时间（秒）"""
+        reference = self.tracker.percentile(key, self.timeout_percentile)
+        if reference is None:
+            return self.default_timeout
+        return min(self.max_timeout, max(self.min_timeout, reference * self.timeout_multiplier))
+
+    def hedge_delay_for(self, key):
+        """key 发起对冲请求前的等待时间（秒），样本不足时返回 None 表示不对冲"""
+        return self.tracker.percentile(key, self.hedge_percentile)
+
+    def backoff(self, attempt):
+        """第 attempt 次重试前的等待时间（完全抖动）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def call(self, key, coro_factory):
+        """
+        调用 coro_factory()，超时或可重试的失败（见 is_retryable）时按退避重试
+
+        Args:
+            key: 耗时统计的 key
+            coro_factory: 无参函数，每次调用返回一个新的协程
+
+        Returns:
+            第一个成功的结果
+
+        Raises:
+            不可重试的异常或最后一次尝试的异常，超时为 asyncio.TimeoutError
+        """
+        self.counters["calls"] += 1
+        span = current_span()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                result, hedged = await self._hedged(key, coro_factory)
+                if span is not None:
+                    span.set(attempts=attempt + 1, hedged=hedged)
+                return result
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.counters["timeouts"] += 1
+                if attempt == self.max_retries or not is_retryable(e):
+                    if span is not None:
+                        span.set(attempts=attempt + 1)
+                    raise
+                delay = self.backoff(attempt)
+                self.counters["retries"] += 1
+                print(f"【对冲调用】{key} 第 {attempt + 1} 次调用失败（{type(e).__name__}: {e}），{delay:.2f}秒后重试")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, key, coro_factory):
+        """
+        执行一次调用，执行时间超过 p95 仍未返回时发起对冲请求
+        超时和对冲等待按主请求扣除排队后的执行时间计算，排队期间不计时
+
+        Returns:
+            (结果, 是否发起了对冲)
+        """
+        timeout = self.timeout_for(key)
+        hedge_delay = self.hedge_delay_for(key)
+        if hedge_delay is not None and hedge_delay >= timeout:
+            hedge_delay = None
+
+        changed = asyncio.Event()
+        attempts = {}
+
+        def launch():
+            attempt = _Attempt(changed)
+
+            async def run():
+                _current_attempt.set(attempt)
+                return await coro_factory()
+
+            task = asyncio.ensure_future(run())
+            attempts[task] = attempt
+            return task
+
+        primary = launch()
+        pending = {primary}
+        last_error = None
+
+        try:
+            while pending:
+                elapsed = attempts[primary].elapsed()
+                if elapsed >= timeout:
+                    break
+                if hedge_delay is not None and len(attempts) == 1 and not primary.done() and elapsed >= hedge_delay:
+                    self.counters["hedges"] += 1
+                    pending.add(launch())
+                    continue
+
+                # 主请求排队时不计时，等到它开始执行或有请求完成；否则等到下一个对冲或超时时刻
+                wait_for = None
+                if not attempts[primary].waiting:
+                    wait_for = timeout - elapsed
+                    if hedge_delay is not None and len(attempts) == 1:
+                        wait_for = min(wait_for, hedge_delay - elapsed)
+
+                changed.clear()
+                waiter = asyncio.ensure_future(changed.wait())
+                try:
+                    done, _ = await asyncio.wait(pending | {waiter}, timeout=wait_for,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+
+                for task in done - {waiter}:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        self.tracker.record(key, attempts[task].elapsed())
+                        if task is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return task.result(), len(attempts) > 1
+                    last_error = task.exception()
+
+            if last_error is not None and not pending:
+                raise last_error
+            self.tracker.record(key, timeout)
+            raise asyncio.TimeoutError(f"{key} 调用超过 {timeout:.1f} 秒未返回")
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        """返回调用计数：calls / hedges / hedge_wins / retries / timeouts"""
+        return dict(self.counters)
@@ -0,0 +1,176 @@
+"""
+客服问题意图快速分类
+在 swarm_agent 的协调员调用大模型之前先做本地分类：
+1. 关键词规则：订单号 ORD\\d+、退款、登录等高确定性词语，只命中一个类别时直接返回
+2. 向量最近质心：用本地 MiniLM 模型编码标注样例，取每个类别的质心，相似度足够高且领先足够多时返回
+两步都不确定时返回 None，由调用方回退到大模型分类
+
+类别代号与 swarm_agent 一致：A 技术问题、B 订单查询、C 退款售后、D 产品咨询
+"""
+import re
+import threading
+from collections import Counter
+
+from embeddings import get_embedding_model, encode
+
+INTENT_LABELS = {
+    "A": "技术问题",
+    "B": "订单查询",
+    "C": "退款售后",
+    "D": "产品咨询"
+}
+
+# (正则, 类别)，同一问题命中多个类别时视为不确定
+KEYWORD_RULES = [
+    (re.compile(r'ORD\d+', re.IGNORECASE), "B"),
+    (re.compile(r'物流|快递|发货|到货|签收|运单|支付|付款|订单'), "B"),
+    (re.compile(r'退款|退货|退换|换货|售后|维修|保修'), "C"),
+    (re.compile(r'登录|登陆|密码|崩溃|闪退|卡顿|打不开|报错|白屏|验证码|异常|故障|失灵|APP|网站', re.IGNORECASE), "A"),
+    (re.compile(r'多少钱|价格|价钱|库存|有货|规格|参数|续航|促销|优惠|折扣|功能'), "D"),
+]
+
+INTENT_EXAMPLES = {
+    "A": [
+        "我的APP登录不上去了，怎么办？",
+        "忘记密码了怎么重置",
+        "APP一打开就闪退",
+        "网站页面一直白屏加载不出来",
+        "收不到短信验证码",
+        "提交订单时页面报错",
+    ],
+    "B": [
+        "帮我查一下ORD001这个订单的物流信息",
+        "我的快递到哪里了",
+        "订单一直显示待支付怎么回事",
+        "什么时候发货",
+        "付款成功了订单状态没变",
+        "查询一下我的订单状态",
+    ],
+    "C": [
+        "我想申请退款，请问流程是怎样的？",
+        "收到的商品有质量问题可以退货吗",
+        "七天无理由退换怎么操作",
+        "退款多久能到账",
+        "耳机坏了能保修吗",
+        "申请售后被拒绝了",
+    ],
+    "D": [
+        "无线蓝牙耳机多少钱？有什么功能？",
+        "智能手表还有库存吗",
+        "手机壳是什么材质的",
+        "最近有什么促销活动",
+        "这款手表支持GPS吗",
+        "耳机续航多久",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    本地意图分类器
+
+    Args:
+        examples: {类别: [样例问题, ...]}，默认使用 INTENT_EXAMPLES
+        use_embeddings: 是否使用向量最近质心分类（模型不可用时自动关闭）
+        min_similarity: 最高相似度下限
+        min_margin: 最高与次高相似度的最小差距
+    """
+
+    def __init__(self, examples=None, use_embeddings=True, min_similarity=0.55, min_margin=0.08):
+        self.examples = examples or INTENT_EXAMPLES
+        self.use_embeddings = use_embeddings
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.counters = Counter()
+        self._model = None
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    def _load_centroids(self):
+        """第一次使用时编码样例并计算各类别质心"""
+        with self._lock:
+            if self._centroids is not None or not self.use_embeddings:
+                return self._centroids
+            model = get_embedding_model()
+            if model is None:
+                self.use_embeddings = False
+                return None
+
+            centroids = {}
+            for label, texts in self.examples.items():
+                vectors = encode(model, texts)
+                centroid = vectors.mean(axis=0)
+                norm = float((centroid ** 2).sum()) ** 0.5
+                centroids[label] = centroid / (norm or 1.0)
+            self._model = model
+            self._centroids = centroids
+            return centroids
+
+    def match_rules(self, question):
+        """
+        关键词规则分类
+
+        Returns:
+            唯一命中的类别，没有命中或命中多个类别时返回 None
+        """
+        labels = {label for pattern, label in KEYWORD_RULES if pattern.search(question)}
+        if len(labels) == 1:
+            return labels.pop()
+        return None
+
+    def match_embedding(self, question):
+        """
+        向量最近质心分类
+
+        Returns:
+            (类别或 None, 最高相似度)
+        """
+        centroids = self._load_centroids()
+        if not centroids:
+            return None, 0.0
+
+        vector = encode(self._model, [question])[0]
+        scores = sorted(((float(vector @ c), label) for label, c in centroids.items()), reverse=True)
+        best_score, best_label = scores[0]
+        second_score = scores[1][0] if len(scores) > 1 else -1.0
+
+        if best_score >= self.min_similarity and best_score - second_score >= self.min_margin:
+            return best_label, best_score
+        return None, best_score
+
+    def route(self, question):
+        """
+        分类客服问题
+
+        Returns:
+            (类别, 来源)，来源为 rule / embedding；不确定时返回 (None, None)
+        """
+        label = self.match_rules(question)
+        if label is not None:
+            self.counters["rule"] += 1
+            return label, "rule"
+
+        label, _ = self.match_embedding(question)
+        if label is not None:
+            self.counters["embedding"] += 1
+            return label, "embedding"
+
+        self.counters["fallback"] += 1
+        return None, None
+
+    def stats(self):
+        """返回各来源的分类次数：rule / embedding / fallback"""
+        return dict(self.counters)
+
+
+_shared_router = None
+_shared_lock = threading.Lock()
+
+
+def get_intent_router():
+    """获取进程内共享的意图分类器"""
+    global _shared_router
+    with _shared_lock:
+        if _shared_router is None:
+            _shared_router = IntentRouter()
+        return _shared_router
@@ -6,9 +6,35 @@ IT审计专家Agent - LLM校验模块
 import os
 import json
 import re
+import threading
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key: str = None, base_url: str = None):
+    """
+    获取（或复用）OpenAI 客户端
+    相同接口地址和 API Key 共用一个客户端，底层 HTTP 连接池和 keep-alive 连接在多次校验之间复用
+    
+    Args:
+        api_key: API Key
+        base_url: 接口地址
+    
+    Returns:
+        openai.OpenAI 实例
+    """
+    import openai
+    
+    key = (api_key, base_url)
+    with _openai_clients_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = _openai_clients[key] = openai.OpenAI(base_url=base_url, api_key=api_key)
+        return client
+
 
 class LLMVerifier:
     """LLM校验器 - 对向量模型的匹配结果进行逻辑校验"""
@@ -98,12 +124,7 @@ class LLMVerifier:
     def _call_llm(self, prompt: str) -> str:
         """调用LLM API"""
         try:
-            import openai
-            
-            client = openai.OpenAI(
-                base_url=self.api_base,
-                api_key=self.api_key
-            )
+            client = get_openai_client(api_key=self.api_key, base_url=self.api_base)
             
             response = client.chat.completions.create(
                 model=self.model,
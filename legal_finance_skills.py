@@ -7,8 +7,9 @@
 from typing import Dict, List
 from langchain.tools import tool
 from skill_loader import create_skill_loader
+from skill_index import search_skill_chunks
 
-# 初始化技能加载器，从 SKILL.md 文件加载知识
+# 共享的技能加载器，从 SKILL.md 文件加载知识
 _skill_loader = create_skill_loader()
 
 # 保留原有的硬编码知识库作为备用（当 SKILL.md 加载失败时使用）
@@ -68,6 +69,39 @@ FINANCIAL_KNOWLEDGE_BASE = {
 }
 
 
+# 主题关键词到技能名的查询扩展表，命中的技能名会追加到检索文本中
+LEGAL_TOPIC_ALIASES = {
+    "合同审查": "contract-review",
+    "合同": "contract-review",
+    "contract": "contract-review",
+    "合规检查": "compliance",
+    "合规": "compliance",
+    "compliance": "compliance",
+    "GDPR": "compliance",
+    "NDA分类": "nda-triage",
+    "NDA": "nda-triage",
+    "法律风险评估": "legal-risk-assessment",
+    "风险评估": "legal-risk-assessment",
+    "会议简报": "meeting-briefing",
+    "模板化响应": "canned-responses",
+}
+
+FINANCIAL_TOPIC_ALIASES = {
+    "财务报表": "financial-statements",
+    "利润表": "financial-statements",
+    "资产负债表": "financial-statements",
+    "现金流量表": "financial-statements",
+    "差异分析": "variance-analysis",
+    "日记账": "journal-entry-prep",
+    "账户对账": "reconciliation",
+    "对账": "reconciliation",
+    "月末结账": "close-management",
+    "审计支持": "audit-support",
+    "审计": "audit-support",
+    "SOX": "audit-support",
+}
+
+
 def _get_skill_content(category, skill_name):
     """从 SKILL.md 获取技能内容"""
     skill = _skill_loader.get_skill(category, skill_name)
@@ -80,7 +114,7 @@ def _get_skill_content(category, skill_name):
 def search_legal_knowledge(topic: str) -> str:
     """
     搜索法律相关知识，包括合同审查、合规检查、法律风险评估等
-    优先从 SKILL.md 文件加载专业知识
+    优先从 SKILL.md 分块索引中检索最相关的片段
 
     Args:
         topic: 法律主题，例如"合同审查"、"合规检查"、"GDPR"、"DPA审查"等
@@ -88,35 +122,10 @@ def search_legal_knowledge(topic: str) -> str:
     Returns:
         法律专业知识
     """
-    # 尝试从 SKILL.md 获取知识
-    skill_mapping = {
-        "合同审查": "contract-review",
-        "合同": "contract-review",
-        "contract": "contract-review",
-        "合规检查": "compliance",
-        "合规": "compliance",
-        "compliance": "compliance",
-        "GDPR": "compliance",
-        "NDA分类": "nda-triage",
-        "NDA": "nda-triage",
-        "法律风险评估": "legal-risk-assessment",
-        "风险评估": "legal-risk-assessment",
-        "会议简报": "meeting-briefing",
-        "模板化响应": "canned-responses",
-    }
-    
-    # 查找匹配的技能
-    skill_name = None
-    for key, value in skill_mapping.items():
-        if key.lower() in topic.lower():
-            skill_name = value
-            break
-    
-    # 如果找到匹配的技能，从 SKILL.md 获取内容
-    if skill_name:
-        content = _get_skill_content("legal", skill_name)
-        if content:
-            return "【法律知识库 - 从SKILL.md加载】\n" + content
+    # 从 SKILL.md 分块索引中检索最相关的片段
+    content = search_skill_chunks(topic, "legal", aliases=LEGAL_TOPIC_ALIASES)
+    if content:
+        return "【法律知识库 - SKILL.md相关片段】\n" + content
     
     # 回退到硬编码知识库
     info = LEGAL_KNOWLEDGE_BASE.get(topic, {})
@@ -140,7 +149,7 @@ def search_legal_knowledge(topic: str) -> str:
 def search_financial_knowledge(topic: str) -> str:
     """
     搜索财务相关知识，包括财务报表、差异分析、日记账准备等
-    优先从 SKILL.md 文件加载专业知识
+    优先从 SKILL.md 分块索引中检索最相关的片段
 
     Args:
         topic: 财务主题，例如"财务报表"、"差异分析"、"GAAP"、"日记账"等
@@ -148,34 +157,10 @@ def search_financial_knowledge(topic: str) -> str:
     Returns:
         财务专业知识
     """
-    # 尝试从 SKILL.md 获取知识
-    skill_mapping = {
-        "财务报表": "financial-statements",
-        "利润表": "financial-statements",
-        "资产负债表": "financial-statements",
-        "现金流量表": "financial-statements",
-        "差异分析": "variance-analysis",
-        "日记账": "journal-entry-prep",
-        "账户对账": "reconciliation",
-        "对账": "reconciliation",
-        "月末结账": "close-management",
-        "审计支持": "audit-support",
-        "审计": "audit-support",
-        "SOX": "audit-support",
-    }
-    
-    # 查找匹配的技能
-    skill_name = None
-    for key, value in skill_mapping.items():
-        if key.lower() in topic.lower():
-            skill_name = value
-            break
-    
-    # 如果找到匹配的技能，从 SKILL.md 获取内容
-    if skill_name:
-        content = _get_skill_content("finance", skill_name)
-        if content:
-            return "【财务知识库 - 从SKILL.md加载】\n" + content
+    # 从 SKILL.md 分块索引中检索最相关的片段
+    content = search_skill_chunks(topic, "finance", aliases=FINANCIAL_TOPIC_ALIASES)
+    if content:
+        return "【财务知识库 - SKILL.md相关片段】\n" + content
     
     # 回退到硬编码知识库
     info = FINANCIAL_KNOWLEDGE_BASE.get(topic, {})
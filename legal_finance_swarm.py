@@ -2,10 +2,12 @@
 """
 法律财务专家协调系统 - 使用模块化的Agent定义
 每个Agent都有独立的定义文件，放在 agents/ 目录下
+
+agent_framework / agents 在创建编排器时才导入，--help 等不需要大模型的命令行操作不加载 LangChain
 """
+import json
 import asyncio
-from agent_framework import CoordinatorAgent, AgentOrchestrator
-from agents import LEGAL_EXPERT_CONFIG, FINANCE_EXPERT_CONFIG
+import argparse
 
 
 def create_expert_configs():
@@ -13,6 +15,8 @@ def create_expert_configs():
     创建法律财务专家Agent配置
     从 agents 模块加载独立定义的 Agent 配置
     """
+    from agents import LEGAL_EXPERT_CONFIG, FINANCE_EXPERT_CONFIG
+    
     return {
         LEGAL_EXPERT_CONFIG.name: LEGAL_EXPERT_CONFIG,
         FINANCE_EXPERT_CONFIG.name: FINANCE_EXPERT_CONFIG
@@ -26,6 +30,8 @@ def create_legal_finance_orchestrator():
     Returns:
         AgentOrchestrator实例
     """
+    from agent_framework import CoordinatorAgent, AgentOrchestrator
+    
     print("=" * 80)
     print("初始化法律财务专家协调系统")
     print("=" * 80)
@@ -93,6 +99,110 @@ def run_legal_finance(request, max_rounds=2):
     return asyncio.run(run_legal_finance_async(request, max_rounds))
 
 
+def load_requests(path):
+    """
+    从 JSONL 文件读取批量需求
+    每行可以是 JSON 字符串，或包含 request / body 字段的对象（有 title 时拼在 body 前面）
+    
+    Args:
+        path: JSONL 文件路径
+        
+    Returns:
+        需求文本列表
+    """
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                requests.append(item)
+            elif item.get("request"):
+                requests.append(item["request"])
+            elif item.get("body"):
+                title = item.get("title")
+                requests.append(f"{title}\n{item['body']}" if title else item["body"])
+    return requests
+
+
+async def run_legal_finance_batch_async(requests, max_rounds=2, concurrency=None, on_result=None):
+    """
+    异步批量运行法律财务专家系统，所有需求共用一个编排器
+    
+    Args:
+        requests: 用户需求列表
+        max_rounds: 每个需求的最大轮数
+        concurrency: 同时执行的需求数
+        on_result: 每个需求完成时的回调，参数为单条结果
+        
+    Returns:
+        AgentOrchestrator.run_batch 的结果列表
+    """
+    orchestrator = create_legal_finance_orchestrator()
+    
+    return await orchestrator.run_batch(requests, max_rounds, concurrency, on_result)
+
+
+def run_legal_finance_batch(requests, max_rounds=2, concurrency=None, on_result=None):
+    """
+    同步批量运行法律财务专家系统
+    
+    Args:
+        requests: 用户需求列表
+        max_rounds: 每个需求的最大轮数
+        concurrency: 同时执行的需求数
+        on_result: 每个需求完成时的回调，参数为单条结果
+        
+    Returns:
+        结果列表（与输入顺序一致）
+    """
+    return asyncio.run(run_legal_finance_batch_async(requests, max_rounds, concurrency, on_result))
+
+
+async def astream_legal_finance(request, max_rounds=2):
+    """
+    以流式事件的方式运行法律财务专家系统
+    
+    Args:
+        request: 用户需求
+        max_rounds: 最大轮数
+        
+    Yields:
+        AgentOrchestrator.astream_run 产出的事件
+    """
+    orchestrator = create_legal_finance_orchestrator()
+    
+    async for event in orchestrator.astream_run(request, max_rounds):
+        yield event
+
+
+async def _print_stream(request, max_rounds):
+    """流式打印专家输出和分析报告，返回最终报告"""
+    current = None
+    summary = ""
+    
+    async for event in astream_legal_finance(request, max_rounds):
+        if event["type"] == "token":
+            if current != event["agent_name"]:
+                current = event["agent_name"]
+                print(f"\n\n【{current}】", flush=True)
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "summary_token":
+            if current != "summary":
+                current = "summary"
+                print("\n\n" + "=" * 80)
+                print("分析报告")
+                print("=" * 80, flush=True)
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "done":
+            summary = event["summary"]
+    
+    print("\n" + "=" * 80)
+    return summary
+
+
 def interactive_legal_finance():
     """交互式法律财务专家系统"""
     print("\n" + "=" * 80)
@@ -116,13 +226,7 @@ def interactive_legal_finance():
         
         try:
             print(f"\n开始分析...")
-            summary = run_legal_finance(user_input, max_rounds)
-            
-            print("\n" + "=" * 80)
-            print("分析报告")
-            print("=" * 80)
-            print(summary)
-            print("=" * 80)
+            asyncio.run(_print_stream(user_input, max_rounds))
             
         except Exception as e:
             print(f"\n【错误】发生异常: {str(e)}")
@@ -130,5 +234,17 @@ def interactive_legal_finance():
             traceback.print_exc()
 
 
+def main():
+    parser = argparse.ArgumentParser(description="法律财务专家协调系统")
+    parser.add_argument("request", nargs="?", help="需求文本，省略时进入交互模式")
+    parser.add_argument("--max-rounds", type=int, default=2, help="最大分析轮数")
+    args = parser.parse_args()
+    
+    if args.request:
+        asyncio.run(_print_stream(args.request, args.max_rounds))
+    else:
+        interactive_legal_finance()
+
+
 if __name__ == "__main__":
-    interactive_legal_finance()
+    main()
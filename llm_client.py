@@ -0,0 +1,189 @@
+"""
+共享大模型客户端
+所有模块通过本模块创建 ChatOpenAI / OpenAI 客户端，底层共用同一个带连接池和 keep-alive 的 HTTP 传输层，
+避免每个模块、每次调用各自建立 TCP/TLS 连接。
+
+连接池参数通过环境变量配置：
+- LLM_HTTP_MAX_CONNECTIONS: 最大连接数（默认 100）
+- LLM_HTTP_MAX_KEEPALIVE: 最大空闲 keep-alive 连接数（默认 20）
+- LLM_HTTP_KEEPALIVE_EXPIRY: 空闲连接保留秒数（默认 60）
+- LLM_HTTP_TIMEOUT: 请求超时秒数（默认 120）
+"""
+import os
+import asyncio
+import threading
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_lock = threading.Lock()
+_sync_client = None
+_async_client = None
+_chat_models = {}
+_openai_clients = {}
+
+
+def _env_number(name, default, cast=int):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return cast(value.strip())
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=_env_number("LLM_HTTP_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=_env_number("LLM_HTTP_MAX_KEEPALIVE", 20),
+        keepalive_expiry=_env_number("LLM_HTTP_KEEPALIVE_EXPIRY", 60.0, float)
+    )
+
+
+def _timeout():
+    return httpx.Timeout(_env_number("LLM_HTTP_TIMEOUT", 120.0, float), connect=10.0)
+
+
+class _LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    按事件循环隔离的异步连接池
+    异步连接绑定在创建它的事件循环上，同步入口每次 asyncio.run 都会新建事件循环，
+    因此每个事件循环各自维护一个连接池。连接池创建时在该事件循环中登记一个异步生成器，
+    asyncio.run 结束前调用 loop.shutdown_asyncgens() 时生成器收尾，关闭连接池并移除登记；
+    未经 shutdown_asyncgens 就关闭的事件循环，其连接池在下次新建连接池时清理
+    """
+
+    def __init__(self, limits):
+        self._limits = limits
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    async def _close_on_shutdown(self, loop, transport):
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._transports.get(loop, (None,))[0] is transport:
+                    del self._transports[loop]
+            await transport.aclose()
+
+    def _prune_closed(self):
+        with self._lock:
+            closed = [loop for loop in self._transports if loop.is_closed()]
+            for loop in closed:
+                del self._transports[loop]
+
+    async def _transport(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._transports.get(loop)
+        if entry is not None:
+            return entry[0]
+
+        self._prune_closed()
+        transport = httpx.AsyncHTTPTransport(limits=self._limits)
+        closer = self._close_on_shutdown(loop, transport)
+        with self._lock:
+            entry = self._transports.setdefault(loop, (transport, closer))
+        if entry[1] is closer:
+            # 第一次迭代时事件循环登记该生成器，退出时由 shutdown_asyncgens 收尾
+            await closer.__anext__()
+        return entry[0]
+
+    async def handle_async_request(self, request):
+        transport = await self._transport()
+        return await transport.handle_async_request(request)
+
+    async def aclose(self):
+        with self._lock:
+            entry = self._transports.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[1].aclose()
+
+
+def get_http_client():
+    """获取共享的同步 HTTP 客户端"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=_limits(), timeout=_timeout())
+        return _sync_client
+
+
+def get_async_http_client():
+    """获取共享的异步 HTTP 客户端"""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(transport=_LoopLocalTransport(_limits()), timeout=_timeout())
+        return _async_client
+
+
+def _ark_settings(model=None, api_key=None, base_url=None):
+    return (
+        (model or os.getenv("ARK_CHAT_MODEL") or "").strip(),
+        (api_key or os.getenv("ARK_API_KEY") or "").strip(),
+        (base_url or os.getenv("ARK_BASE_URL") or "").strip()
+    )
+
+
+def create_chat_model(model=None, temperature=0.7, api_key=None, base_url=None):
+    """
+    创建（或复用）使用共享连接池的 ChatOpenAI
+
+    Args:
+        model: 模型名，默认读取 ARK_CHAT_MODEL
+        temperature: 温度
+        api_key: API Key，默认读取 ARK_API_KEY
+        base_url: 接口地址，默认读取 ARK_BASE_URL
+
+    Returns:
+        ChatOpenAI 实例，相同参数返回同一个实例
+    """
+    from langchain_openai import ChatOpenAI
+
+    model, api_key, base_url = _ark_settings(model, api_key, base_url)
+    key = (model, temperature, api_key, base_url)
+    with _lock:
+        cached = _chat_models.get(key)
+    if cached is not None:
+        return cached
+
+    chat_model = ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=temperature,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    )
+    with _lock:
+        return _chat_models.setdefault(key, chat_model)
+
+
+def get_openai_client(api_key=None, base_url=None, async_client=False):
+    """
+    获取使用共享连接池的 openai SDK 客户端，供直接调用 openai 接口的模块使用
+
+    Args:
+        api_key: API Key，默认读取 ARK_API_KEY
+        base_url: 接口地址，默认读取 ARK_BASE_URL
+        async_client: True 返回 AsyncOpenAI，否则返回 OpenAI
+
+    Returns:
+        OpenAI / AsyncOpenAI 实例，相同参数返回同一个实例
+    """
+    import openai
+
+    _, api_key, base_url = _ark_settings(None, api_key, base_url)
+    key = (api_key, base_url, async_client)
+    with _lock:
+        cached = _openai_clients.get(key)
+    if cached is not None:
+        return cached
+
+    if async_client:
+        client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=get_async_http_client())
+    else:
+        client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=get_http_client())
+    with _lock:
+        return _openai_clients.setdefault(key, client)
@@ -0,0 +1,220 @@
+"""
+大模型调用调度器
+为并发的大模型调用提供：按模型的并发上限、令牌桶限流（请求数/分钟、Token数/分钟）、按优先级排队
+"""
+import os
+import re
+import time
+import heapq
+import asyncio
+import itertools
+import contextlib
+
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff\u3000-\u303f\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的Token数
+    中文字符按1个Token计，其余字符按4个字符1个Token计
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return int(value.strip())
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+    per_minute 为每分钟额度，令牌按 per_minute/60 每秒匀速补充。
+    采用预约方式扣减：额度不足时记为欠账，调用方按欠账时长等待，天然先来先服务
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount=1):
+        """
+        获取令牌，额度不足时等待
+
+        Args:
+            amount: 需要的令牌数，超过桶容量时按桶容量计，避免永远等不到
+
+        Returns:
+            实际等待的秒数
+        """
+        amount = min(float(amount), self.capacity)
+        self._refill()
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+
+        wait = -self.tokens / self.rate
+        await asyncio.sleep(wait)
+        return wait
+
+
+class PrioritySlots:
+    """
+    带优先级的并发槽位
+    槽位已满时按 (priority, 到达顺序) 排队，priority 数字越小越先获得槽位
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority=1):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 槽位已经移交给本调用方但调用方被取消，需要归还
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            # 进程级调度器会跨事件循环复用，已关闭循环上遗留的等待者直接丢弃
+            if not future.done() and not future.get_loop().is_closed():
+                # 槽位直接移交给下一个等待者，active 不变
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def waiting(self):
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+
+class _ModelLimits:
+    """单个模型的并发槽位与限流桶"""
+
+    def __init__(self, max_concurrency, requests_per_minute, tokens_per_minute):
+        self.slots = PrioritySlots(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+
+class LLMDispatcher:
+    """
+    大模型调用调度器
+    每个模型独立计算并发上限和限流额度，未配置的限流项不生效
+
+    配置优先级：构造参数 > 环境变量 > 默认值
+    - LLM_MAX_CONCURRENCY: 每个模型的最大并发数（默认8）
+    - LLM_REQUESTS_PER_MINUTE: 每个模型每分钟请求数上限（默认不限）
+    - LLM_TOKENS_PER_MINUTE: 每个模型每分钟Token数上限（默认不限）
+    """
+
+    def __init__(self, max_concurrency=None, requests_per_minute=None, tokens_per_minute=None):
+        self.max_concurrency = max_concurrency or _env_int("LLM_MAX_CONCURRENCY", 8)
+        self.requests_per_minute = requests_per_minute or _env_int("LLM_REQUESTS_PER_MINUTE", 0)
+        self.tokens_per_minute = tokens_per_minute or _env_int("LLM_TOKENS_PER_MINUTE", 0)
+        self._limits = {}
+
+    def _limits_for(self, model):
+        if model not in self._limits:
+            self._limits[model] = _ModelLimits(
+                self.max_concurrency,
+                self.requests_per_minute,
+                self.tokens_per_minute
+            )
+        return self._limits[model]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority=1, model=None, estimated_tokens=0):
+        """
+        在并发上限和限流额度内占用一个调用槽位，适用于流式调用等需要在整个过程中持有槽位的场景
+
+        Args:
+            priority: 优先级，数字越小越先执行
+            model: 模型名称，用于区分限流额度
+            estimated_tokens: 预估消耗的Token数，用于Token/分钟限流
+
+        Yields:
+            排队等待秒数
+        """
+        limits = self._limits_for(model)
+        queued_at = time.monotonic()
+
+        await limits.slots.acquire(priority)
+        try:
+            if limits.request_bucket:
+                await limits.request_bucket.acquire(1)
+            if limits.token_bucket and estimated_tokens:
+                await limits.token_bucket.acquire(estimated_tokens)
+
+            yield time.monotonic() - queued_at
+        finally:
+            limits.slots.release()
+
+    async def submit(self, coro_factory, priority=1, model=None, estimated_tokens=0):
+        """
+        在并发上限和限流额度内执行一次大模型调用
+
+        Args:
+            coro_factory: 无参函数，返回实际执行调用的协程
+            priority: 优先级，数字越小越先执行
+            model: 模型名称，用于区分限流额度
+            estimated_tokens: 预估消耗的Token数，用于Token/分钟限流
+
+        Returns:
+            (调用结果, 排队等待秒数)
+        """
+        async with self.slot(priority, model, estimated_tokens) as queue_wait:
+            result = await coro_factory()
+            return result, queue_wait
+
+    def stats(self):
+        """返回各模型当前的并发与排队情况"""
+        return {
+            model: {
+                "active": limits.slots.active,
+                "waiting": limits.slots.waiting,
+                "limit": limits.slots.limit
+            }
+            for model, limits in self._limits.items()
+        }
+
+
+_default_dispatcher = None
+
+
+def get_dispatcher():
+    """
+    获取进程级共享的调度器，第一次调用时按环境变量配置创建
+    同一进程内所有编排器、协调员和汇总调用共用它，每个模型的并发上限和限流额度因此是全局的
+
+    Returns:
+        LLMDispatcher 实例
+    """
+    global _default_dispatcher
+    if _default_dispatcher is None:
+        _default_dispatcher = LLMDispatcher()
+    return _default_dispatcher
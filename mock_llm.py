@@ -0,0 +1,250 @@
+"""
+离线假大模型
+进程内替代 ChatOpenAI，用于在不访问 Ark 接口的情况下测试和压测编排流程：
+- 可配置首 Token 延迟分布（固定 / 均匀 / 对数正态 / 指数）和输出速度（Token/秒）
+- 可按比例注入调用失败和长时间卡顿
+- 可模拟服务端前缀缓存：按消息边界记录已处理过的前缀，命中部分不计预填充耗时，
+  并在 usage_metadata.input_token_details.cache_read 中报告命中的Token数
+- 按提示词识别协调员、充分性评审、汇总专家，返回格式正确的回复，其余按专家输出处理
+- 回复带 usage_metadata，telemetry 能照常统计 Token
+
+用法：
+    with install_mock_llm(MockChatModel(latency_ms=200, fan_out=3)) as mock:
+        asyncio.run(orchestrator.run("需求"))
+        print(mock.stats())
+"""
+import re
+import json
+import math
+import hashlib
+import random
+import asyncio
+import importlib
+import threading
+from contextlib import contextmanager
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from llm_dispatcher import estimate_tokens
+
+_AGENT_LINE_PATTERN = re.compile(r'^- ([\w\-]+): ', re.MULTILINE)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "exponential")
+
+
+class MockLLMError(RuntimeError):
+    """注入的模拟调用失败，按服务端 503 处理（可重试）"""
+
+    status_code = 503
+
+
+class MockChatModel:
+    """
+    进程内假聊天模型，接口与 agent_framework 用到的 ChatOpenAI 方法一致
+
+    Args:
+        latency_ms: 首 Token 延迟（毫秒）；lognormal 为中位数，exponential 为均值
+        distribution: 延迟分布，fixed / uniform / lognormal / exponential
+        jitter: uniform 为相对波动幅度（±jitter），lognormal 为 sigma
+        tokens_per_second: 输出速度，0 表示输出不额外耗时
+        output_tokens: 专家回复的长度（Token）
+        fan_out: 协调员每次规划指派的专家数
+        failure_rate: 调用直接失败（抛出 MockLLMError）的比例
+        stall_rate: 调用卡顿的比例，卡顿时额外等待 stall_seconds
+        stall_seconds: 卡顿时长
+        prefill_tokens_per_second: 输入（预填充）处理速度，0 表示输入不额外耗时
+        prefix_cache: 是否模拟前缀缓存
+        seed: 随机种子
+    """
+
+    def __init__(self, latency_ms=0, distribution="fixed", jitter=0.5, tokens_per_second=0,
+                 output_tokens=200, fan_out=2, failure_rate=0.0, stall_rate=0.0, stall_seconds=30.0,
+                 prefill_tokens_per_second=0, prefix_cache=False, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延迟分布: {distribution}，可选 {LATENCY_DISTRIBUTIONS}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.fan_out = fan_out
+        self.failure_rate = failure_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.prefix_cache = prefix_cache
+        self._prefixes = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.stalls = 0
+        self.simulated_seconds = 0.0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def bind(self, **kwargs):
+        """兼容 llm.bind(response_format=...)，假模型总是返回合法 JSON"""
+        return self
+
+    def bind_tools(self, tools, **kwargs):
+        """兼容 llm.bind_tools(...)，假模型不发起工具调用"""
+        return self
+
+    def _sample_latency(self):
+        base = self.latency_ms / 1000
+        if base <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return max(0.0, base * self._random.uniform(1 - self.jitter, 1 + self.jitter))
+        if self.distribution == "lognormal":
+            return base * math.exp(self._random.gauss(0, self.jitter))
+        if self.distribution == "exponential":
+            return self._random.expovariate(1 / base)
+        return base
+
+    def _plan(self, text):
+        """从协调员提示词中解析可用专家，按 fan_out 生成任务计划"""
+        agents = _AGENT_LINE_PATTERN.findall(text)
+        return {
+            "task_assignments": [
+                {
+                    "task_id": f"t{i + 1}",
+                    "agent_name": agents[i % len(agents)],
+                    "task_description": f"子任务{i + 1}",
+                    "priority": 1,
+                    "depends_on": []
+                }
+                for i in range(self.fan_out if agents else 0)
+            ],
+            "explanation": "模拟规划"
+        }
+
+    def _cached_prefix_tokens(self, contents):
+        """
+        按消息边界查找已缓存的最长前缀并登记本次请求的全部前缀
+
+        Returns:
+            命中缓存的Token数
+        """
+        digest = hashlib.sha1()
+        tokens = 0
+        cached = 0
+        with self._lock:
+            for content in contents:
+                digest.update(content.encode("utf-8") + b"\x00")
+                tokens += estimate_tokens(content)
+                key = digest.hexdigest()
+                if key in self._prefixes:
+                    cached = tokens
+                else:
+                    self._prefixes[key] = tokens
+        return cached
+
+    def _reply(self, text):
+        if "任务协调员" in text:
+            return json.dumps(self._plan(text), ensure_ascii=False)
+        if "调研质量评审员" in text:
+            return json.dumps({"sufficient": True, "missing": ""})
+        if "调研报告汇总专家" in text:
+            return "模拟调研报告。" + "结" * self.output_tokens
+        return "模拟专家输出。" + "析" * self.output_tokens
+
+    async def _prepare(self, messages):
+        """
+        按配置注入失败、卡顿和未命中缓存部分的预填充耗时，返回 (回复, 首 Token 延迟, 输出耗时, usage)
+        """
+        contents = [messages] if isinstance(messages, str) else [str(m.content) for m in messages]
+        text = "\n".join(contents)
+        input_tokens = estimate_tokens(text)
+        cached = min(input_tokens, self._cached_prefix_tokens(contents)) if self.prefix_cache else 0
+        prefill = (input_tokens - cached) / self.prefill_tokens_per_second if self.prefill_tokens_per_second else 0.0
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+            stall = not fail and self._random.random() < self.stall_rate
+            latency = self._sample_latency() + prefill
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached
+            if fail:
+                self.failures += 1
+            if stall:
+                self.stalls += 1
+                latency += self.stall_seconds
+
+        if fail:
+            await asyncio.sleep(latency)
+            raise MockLLMError("模拟大模型调用失败")
+
+        reply = self._reply(text)
+        output_tokens = estimate_tokens(reply)
+        generation = output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        with self._lock:
+            self.simulated_seconds += latency + generation
+
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached}
+        }
+        return reply, latency, generation, usage
+
+    async def ainvoke(self, messages, **kwargs):
+        reply, latency, generation, usage = await self._prepare(messages)
+        await asyncio.sleep(latency + generation)
+        return AIMessage(content=reply, usage_metadata=usage)
+
+    def invoke(self, messages, **kwargs):
+        return asyncio.run(self.ainvoke(messages, **kwargs))
+
+    async def astream(self, messages, **kwargs):
+        reply, latency, generation, usage = await self._prepare(messages)
+        await asyncio.sleep(latency)
+        step = 16
+        chunks = [reply[i:i + step] for i in range(0, len(reply), step)]
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(generation / len(chunks))
+            last = index == len(chunks) - 1
+            yield AIMessageChunk(content=chunk, usage_metadata=usage if last else None)
+
+    def stats(self):
+        """返回调用次数、注入的失败/卡顿次数、输入/缓存命中Token数和模拟耗时合计"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "stalls": self.stalls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "simulated_seconds": round(self.simulated_seconds, 3)
+            }
+
+
+@contextmanager
+def install_mock_llm(model=None, modules=("agent_framework",)):
+    """
+    临时把指定模块的 llm 替换为假模型，退出时恢复
+
+    Args:
+        model: MockChatModel 实例或其他假模型，默认创建零延迟的 MockChatModel
+        modules: 要替换 llm 属性的模块名
+
+    Yields:
+        使用的假模型
+    """
+    model = model or MockChatModel()
+    targets = [importlib.import_module(name) for name in modules]
+    # 只读取已替换的模型，不经模块的 __getattr__，避免为此创建真实客户端（离线时没有 Ark 配置）
+    originals = [vars(target).get("llm") for target in targets]
+    for target in targets:
+        target.llm = model
+    try:
+        yield model
+    finally:
+        for target, original in zip(targets, originals):
+            if original is None:
+                del target.llm
+            else:
+                target.llm = original
@@ -0,0 +1,476 @@
+"""
+调研数据后端
+research_skills 的四个查询工具（市场/竞争对手/技术/财务）通过统一的后端接口查数据，
+数据按集合（market / competitor / technical / financial）组织，每条记录为 名称 -> {字段: 内容}。
+
+- DictBackend: 进程内字典，适合内置的少量示例数据
+- SQLiteBackend: SQLite 存储，名称建有索引（精确/前缀查询走索引），
+  字段内容进 FTS5 trigram 全文索引（模糊/全文查询），支持从 CSV/JSON 批量导入，
+  数据量到数万个公司和行业时查询耗时不随数据量线性增长；WAL 模式下每个线程使用自己的只读连接，
+  多个查询可以真正并发执行，写入经单独的连接串行进行
+
+两种后端的 lookup() 按 精确 → 前缀 → 文本中出现的名称 → 模糊 的顺序查找，结果经过 LRU 缓存；
+展示文本在导入时生成一次，工具调用时不再重新拼接。
+alookup_many() 供批量工具使用：缓存命中的直接返回，其余并发查询，耗时取决于最慢的一条而不是总和。
+"""
+import os
+import csv
+import asyncio
+import json
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict
+
+from tool_matcher import AhoCorasick
+
+COLLECTIONS = ("market", "competitor", "technical", "financial")
+
+
+def format_fields(fields):
+    """把字段字典格式化为 "字段: 内容" 多行文本"""
+    return "\n".join(f"{k}: {v}" for k, v in fields.items())
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _coverage(query, record):
+    """查询的三元字组在记录名称和内容中出现的比例，用于判断模糊匹配是否可信"""
+    grams = _trigrams(query)
+    if not grams:
+        return 0.0
+    haystack = f"{record['name']}\n{record['text']}".lower()
+    return sum(1 for g in grams if g in haystack) / len(grams)
+
+
+def _normalize_records(records):
+    """
+    统一记录格式
+
+    Args:
+        records: {名称: {字段: 内容}}、[{"name": 名称, 其他字段...}, ...] 或 [(名称, {字段: 内容}), ...]
+
+    Returns:
+        [(名称, {字段: 内容}), ...]
+    """
+    if isinstance(records, dict):
+        return [(str(name), dict(fields)) for name, fields in records.items()]
+    rows = []
+    for record in records:
+        if isinstance(record, tuple):
+            rows.append((str(record[0]), dict(record[1])))
+            continue
+        record = dict(record)
+        name = str(record.pop("name")).strip()
+        rows.append((name, {k: v for k, v in record.items() if v not in (None, "")}))
+    return rows
+
+
+def read_records(path):
+    """
+    读取批量导入文件
+
+    Args:
+        path: .json（{名称: {字段: 内容}} 或记录列表）、.jsonl 或 .csv（需要 name 列，其余列为字段）
+
+    Returns:
+        [(名称, {字段: 内容}), ...]
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.endswith(".csv"):
+            return _normalize_records(csv.DictReader(f))
+        if path.endswith(".jsonl"):
+            return _normalize_records([json.loads(line) for line in f if line.strip()])
+        return _normalize_records(json.load(f))
+
+
+class ResearchBackend:
+    """
+    调研数据后端基类，子类实现 names / count / load / _exact / _prefix / _search
+
+    Args:
+        cache_size: lookup 结果 LRU 缓存的最大条数
+    """
+
+    def __init__(self, cache_size=1024):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._matchers = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, loader):
+        """读穿缓存：命中直接返回，未命中时调用 loader 并缓存（包括查不到的 None）"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        value = loader()
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def _peek(self, key):
+        """只查缓存，返回 (是否命中, 结果)"""
+        with self._lock:
+            if key not in self._cache:
+                return False, None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return True, self._cache[key]
+
+    def _invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._matchers.clear()
+
+    def _name_in_text(self, collection, text):
+        """找出文本中出现的最长名称，自动机按集合编译一次"""
+        with self._lock:
+            matcher = self._matchers.get(collection)
+        if matcher is None:
+            matcher = AhoCorasick(self.names(collection))
+            with self._lock:
+                self._matchers[collection] = matcher
+        names = {matcher.patterns[pattern_id] for _, pattern_id in matcher.finditer(text)}
+        return max(names, key=len) if names else None
+
+    def lookup(self, collection, query, min_coverage=0.5):
+        """
+        查询一条记录：精确 → 前缀 → 文本中出现的名称 → 模糊（三元字组覆盖率不低于 min_coverage）
+
+        Args:
+            collection: 集合名
+            query: 名称或包含名称的文本
+
+        Returns:
+            {"name", "fields", "text"}，查不到时返回 None
+        """
+        query = query.strip()
+
+        def load():
+            if not query:
+                return None
+            record = self._exact(collection, query) or self._prefix(collection, query)
+            if record is None:
+                name = self._name_in_text(collection, query)
+                record = self._exact(collection, name) if name else None
+            if record is None:
+                candidates = self._search(collection, query, 3)
+                record = next((r for r in candidates if _coverage(query, r) >= min_coverage), None)
+            return record
+
+        return self._cached((collection, query), load)
+
+    def lookup_many(self, collection, queries):
+        """按顺序查询多条，返回与 queries 一一对应的结果列表"""
+        return [self.lookup(collection, query) for query in queries]
+
+    async def alookup_many(self, collection, queries):
+        """
+        异步批量查询：缓存命中的直接返回，未命中的各自在线程中并发查询
+        远程数据源的后端可覆盖为原生异步实现
+
+        Returns:
+            与 queries 一一对应的结果列表
+        """
+        async def lookup_one(query):
+            hit, record = self._peek((collection, query.strip()))
+            if hit:
+                return record
+            return await asyncio.to_thread(self.lookup, collection, query)
+
+        return list(await asyncio.gather(*[lookup_one(query) for query in queries]))
+
+    def search(self, collection, query, limit=10):
+        """
+        全文检索名称和字段内容
+
+        Returns:
+            [{"name", "fields", "text"}, ...]，按相关度排序
+        """
+        return self._search(collection, query.strip(), limit)
+
+    def load_file(self, collection, path):
+        """从 CSV / JSON / JSONL 文件批量导入，返回导入条数"""
+        rows = read_records(path)
+        self.load(collection, rows)
+        return len(rows)
+
+    def names(self, collection):
+        """返回集合中的全部名称"""
+        raise NotImplementedError
+
+    def count(self, collection=None):
+        """返回记录数"""
+        raise NotImplementedError
+
+    def load(self, collection, records):
+        """批量导入记录，名称相同时覆盖"""
+        raise NotImplementedError
+
+    def _exact(self, collection, name):
+        raise NotImplementedError
+
+    def _prefix(self, collection, prefix):
+        raise NotImplementedError
+
+    def _search(self, collection, query, limit):
+        raise NotImplementedError
+
+    def stats(self):
+        """返回缓存命中情况"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached": len(self._cache)}
+
+    def close(self):
+        pass
+
+
+class DictBackend(ResearchBackend):
+    """
+    进程内字典后端
+
+    Args:
+        data: {集合名: {名称: {字段: 内容}}}
+        cache_size: LRU 缓存条数
+    """
+
+    def __init__(self, data=None, cache_size=1024):
+        super().__init__(cache_size)
+        self._data = {collection: {} for collection in COLLECTIONS}
+        self._texts = {}
+        for collection, records in (data or {}).items():
+            self.load(collection, records)
+
+    def _record(self, collection, name):
+        fields = self._data.get(collection, {}).get(name)
+        if fields is None:
+            return None
+        return {"name": name, "fields": fields, "text": self._texts[(collection, name)]}
+
+    def load(self, collection, records):
+        entries = self._data.setdefault(collection, {})
+        for name, fields in _normalize_records(records):
+            entries[name] = fields
+            self._texts[(collection, name)] = format_fields(fields)
+        self._invalidate()
+
+    def names(self, collection):
+        return list(self._data.get(collection, {}))
+
+    def count(self, collection=None):
+        if collection is not None:
+            return len(self._data.get(collection, {}))
+        return sum(len(entries) for entries in self._data.values())
+
+    def _exact(self, collection, name):
+        return self._record(collection, name)
+
+    def _prefix(self, collection, prefix):
+        lowered = prefix.lower()
+        matches = [name for name in self.names(collection) if name.lower().startswith(lowered)]
+        return self._record(collection, min(matches, key=len)) if matches else None
+
+    def _search(self, collection, query, limit):
+        lowered = query.lower()
+        scored = []
+        for name in self.names(collection):
+            record = self._record(collection, name)
+            score = 2 if lowered in name.lower() else (1 if lowered in record["text"].lower() else _coverage(query, record))
+            if score > 0:
+                scored.append((score, name))
+        scored.sort(key=lambda item: (-item[0], len(item[1])))
+        return [self._record(collection, name) for _, name in scored[:limit]]
+
+
+class SQLiteBackend(ResearchBackend):
+    """
+    SQLite 后端：名称索引 + FTS5 trigram 全文索引
+    SQLite 未编译 FTS5 时退化为 LIKE 查询
+
+    建表和导入使用加锁的写连接；查询使用每个线程各自的连接（WAL 模式下读写互不阻塞），
+    alookup_many 的各条查询因此在线程中并发执行。内存数据库（:memory:）无法跨连接共享，查询也走写连接
+
+    Args:
+        path: 数据库文件路径，默认读取 RESEARCH_DB_PATH，否则为 .cache/research.sqlite3
+        cache_size: LRU 缓存条数
+    """
+
+    def __init__(self, path=None, cache_size=1024):
+        super().__init__(cache_size)
+        self.path = path or os.getenv("RESEARCH_DB_PATH", ".cache/research.sqlite3")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._local = threading.local()
+        self._readers = []
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                collection TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                fields TEXT NOT NULL,
+                body TEXT NOT NULL,
+                UNIQUE (collection, name)
+            )
+        """)
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                "USING fts5(name, body, collection UNINDEXED, tokenize='trigram')"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_vocab USING fts5vocab(entries_fts, row)"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            print(f"【调研数据】FTS5 trigram 不可用，模糊查询退化为 LIKE: {e}")
+            self.full_text = False
+        self._conn.commit()
+
+    @contextlib.contextmanager
+    def _reader(self):
+        """当前线程的只读连接，第一次使用时创建"""
+        if self.path == ":memory:":
+            with self._lock:
+                yield self._conn
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        yield conn
+
+    def _row_to_record(self, row):
+        if row is None:
+            return None
+        name, fields, body = row
+        return {"name": name, "fields": json.loads(fields), "text": body}
+
+    def load(self, collection, records):
+        rows = [
+            (collection, name, json.dumps(fields, ensure_ascii=False), format_fields(fields))
+            for name, fields in _normalize_records(records)
+        ]
+        keys = [(collection, name) for _, name, _, _ in rows]
+        with self._lock:
+            if self.full_text:
+                self._conn.executemany(
+                    "DELETE FROM entries_fts WHERE rowid IN "
+                    "(SELECT id FROM entries WHERE collection = ? AND name = ?)",
+                    keys
+                )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (collection, name, fields, body) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            if self.full_text:
+                self._conn.executemany(
+                    "INSERT INTO entries_fts (rowid, name, body, collection) "
+                    "SELECT id, name, body, collection FROM entries WHERE collection = ? AND name = ?",
+                    keys
+                )
+            self._conn.commit()
+        self._invalidate()
+
+    def names(self, collection):
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT name FROM entries WHERE collection = ?", (collection,)
+            )]
+
+    def count(self, collection=None):
+        with self._reader() as conn:
+            if collection is None:
+                return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def _exact(self, collection, name):
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT name, fields, body FROM entries WHERE collection = ? AND name = ?",
+                (collection, name)
+            ).fetchone()
+        return self._row_to_record(row)
+
+    def _prefix(self, collection, prefix):
+        # name 列为 NOCASE，前缀 LIKE 可以走 (collection, name) 唯一索引
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT name, fields, body FROM entries WHERE collection = ? AND name LIKE ? ESCAPE '\\' "
+                "ORDER BY length(name) LIMIT 1",
+                (collection, escaped + "%")
+            ).fetchone()
+        return self._row_to_record(row)
+
+    def _rare_trigrams(self, conn, grams, limit=6, budget=500):
+        """
+        按文档频率从低到高取查询中的三元字组，跳过索引中不存在的
+
+        常见字组命中的文档太多，累计文档频率超过 budget 后不再加入候选召回（至少保留最稀有的一个）
+        """
+        placeholders = ",".join("?" * len(grams))
+        rows = conn.execute(
+            f"SELECT term, doc FROM entries_vocab WHERE term IN ({placeholders})",
+            sorted(grams)
+        ).fetchall()
+        rare = []
+        total = 0
+        for term, doc in sorted(rows, key=lambda row: row[1])[:limit]:
+            if rare and total + doc > budget:
+                break
+            rare.append(term)
+            total += doc
+        return rare
+
+    def _search(self, collection, query, limit):
+        grams = _trigrams(query)
+        with self._reader() as conn:
+            if self.full_text and grams:
+                # 最稀有的几个三元字组任一命中即为候选，按 bm25 排序（名称权重更高），
+                # 候选数取决于字组的稀有程度而不是总数据量
+                rare = self._rare_trigrams(conn, grams)
+                if not rare:
+                    return []
+                expression = " OR ".join('"' + g.replace('"', '""') + '"' for g in rare)
+                rows = conn.execute(
+                    "SELECT entries.name, entries.fields, entries.body FROM entries_fts "
+                    "JOIN entries ON entries.id = entries_fts.rowid "
+                    "WHERE entries_fts MATCH ? AND entries_fts.collection = ? "
+                    "ORDER BY bm25(entries_fts, 10.0, 1.0) LIMIT ?",
+                    (expression, collection, limit)
+                ).fetchall()
+            else:
+                pattern = f"%{query}%"
+                rows = conn.execute(
+                    "SELECT name, fields, body FROM entries WHERE collection = ? AND (name LIKE ? OR body LIKE ?) "
+                    "ORDER BY length(name) LIMIT ?",
+                    (collection, pattern, pattern, limit)
+                ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self._conn.close()
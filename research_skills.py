@@ -2,9 +2,17 @@
 """
 调研场景的技能工具库
 提供各类专家agent使用的专业工具
+
+市场/竞争对手/技术/财务四个查询工具通过 research_backends 中的数据后端查询，
+默认使用内置示例数据；设置 RESEARCH_DB_PATH 或调用 set_research_backend() 可切换到 SQLite 等大数据量后端。
+每个查询工具都有异步批量版本（如 search_competitor_info_batch），请求中提到多个行业/公司时一次并发查询。
 """
+import os
+import threading
 from typing import Dict, List
-from langchain.tools import tool
+from langchain_core.tools import tool
+from tool_matcher import register_tool_triggers, register_batch_tool
+from research_backends import DictBackend, SQLiteBackend
 
 MARKET_DATABASE = {
     "AI行业": {
@@ -77,6 +85,65 @@ FINANCIAL_DATABASE = {
 }
 
 
+# 示例数据，作为默认后端的初始数据
+DEFAULT_DATA = {
+    "market": MARKET_DATABASE,
+    "competitor": COMPETITOR_DATABASE,
+    "technical": TECHNICAL_DATABASE,
+    "financial": FINANCIAL_DATABASE,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_research_backend():
+    """
+    获取调研工具使用的数据后端
+    设置了环境变量 RESEARCH_DB_PATH 时使用该路径的 SQLite 后端（空库时写入示例数据），否则使用内存字典后端
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if os.getenv("RESEARCH_DB_PATH"):
+                _backend = SQLiteBackend()
+                if _backend.count() == 0:
+                    for collection, records in DEFAULT_DATA.items():
+                        _backend.load(collection, records)
+            else:
+                _backend = DictBackend(DEFAULT_DATA)
+        return _backend
+
+
+def set_research_backend(backend):
+    """
+    切换调研工具使用的数据后端，并按后端中的名称重新注册工具触发词
+    向后端批量导入数据后也应调用一次，使新名称成为触发词
+
+    Args:
+        backend: ResearchBackend 实例
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    register_research_triggers()
+
+
+def _format_record(record, header, not_found):
+    if record is None:
+        return not_found
+    return f"{header}\n{record['text']}"
+
+
+def _lookup_text(collection, query, header, not_found):
+    return _format_record(get_research_backend().lookup(collection, query), header, not_found)
+
+
+async def _lookup_texts(collection, queries, header, not_found):
+    records = await get_research_backend().alookup_many(collection, queries)
+    return [_format_record(record, header, not_found(query)) for record, query in zip(records, queries)]
+
+
 @tool
 def search_market_info(industry: str) -> str:
     """
@@ -88,11 +155,7 @@ def search_market_info(industry: str) -> str:
     Returns:
         行业市场信息
     """
-    info = MARKET_DATABASE.get(industry, f"未找到{industry}的市场信息")
-    if isinstance(info, dict):
-        return "【市场信息】\n" + "\n".join([f"{k}: {v}" for k, v in info.items()])
-    else:
-        return info
+    return _lookup_text("market", industry, "【市场信息】", f"未找到{industry}的市场信息")
 
 
 @tool
@@ -106,11 +169,7 @@ def search_competitor_info(company: str) -> str:
     Returns:
         公司信息
     """
-    info = COMPETITOR_DATABASE.get(company, f"未找到{company}的信息")
-    if isinstance(info, dict):
-        return "【竞争对手信息】\n" + "\n".join([f"{k}: {v}" for k, v in info.items()])
-    else:
-        return info
+    return _lookup_text("competitor", company, "【竞争对手信息】", f"未找到{company}的信息")
 
 
 @tool
@@ -124,11 +183,7 @@ def search_technical_info(topic: str) -> str:
     Returns:
         技术信息
     """
-    info = TECHNICAL_DATABASE.get(topic, f"未找到{topic}的技术信息")
-    if isinstance(info, dict):
-        return "【技术信息】\n" + "\n".join([f"{k}: {v}" for k, v in info.items()])
-    else:
-        return info
+    return _lookup_text("technical", topic, "【技术信息】", f"未找到{topic}的技术信息")
 
 
 @tool
@@ -142,11 +197,85 @@ def search_financial_info(topic: str) -> str:
     Returns:
         财务信息
     """
-    info = FINANCIAL_DATABASE.get(topic, f"未找到{topic}的财务信息")
-    if isinstance(info, dict):
-        return "【财务信息】\n" + "\n".join([f"{k}: {v}" for k, v in info.items()])
-    else:
-        return info
+    return _lookup_text("financial", topic, "【财务信息】", f"未找到{topic}的财务信息")
+
+
+@tool
+async def search_market_info_batch(industries: List[str]) -> List[str]:
+    """
+    批量搜索多个行业的市场信息，并发查询
+
+    Args:
+        industries: 行业名称列表
+
+    Returns:
+        与行业一一对应的市场信息列表
+    """
+    return await _lookup_texts("market", industries, "【市场信息】", lambda q: f"未找到{q}的市场信息")
+
+
+@tool
+async def search_competitor_info_batch(companies: List[str]) -> List[str]:
+    """
+    批量搜索多个竞争对手的信息，并发查询
+
+    Args:
+        companies: 公司名称列表
+
+    Returns:
+        与公司一一对应的公司信息列表
+    """
+    return await _lookup_texts("competitor", companies, "【竞争对手信息】", lambda q: f"未找到{q}的信息")
+
+
+@tool
+async def search_technical_info_batch(topics: List[str]) -> List[str]:
+    """
+    批量搜索多个技术主题的信息，并发查询
+
+    Args:
+        topics: 技术主题列表
+
+    Returns:
+        与主题一一对应的技术信息列表
+    """
+    return await _lookup_texts("technical", topics, "【技术信息】", lambda q: f"未找到{q}的技术信息")
+
+
+@tool
+async def search_financial_info_batch(topics: List[str]) -> List[str]:
+    """
+    批量搜索多个财务和投资主题的信息，并发查询
+
+    Args:
+        topics: 财务主题列表
+
+    Returns:
+        与主题一一对应的财务信息列表
+    """
+    return await _lookup_texts("financial", topics, "【财务信息】", lambda q: f"未找到{q}的财务信息")
+
+
+_COLLECTION_TOOLS = {
+    "market": search_market_info,
+    "competitor": search_competitor_info,
+    "technical": search_technical_info,
+    "financial": search_financial_info,
+}
+
+
+def register_research_triggers():
+    """声明各工具的触发词：请求文本中出现后端中的行业/公司/主题名称时调用对应工具"""
+    backend = get_research_backend()
+    for collection, research_tool in _COLLECTION_TOOLS.items():
+        register_tool_triggers(research_tool, backend.names(collection))
+
+
+register_research_triggers()
+register_batch_tool(search_market_info, search_market_info_batch)
+register_batch_tool(search_competitor_info, search_competitor_info_batch)
+register_batch_tool(search_technical_info, search_technical_info_batch)
+register_batch_tool(search_financial_info, search_financial_info_batch)
 
 
 @tool
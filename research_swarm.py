@@ -2,15 +2,11 @@
 """
 调研方案协调系统 - 使用真正的通用Agent框架
 基于agent_framework.py的通用Agent基类
+
+research_skills / agent_framework 在创建编排器时才导入，--help 等不需要大模型的命令行操作不加载 LangChain
 """
 import asyncio
-from research_skills import (
-    search_market_info, search_competitor_info,
-    search_technical_info, search_financial_info
-)
-from agent_framework import (
-    BaseAgent, AgentConfig, CoordinatorAgent, AgentOrchestrator
-)
+import argparse
 
 
 def create_expert_configs():
@@ -18,6 +14,12 @@ def create_expert_configs():
     创建专家Agent配置
     通过配置实例化不同的专家Agent
     """
+    from research_skills import (
+        search_market_info, search_competitor_info,
+        search_technical_info, search_financial_info
+    )
+    from agent_framework import AgentConfig
+    
     MARKET_ANALYST_CONFIG = AgentConfig(
         name="market_analyst",
         role="市场分析师",
@@ -75,6 +77,8 @@ def create_research_orchestrator():
     Returns:
         AgentOrchestrator实例
     """
+    from agent_framework import CoordinatorAgent, AgentOrchestrator
+    
     print("=" * 80)
     print("📊 初始化调研方案协调系统")
     print("=" * 80)
@@ -179,6 +183,18 @@ def interactive_research():
             traceback.print_exc()
 
 
+def main():
+    parser = argparse.ArgumentParser(description="调研方案协调系统")
+    parser.add_argument("request", nargs="?", help="调研需求，省略时进入交互模式")
+    parser.add_argument("--max-rounds", type=int, default=2, help="最大调研轮数")
+    args = parser.parse_args()
+    
+    if args.request:
+        print(run_research(args.request, args.max_rounds))
+    else:
+        interactive_research()
+
+
 if __name__ == "__main__":
-    interactive_research()
+    main()
 
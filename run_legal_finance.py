@@ -4,11 +4,12 @@
 """
 import sys
 import os
+import argparse
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from legal_finance_swarm import run_legal_finance
+from legal_finance_swarm import run_legal_finance_batch, load_requests
 
 
 def save_full_report(request, result, timestamp, index=None):
@@ -35,35 +36,53 @@ def save_full_report(request, result, timestamp, index=None):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="批量运行法律财务专家Agent并保存报告")
+    parser.add_argument("--input", help="JSONL 需求文件，每行一个需求（字符串或含 request/body 字段的对象）")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时执行的需求数，默认读取 BATCH_CONCURRENCY")
+    parser.add_argument("--max-rounds", type=int, default=1, help="每个需求的最大轮数")
+    args = parser.parse_args()
+    
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     print("=" * 80)
     print("法律财务专家Agent - 使用协调员+编排器")
     print("=" * 80)
     
-    test_requests = [
-        "请审查一份供应商合同的关键条款，并给出风险评估和修订建议",
-        "请生成一份利润表的标准格式，并说明各个主要科目的含义"
-    ]
+    if args.input:
+        test_requests = load_requests(args.input)
+    else:
+        test_requests = [
+            "请审查一份供应商合同的关键条款，并给出风险评估和修订建议",
+            "请生成一份利润表的标准格式，并说明各个主要科目的含义"
+        ]
+    
+    if not test_requests:
+        print("\n没有需要处理的请求")
+        return
     
-    for i, request in enumerate(test_requests, 1):
+    def on_result(item):
+        """每个请求完成后立即保存报告"""
         print(f"\n{'=' * 80}")
-        print(f"测试请求 {i}")
+        print(f"请求 {item['index']} 完成，耗时 {item['elapsed']:.1f}秒")
         print(f"{'=' * 80}")
-        print(f"\n请求内容: {request}")
+        print(f"\n请求内容: {item['request']}")
         
-        try:
-            result = run_legal_finance(request, max_rounds=1)
-            
-            save_full_report(request, result, timestamp, index=i)
-            
-        except Exception as e:
-            print(f"\n❌ 运行失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        if item["success"]:
+            save_full_report(item["request"], item["summary"], timestamp, index=item["index"])
+        else:
+            print(f"\n❌ 运行失败: {item['error']}")
+    
+    results = run_legal_finance_batch(
+        test_requests,
+        max_rounds=args.max_rounds,
+        concurrency=args.concurrency,
+        on_result=on_result
+    )
+    
+    succeeded = sum(1 for r in results if r["success"])
     
     print("\n" + "=" * 80)
-    print("✅ 所有完整报告已保存成功！")
+    print(f"✅ 完整报告已保存: {succeeded}/{len(results)}")
     print("=" * 80)
 
 
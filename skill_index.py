@@ -0,0 +1,318 @@
+"""
+SKILL.md 分块检索索引
+把 knowledge-work-plugins/ 下所有 SKILL.md 按标题切分为小片段，检索时只返回最相关的 top-k 片段，
+而不是把整篇 SKILL.md 塞进提示词。
+
+优先使用本地多语言向量模型做语义检索；向量模型不可用时降级为 BM25 关键词检索。
+切分结果和向量按文件 mtime/size 计算指纹缓存在 .cache/ 下，文件未变化时直接复用；
+向量缓存还按向量模型区分，更换模型后会重新编码。
+"""
+import os
+import re
+import json
+import math
+import hashlib
+import threading
+from collections import Counter, defaultdict
+
+from skill_loader import create_skill_loader
+from embeddings import get_embedding_model, resolve_model_path, encode
+
+INDEX_VERSION = 1
+
+_HEADING_PATTERN = re.compile(r'^(#{1,4})\s+(.*)$')
+_WORD_PATTERN = re.compile(r'[a-z0-9][a-z0-9\-_]+')
+_CJK_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+
+
+def tokenize(text, ngram_sizes=(2,)):
+    """
+    英文按单词、中文按 n 元字组切分
+
+    Args:
+        text: 文本
+        ngram_sizes: 中文 n-gram 长度，默认只用二元字组；短于最小长度的中文片段整体作为一个词
+    """
+    text = text.lower()
+    tokens = _WORD_PATTERN.findall(text)
+    shortest = min(ngram_sizes)
+    for run in _CJK_RUN_PATTERN.findall(text):
+        if len(run) < shortest:
+            tokens.append(run)
+            continue
+        for n in ngram_sizes:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+
+def split_markdown(content, chunk_size=600):
+    """
+    按标题切分 Markdown，过长的段落再按空行合并/切分到 chunk_size 左右
+
+    Returns:
+        [(标题路径, 片段文本), ...]
+    """
+    sections = []
+    headings = []
+    buffer = []
+
+    def flush():
+        text = "\n".join(buffer).strip()
+        if text:
+            sections.append((" > ".join(headings), text))
+        buffer.clear()
+
+    in_code = False
+    for line in content.split("\n"):
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            headings[:] = headings[:level - 1] + [match.group(2).strip()]
+        else:
+            buffer.append(line)
+    flush()
+
+    chunks = []
+    for heading, text in sections:
+        piece = ""
+        for paragraph in re.split(r'\n\s*\n', text):
+            if piece and len(piece) + len(paragraph) > chunk_size:
+                chunks.append((heading, piece.strip()))
+                piece = ""
+            piece += paragraph + "\n\n"
+            while len(piece) > chunk_size * 2:
+                chunks.append((heading, piece[:chunk_size].strip()))
+                piece = piece[chunk_size:]
+        if piece.strip():
+            chunks.append((heading, piece.strip()))
+    return chunks
+
+
+class LexicalIndex:
+    """
+    BM25 关键词倒排索引
+
+    Args:
+        texts: 文档文本列表，文档ID即下标
+        tokenizer: 分词函数
+        k1 / b: BM25 参数
+        max_df: 倒排表长度上限（占文档数的比例）。出现在更多文档中的常见词（"的"、"怎么"等）
+                只保留 BM25 权重最高的那部分文档，查询耗时因此不随文档数线性增长；None 表示不限制
+    """
+
+    # 倒排表长度上限的下限，避免小语料把常见词的倒排表截得过短
+    MIN_POSTINGS = 10
+
+    def __init__(self, texts, tokenizer=tokenize, k1=1.5, b=0.75, max_df=None):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(list)
+        # 被截断的常见词 -> {文档ID: 权重}，用于给候选文档补齐这些词的得分
+        self._full_weights = {}
+        lengths = []
+
+        doc_freq = Counter()
+        for doc_id, text in enumerate(texts):
+            counts = Counter(self.tokenizer(text))
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self._postings[token].append((doc_id, tf))
+            doc_freq.update(counts.keys())
+
+        # BM25 的词权重与查询无关，构建时预先算好，查询只需累加
+        total = len(lengths) or 1
+        avg_length = (sum(lengths) / total) or 1
+        cutoff = max(self.MIN_POSTINGS, int(max_df * total)) if max_df is not None else None
+        for token, postings in self._postings.items():
+            df = doc_freq[token]
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            weighted = [
+                (doc_id, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc_id] / avg_length)))
+                for doc_id, tf in postings
+            ]
+            if cutoff is not None and df > cutoff:
+                # 常见词只用权重最高的文档召回候选，候选文档的得分再按完整权重补齐
+                self._full_weights[token] = dict(weighted)
+                weighted = sorted(weighted, key=lambda posting: posting[1], reverse=True)[:cutoff]
+            self._postings[token] = weighted
+
+    @property
+    def truncated(self):
+        """倒排表被截断的常见词"""
+        return set(self._full_weights)
+
+    def scores(self, query):
+        """
+        返回 {文档ID: BM25 得分}，只包含至少命中一个词的文档
+        常见词的倒排表被截断时，候选文档仍按全部查询词计算完整得分
+        """
+        scores = defaultdict(float)
+        common = []
+        for token in set(self.tokenizer(query)):
+            if token in self._full_weights:
+                common.append(self._full_weights[token])
+                for doc_id, _ in self._postings[token]:
+                    scores.setdefault(doc_id, 0.0)
+                continue
+            for doc_id, weight in self._postings.get(token, ()):
+                scores[doc_id] += weight
+        for weights in common:
+            for doc_id in scores:
+                scores[doc_id] += weights.get(doc_id, 0.0)
+        return scores
+
+
+class SkillIndex:
+    """
+    SKILL.md 分块检索索引
+
+    Args:
+        loader: SkillLoader 实例，默认使用共享加载器
+        chunk_size: 片段目标长度（字符）
+        cache_dir: 切分结果和向量的缓存目录
+        use_embeddings: 是否尝试使用向量模型
+        model_path: 向量模型目录，默认读取环境变量 EMBEDDING_MODEL_PATH，否则使用 models/ 下的模型
+    """
+
+    def __init__(self, loader=None, chunk_size=600, cache_dir=".cache", use_embeddings=True, model_path=None):
+        self.loader = loader or create_skill_loader()
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
+        self.chunks = []
+        self.vectors = None
+        self.model_path = resolve_model_path(model_path)
+        self.model = get_embedding_model(self.model_path) if use_embeddings else None
+        self._lexical = None
+
+        self._build()
+
+    def _fingerprint(self):
+        parts = [INDEX_VERSION, self.chunk_size]
+        for key in sorted(self.loader.skills):
+            path = self.loader.skills[key]['path']
+            stat = os.stat(path)
+            parts.append((key, path, stat.st_mtime_ns, stat.st_size))
+        return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def _vectors_path(self, fingerprint):
+        """向量缓存路径，按文件指纹和向量模型区分，不同模型的向量不会混用"""
+        key = hashlib.sha1(json.dumps([fingerprint, self.model_path]).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"skill_vectors_{key}.npy")
+
+    def _build(self):
+        fingerprint = self._fingerprint()
+        chunks_path = os.path.join(self.cache_dir, f"skill_chunks_{fingerprint}.json")
+        vectors_path = self._vectors_path(fingerprint)
+
+        if os.path.exists(chunks_path):
+            with open(chunks_path, 'r', encoding='utf-8') as f:
+                self.chunks = json.load(f)
+        else:
+            for key, skill in sorted(self.loader.skills.items()):
+                for heading, text in split_markdown(skill['content'], self.chunk_size):
+                    self.chunks.append({
+                        "skill": key,
+                        "name": skill['name'],
+                        "category": skill['category'],
+                        "heading": heading,
+                        "text": text
+                    })
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(chunks_path, 'w', encoding='utf-8') as f:
+                json.dump(self.chunks, f, ensure_ascii=False)
+
+        if self.model is not None:
+            import numpy as np
+            if os.path.exists(vectors_path):
+                self.vectors = np.load(vectors_path)
+            else:
+                self.vectors = encode(self.model, [self._chunk_text(c) for c in self.chunks])
+                np.save(vectors_path, self.vectors)
+
+        self._lexical = LexicalIndex([self._chunk_text(c) for c in self.chunks])
+        print(f"【技能索引】共 {len(self.chunks)} 个片段，检索方式: {'向量' if self.vectors is not None else 'BM25'}")
+
+    @staticmethod
+    def _chunk_text(chunk):
+        return f"{chunk['name']} {chunk['heading']}\n{chunk['text']}"
+
+    def search(self, query, category=None, k=3, min_score=0.3):
+        """
+        检索与 query 最相关的片段
+
+        Args:
+            query: 检索文本
+            category: 只在指定分类（legal/finance/...）中检索
+            k: 返回片段数
+            min_score: 向量检索的最低余弦相似度
+
+        Returns:
+            [{"skill", "name", "category", "heading", "text", "score"}, ...]
+        """
+        candidates = [
+            i for i, chunk in enumerate(self.chunks)
+            if category is None or chunk['category'] == category
+        ]
+        if not candidates:
+            return []
+
+        if self.vectors is not None:
+            query_vector = encode(self.model, [query])[0]
+            similarities = self.vectors[candidates] @ query_vector
+            scored = [
+                (float(score), chunk_id)
+                for chunk_id, score in zip(candidates, similarities)
+                if score >= min_score
+            ]
+        else:
+            bm25 = self._lexical.scores(query)
+            scored = [(bm25[i], i) for i in candidates if bm25.get(i, 0) > 0]
+
+        scored.sort(reverse=True)
+        return [dict(self.chunks[chunk_id], score=round(score, 4)) for score, chunk_id in scored[:k]]
+
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+
+def get_skill_index():
+    """获取进程内共享的技能检索索引，第一次调用时构建"""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = SkillIndex()
+        return _shared_index
+
+
+def search_skill_chunks(topic, category, aliases=None, k=3):
+    """
+    检索技能片段并格式化为工具输出
+
+    Args:
+        topic: 检索主题
+        category: 技能分类
+        aliases: {关键词: 技能名} 查询扩展表，命中的技能名追加到检索文本中
+        k: 返回片段数
+
+    Returns:
+        格式化的片段文本，没有相关片段时返回 None
+    """
+    query = topic
+    if aliases:
+        expansions = {name for key, name in aliases.items() if key.lower() in topic.lower()}
+        if expansions:
+            query = topic + " " + " ".join(name.replace("-", " ") for name in sorted(expansions))
+
+    hits = get_skill_index().search(query, category=category, k=k)
+    if not hits:
+        return None
+
+    return "\n\n".join([
+        f"[{hit['name']}{' > ' + hit['heading'] if hit['heading'] else ''}]\n{hit['text']}"
+        for hit in hits
+    ])
@@ -2,20 +2,54 @@
 """
 SKILL.md 文件加载器
 读取 knowledge-work-plugins/ 下的所有 SKILL.md 文件
+
+启动时只读取每个文件的 frontmatter，正文在第一次访问 content/full_content 时才读取。
+扫描结果按文件 mtime/size 写入清单缓存，热启动时只需校验清单而不必重新遍历和解析整棵目录树。
 """
 import os
 import re
+import json
+import threading
 from pathlib import Path
 
+MANIFEST_VERSION = 1
+
+
+class _LazySkill(dict):
+    """
+    技能记录
+    元数据在创建时填充，content/full_content 在第一次访问时从文件读取
+    """
+
+    _LAZY_KEYS = ('content', 'full_content')
+
+    def __init__(self, loader, **meta):
+        super().__init__(**meta)
+        self._loader = loader
+
+    def __missing__(self, key):
+        if key in self._LAZY_KEYS:
+            self._loader._load_body(self)
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
 
 class SkillLoader:
     """
     SKILL.md 文件加载器
     """
     
-    def __init__(self, plugins_dir="knowledge-work-plugins"):
+    def __init__(self, plugins_dir="knowledge-work-plugins", manifest_path=".cache/skill_manifest.json"):
         self.plugins_dir = Path(plugins_dir)
+        self.manifest_path = Path(manifest_path) if manifest_path else None
         self.skills = {}
+        self._lock = threading.Lock()
         self._load_all_skills()
     
     def _parse_frontmatter(self, content):
@@ -37,26 +71,47 @@ class SkillLoader:
         
         return {}, content
     
+    def _read_frontmatter(self, skill_path):
+        """只读取文件开头的 frontmatter 部分，不读取正文"""
+        lines = []
+        with open(skill_path, 'r', encoding='utf-8') as f:
+            first = f.readline()
+            if first.strip() != '---':
+                return {}
+            lines.append(first)
+            for line in f:
+                lines.append(line)
+                if line.strip() == '---':
+                    break
+
+        frontmatter, _ = self._parse_frontmatter(''.join(lines) + '\n')
+        return frontmatter
+
     def _load_skill_file(self, skill_path):
+        """读取单个 SKILL.md 的元数据"""
         try:
-            with open(skill_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            frontmatter, main_content = self._parse_frontmatter(content)
-            
-            skill_name = frontmatter.get('name', skill_path.parent.name)
+            frontmatter = self._read_frontmatter(skill_path)
             
             return {
-                'name': skill_name,
+                'name': frontmatter.get('name', skill_path.parent.name),
                 'description': frontmatter.get('description', ''),
-                'content': main_content,
-                'full_content': content,
                 'path': str(skill_path),
                 'category': self._get_category(skill_path)
             }
         except Exception as e:
             print("  load fail: " + str(skill_path) + " " + str(e))
             return None
+
+    def _load_body(self, skill):
+        """读取技能正文，填充 content 和 full_content"""
+        with self._lock:
+            if dict.__contains__(skill, 'content'):
+                return
+            with open(skill['path'], 'r', encoding='utf-8') as f:
+                content = f.read()
+            _, main_content = self._parse_frontmatter(content)
+            dict.__setitem__(skill, 'full_content', content)
+            dict.__setitem__(skill, 'content', main_content)
     
     def _get_category(self, skill_path):
         parts = skill_path.parts
@@ -66,23 +121,105 @@ class SkillLoader:
             return 'finance'
         return 'unknown'
     
+    def _read_manifest(self):
+        if not self.manifest_path or not self.manifest_path.exists():
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        if manifest.get('plugins_dir') != str(self.plugins_dir.resolve()):
+            return None
+        return manifest
+
+    def _write_manifest(self, dirs, files):
+        if not self.manifest_path:
+            return
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MANIFEST_VERSION,
+                    'plugins_dir': str(self.plugins_dir.resolve()),
+                    'dirs': dirs,
+                    'files': files
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print("  manifest write fail: " + str(e))
+
+    @staticmethod
+    def _dirs_unchanged(dirs):
+        """目录增删文件会改变目录 mtime，全部目录 mtime 不变说明没有新增或删除的 SKILL.md"""
+        for path, mtime_ns in dirs.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _scan_tree(self):
+        """遍历插件目录，返回 (目录mtime表, SKILL.md路径列表)"""
+        dirs = {}
+        skill_files = []
+        for root, _, filenames in os.walk(self.plugins_dir):
+            dirs[root] = os.stat(root).st_mtime_ns
+            if 'SKILL.md' in filenames:
+                skill_files.append(os.path.join(root, 'SKILL.md'))
+        return dirs, sorted(skill_files)
+
     def _load_all_skills(self):
         if not self.plugins_dir.exists():
             print("  plugins dir not exist: " + str(self.plugins_dir))
             return
         
-        print("  scanning plugins dir: " + str(self.plugins_dir))
+        manifest = self._read_manifest()
+        cached_files = manifest['files'] if manifest else {}
         
-        skill_files = list(self.plugins_dir.rglob("SKILL.md"))
+        if manifest and self._dirs_unchanged(manifest['dirs']):
+            dirs = manifest['dirs']
+            skill_files = sorted(cached_files)
+            print("  using skill manifest: " + str(self.manifest_path))
+        else:
+            print("  scanning plugins dir: " + str(self.plugins_dir))
+            dirs, skill_files = self._scan_tree()
         
         print("  found " + str(len(skill_files)) + " SKILL.md files")
         
-        for skill_path in skill_files:
-            skill = self._load_skill_file(skill_path)
-            if skill:
-                skill_key = skill['category'] + "." + skill['name']
-                self.skills[skill_key] = skill
-                print("    loaded: " + skill_key)
+        files = {}
+        changed = manifest is None or dirs is not manifest['dirs']
+        for path in skill_files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                changed = True
+                continue
+
+            entry = cached_files.get(path)
+            if not entry or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                meta = self._load_skill_file(Path(path))
+                if not meta:
+                    continue
+                entry = dict(meta, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                changed = True
+            files[path] = entry
+
+            skill = _LazySkill(
+                self,
+                name=entry['name'],
+                description=entry['description'],
+                path=entry['path'],
+                category=entry['category']
+            )
+            self.skills[skill['category'] + "." + skill['name']] = skill
+
+        if changed:
+            self._write_manifest(dirs, files)
         
         print("  success loaded " + str(len(self.skills)) + " skills")
     
@@ -101,6 +238,17 @@ class SkillLoader:
         return self.skills
 
 
-def create_skill_loader():
-    return SkillLoader()
+_shared_loaders = {}
+_shared_lock = threading.Lock()
+
 
+def create_skill_loader(plugins_dir="knowledge-work-plugins"):
+    """
+    获取进程内共享的技能加载器
+    同一插件目录只扫描一次，多个 Agent 模块共用同一个实例
+    """
+    key = str(Path(plugins_dir).resolve())
+    with _shared_lock:
+        if key not in _shared_loaders:
+            _shared_loaders[key] = SkillLoader(plugins_dir)
+        return _shared_loaders[key]
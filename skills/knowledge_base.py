@@ -1,23 +1,176 @@
-from langchain.tools import tool
+"""
+技术知识库检索
+FAQ 条目在模块级倒排索引中只构建一次（中文二元字组、英文单词，BM25 打分，标题加权），
+查询只遍历命中词的倒排表；说法不同（如"登录不上去"）也能召回。
+得分为二元字组索引与中文一元字组索引之和：一元字组召回只有单字重合的说法（如"登不上"），
+也让中文词按字数计分，不会被只算一个词的英文单词（如"我的APP登录不上去了"中的 APP）压过。
+两个索引中出现在过多条目里的常见字组（"的"、"我"、"怎么"等）只用权重最高的一部分倒排召回候选，
+候选再按完整权重计分，每次查询计分的候选数有上限，不随条目数线性增长。
+向量模型可用且开启 KNOWLEDGE_BASE_EMBEDDINGS 时，对 BM25 前几名做向量重排。
+
+FAQ 文件通过环境变量 KNOWLEDGE_BASE_PATH 指定，支持：
+    .json  —— {"标题": "答案", ...} 或 [{"question"/"title": ..., "answer": ...}, ...]
+    .jsonl —— 每行一个 {"question"/"title": ..., "answer": ...}
+"""
+import os
+import json
+import time
+import heapq
+import threading
+
+from langchain_core.tools import tool
+
+from skill_index import LexicalIndex, tokenize
+from embeddings import get_embedding_model, encode
+
+DEFAULT_ENTRIES = [
+    ("登录问题", "请检查您的用户名和密码是否正确，确保没有区分大小写错误。如果忘记密码，请点击'忘记密码'进行重置。"),
+    ("支付问题", "支付失败通常由以下原因导致：1. 银行卡余额不足；2. 网络连接问题；3. 银行卡未开通网银功能。建议先检查网络连接和账户余额。"),
+    ("APP崩溃", "APP崩溃请尝试以下步骤：1. 清除APP缓存；2. 更新到最新版本；3. 重启设备。如问题仍然存在，请联系技术支持。"),
+    ("订单查询", "您可以在'我的订单'页面查看所有订单状态，包括待支付、待发货、已发货、已完成等状态。"),
+]
+
+TITLE_WEIGHT = 3
+
+# 常见字组用于召回候选的倒排表最多保留条目数的该比例
+MAX_DOC_FREQ = 0.02
+
+
+def _unigrams(text):
+    return tokenize(text, ngram_sizes=(1,))
+
+
+def load_entries(path):
+    """
+    读取 FAQ 文件
+
+    Args:
+        path: .json 或 .jsonl 文件路径
+
+    Returns:
+        [(标题, 答案), ...]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+
+    if isinstance(records, dict):
+        return [(str(title), str(answer)) for title, answer in records.items()]
+    return [(str(r.get("question") or r.get("title")), str(r["answer"])) for r in records]
+
+
+class KnowledgeBase:
+    """
+    FAQ 倒排索引
+
+    Args:
+        entries: [(标题, 答案), ...]
+        use_embeddings: 是否用向量模型重排（模型不可用时自动关闭）
+        rerank_k: 参与向量重排的 BM25 候选数
+    """
+
+    def __init__(self, entries=None, use_embeddings=False, rerank_k=10):
+        start = time.perf_counter()
+        self.entries = list(entries if entries is not None else DEFAULT_ENTRIES)
+        self.rerank_k = rerank_k
+        documents = [" ".join([title] * TITLE_WEIGHT + [answer]) for title, answer in self.entries]
+        self._index = LexicalIndex(documents, max_df=MAX_DOC_FREQ)
+        self._fallback = LexicalIndex(documents, tokenizer=_unigrams, max_df=MAX_DOC_FREQ)
+
+        self.model = get_embedding_model() if use_embeddings else None
+        self.vectors = None
+        if self.model is not None:
+            self.vectors = encode(self.model, [f"{title} {answer}" for title, answer in self.entries])
+
+        self.build_seconds = time.perf_counter() - start
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.last_query_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def search(self, query, k=1, min_score=1.0):
+        """
+        检索与 query 最相关的条目
+
+        Args:
+            query: 用户问题
+            k: 返回条目数
+            min_score: BM25 最低得分（两个索引得分之和），过滤只命中常见单字的条目
+
+        Returns:
+            [{"title", "answer", "score"}, ...]
+        """
+        start = time.perf_counter()
+        limit = max(k, self.rerank_k) if self.vectors is not None else k
+        scores = self._index.scores(query)
+        for doc_id, score in self._fallback.scores(query).items():
+            scores[doc_id] += score
+        candidates = heapq.nlargest(
+            limit,
+            ((score, doc_id) for doc_id, score in scores.items() if score >= min_score)
+        )
+
+        if self.vectors is not None and candidates:
+            query_vector = encode(self.model, [query])[0]
+            candidates = sorted(
+                ((float(self.vectors[doc_id] @ query_vector), doc_id) for _, doc_id in candidates),
+                reverse=True
+            )[:k]
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += elapsed
+            self.last_query_seconds = elapsed
+
+        return [
+            {"title": self.entries[doc_id][0], "answer": self.entries[doc_id][1], "score": round(score, 4)}
+            for score, doc_id in candidates
+        ]
+
+    def stats(self):
+        """返回构建耗时和查询延迟（毫秒）"""
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "build_ms": round(self.build_seconds * 1000, 3),
+                "queries": self.queries,
+                "avg_query_ms": round(self.query_seconds * 1000 / self.queries, 4) if self.queries else 0.0,
+                "last_query_ms": round(self.last_query_seconds * 1000, 4),
+            }
+
+
+_shared_kb = None
+_shared_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """获取进程内共享的知识库索引，第一次调用时构建"""
+    global _shared_kb
+    with _shared_lock:
+        if _shared_kb is None:
+            path = os.getenv("KNOWLEDGE_BASE_PATH")
+            entries = load_entries(path) if path else DEFAULT_ENTRIES
+            use_embeddings = os.getenv("KNOWLEDGE_BASE_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+            _shared_kb = KnowledgeBase(entries, use_embeddings=use_embeddings)
+            stats = _shared_kb.stats()
+            print(f"【知识库】已索引 {stats['entries']} 条，构建耗时 {stats['build_ms']}ms")
+        return _shared_kb
+
 
 @tool
 def search_knowledge_base(query: str) -> str:
     """在知识库中搜索相关技术信息，回答用户的技术问题
-    
+
     Args:
         query: 用户的技术问题描述
-        
+
     Returns:
         知识库中的相关信息
     """
-    knowledge_base = {
-        "登录问题": "请检查您的用户名和密码是否正确，确保没有区分大小写错误。如果忘记密码，请点击'忘记密码'进行重置。",
-        "支付问题": "支付失败通常由以下原因导致：1. 银行卡余额不足；2. 网络连接问题；3. 银行卡未开通网银功能。建议先检查网络连接和账户余额。",
-        "APP崩溃": "APP崩溃请尝试以下步骤：1. 清除APP缓存；2. 更新到最新版本；3. 重启设备。如问题仍然存在，请联系技术支持。",
-        "订单查询": "您可以在'我的订单'页面查看所有订单状态，包括待支付、待发货、已发货、已完成等状态。"
-    }
-    
-    for key, value in knowledge_base.items():
-        if key in query or query in key:
-            return value
+    hits = get_knowledge_base().search(query)
+    if hits:
+        return hits[0]["answer"]
     return f"知识库中暂无关于 '{query}' 的详细信息，建议联系人工客服。"
@@ -1,4 +1,5 @@
-from langchain.tools import tool
+from langchain_core.tools import tool
+from .store import get_store
 
 @tool
 def get_product_info(product_name: str) -> str:
@@ -10,25 +11,7 @@ def get_product_info(product_name: str) -> str:
     Returns:
         产品的详细信息
     """
-    product_database = {
-        "无线蓝牙耳机": {
-            "price": "¥299.00",
-            "stock": "库存充足 (50件)",
-            "spec": "蓝牙5.3，续航24小时，主动降噪"
-        },
-        "智能手表": {
-            "price": "¥599.00",
-            "stock": "库存紧张 (3件)",
-            "spec": "1.4英寸屏幕，心率监测，GPS定位"
-        },
-        "手机壳": {
-            "price": "¥99.00",
-            "stock": "库存充足 (100件)",
-            "spec": "硅胶材质，防摔设计"
-        }
-    }
-    
-    for name, info in product_database.items():
-        if product_name in name or name in product_name:
-            return f"{name} 信息：\n价格：{info['price']}\n库存：{info['stock']}\n规格：{info['spec']}"
+    info = get_store().find_product(product_name)
+    if info:
+        return f"{info['name']} 信息：\n价格：{info['price']}\n库存：{info['stock']}\n规格：{info['spec']}"
     return f"未找到产品 '{product_name}' 的信息。"
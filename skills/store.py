@@ -0,0 +1,212 @@
+"""
+客服技能数据存储
+订单和产品数据保存在 SQLite 中（订单号为主键、产品名建有索引），查询结果经过进程内 LRU 读穿缓存。
+数据量增长到成千上万个订单和 SKU 时，提示词中只放查询到的记录，大小保持不变。
+
+数据库路径通过环境变量 SKILLS_DB_PATH 配置，首次创建时写入示例数据；
+可通过 load_orders() / load_products() 批量导入真实数据。
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from tool_matcher import AhoCorasick
+
+_SAMPLE_ORDERS = [
+    ("ORD001", "已发货", "顺丰快递 SF1234567890", "¥299.00", "无线蓝牙耳机 x1"),
+    ("ORD002", "待支付", "尚未发货", "¥599.00", "智能手表 x1"),
+    ("ORD003", "已完成", "已签收", "¥199.00", "手机壳 x2"),
+]
+
+_SAMPLE_PRODUCTS = [
+    ("无线蓝牙耳机", "¥299.00", "库存充足 (50件)", "蓝牙5.3，续航24小时，主动降噪"),
+    ("智能手表", "¥599.00", "库存紧张 (3件)", "1.4英寸屏幕，心率监测，GPS定位"),
+    ("手机壳", "¥99.00", "库存充足 (100件)", "硅胶材质，防摔设计"),
+]
+
+
+class SkillStore:
+    """
+    订单与产品数据存储
+
+    Args:
+        path: SQLite 数据库文件路径，默认读取 SKILLS_DB_PATH，否则为 .cache/skills.sqlite3
+        cache_size: 读穿缓存的最大条数
+    """
+
+    def __init__(self, path=None, cache_size=1024):
+        self.path = path or os.getenv("SKILLS_DB_PATH", ".cache/skills.sqlite3")
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._cache = OrderedDict()
+        self._name_matcher = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                logistics TEXT NOT NULL,
+                amount TEXT NOT NULL,
+                items TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                name TEXT PRIMARY KEY,
+                price TEXT NOT NULL,
+                stock TEXT NOT NULL,
+                spec TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        if self._count("orders") == 0 and self._count("products") == 0:
+            self.load_orders(_SAMPLE_ORDERS)
+            self.load_products(_SAMPLE_PRODUCTS)
+
+    def _count(self, table):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _cached(self, key, loader):
+        """读穿缓存：命中直接返回，未命中时调用 loader 查询数据库并缓存（包括查不到的 None）"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        value = loader()
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def _invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._name_matcher = None
+
+    def load_orders(self, rows):
+        """
+        批量导入订单，订单号相同时覆盖
+
+        Args:
+            rows: [(order_id, status, logistics, amount, items), ...] 或同名字段的 dict 列表
+        """
+        fields = ("order_id", "status", "logistics", "amount", "items")
+        rows = [tuple(r[f] for f in fields) if isinstance(r, dict) else tuple(r) for r in rows]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        self._invalidate()
+
+    def load_products(self, rows):
+        """
+        批量导入产品，名称相同时覆盖
+
+        Args:
+            rows: [(name, price, stock, spec), ...] 或同名字段的 dict 列表
+        """
+        fields = ("name", "price", "stock", "spec")
+        rows = [tuple(r[f] for f in fields) if isinstance(r, dict) else tuple(r) for r in rows]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+        self._invalidate()
+
+    def get_order(self, order_id):
+        """按订单号查询订单，返回 dict，不存在时返回 None"""
+        order_id = order_id.strip().upper()
+
+        def load():
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT order_id, status, logistics, amount, items FROM orders WHERE order_id = ?",
+                    (order_id,)
+                ).fetchone()
+            return dict(zip(("order_id", "status", "logistics", "amount", "items"), row)) if row else None
+
+        return self._cached(("order", order_id), load)
+
+    def _get_name_matcher(self):
+        with self._lock:
+            if self._name_matcher is None:
+                names = [row[0] for row in self._conn.execute("SELECT name FROM products")]
+                self._name_matcher = AhoCorasick(names)
+            return self._name_matcher
+
+    def product_names_in(self, text):
+        """找出文本中出现的全部产品名（按出现位置排序，去重）"""
+        matcher = self._get_name_matcher()
+        seen = {}
+        for position, pattern_id in matcher.finditer(text):
+            name = matcher.patterns[pattern_id]
+            seen.setdefault(name, position - len(name) + 1)
+        return sorted(seen, key=seen.get)
+
+    def find_product(self, product_name):
+        """
+        查询产品：先按名称精确查找，再找文本中出现的产品名，最后按名称包含查询词模糊查找
+
+        Returns:
+            dict，不存在时返回 None
+        """
+        product_name = product_name.strip()
+
+        def load():
+            fields = ("name", "price", "stock", "spec")
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT name, price, stock, spec FROM products WHERE name = ?",
+                    (product_name,)
+                ).fetchone()
+            if row is None:
+                names = self.product_names_in(product_name)
+                if names:
+                    names.sort(key=len, reverse=True)
+                    with self._lock:
+                        row = self._conn.execute(
+                            "SELECT name, price, stock, spec FROM products WHERE name = ?",
+                            (names[0],)
+                        ).fetchone()
+            if row is None and product_name:
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT name, price, stock, spec FROM products WHERE name LIKE ? ORDER BY length(name) LIMIT 1",
+                        (f"%{product_name}%",)
+                    ).fetchone()
+            return dict(zip(fields, row)) if row else None
+
+        return self._cached(("product", product_name), load)
+
+    def stats(self):
+        """返回缓存命中情况"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached": len(self._cache)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_store():
+    """获取进程内共享的数据存储"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = SkillStore()
+        return _shared_store
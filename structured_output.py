@@ -0,0 +1,158 @@
+"""
+结构化输出解析
+大模型返回的 JSON 常带有 ```json 代码块、前后说明文字或多余的尾随逗号，
+parse_json_object() 在本地修复这些常见问题，避免一次解析失败就浪费整轮调研
+"""
+import json
+
+# 协调员任务分配计划的 JSON Schema，用于支持 response_format 的模型
+TASK_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "task_assignments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string"},
+                    "agent_name": {"type": "string"},
+                    "task_description": {"type": "string"},
+                    "priority": {"type": "integer"},
+                    "depends_on": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["agent_name", "task_description"]
+            }
+        },
+        "explanation": {"type": "string"}
+    },
+    "required": ["task_assignments"]
+}
+
+
+def json_schema_format(name, schema):
+    """构造 OpenAI 兼容接口的 json_schema response_format"""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+
+
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+
+def _strip_fences(text):
+    """去掉 Markdown 代码块标记"""
+    text = text.strip()
+    if "```" not in text:
+        return text
+    start = text.find("```")
+    body_start = text.find("\n", start)
+    end = text.find("```", body_start + 1) if body_start != -1 else -1
+    if body_start == -1:
+        return text
+    return text[body_start + 1:end if end != -1 else len(text)].strip()
+
+
+def _outermost_object(text):
+    """
+    截取第一个完整的最外层 {...}，忽略字符串内部的括号
+    没有闭合时截取到最后一个 }
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else None
+
+
+def _remove_trailing_commas(text):
+    """删除 } 或 ] 前多余的逗号，字符串内部的内容保持不变"""
+    result = []
+    in_string = False
+    escaped = False
+    pending_comma = None
+    for char in text:
+        if in_string:
+            result.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "}]":
+                result.append(",")
+            result.extend(pending_comma[1:])
+            pending_comma = None
+
+        if char == ",":
+            pending_comma = [","]
+            continue
+        if char == '"':
+            in_string = True
+        result.append(char)
+
+    if pending_comma is not None:
+        result.extend(pending_comma)
+    return "".join(result)
+
+
+def parse_json_object(text):
+    """
+    容错解析大模型返回的 JSON 对象
+    依次尝试：直接解析、去掉代码块、截取最外层对象、删除尾随逗号
+
+    Args:
+        text: 模型输出文本
+
+    Returns:
+        解析得到的 dict
+
+    Raises:
+        ValueError: 无法解析出 JSON 对象
+    """
+    if not isinstance(text, str):
+        raise ValueError(f"模型输出不是文本: {type(text).__name__}")
+
+    candidates = [text.strip()]
+    stripped = _strip_fences(text)
+    candidates.append(stripped)
+    obj = _outermost_object(stripped)
+    if obj:
+        candidates.append(obj)
+        candidates.append(_remove_trailing_commas(obj))
+
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+
+    raise ValueError(f"无法从模型输出中解析JSON对象: {text[:200]}")
@@ -1,29 +1,62 @@
 import os
+import re
+import json
+import uuid
+import asyncio
+import argparse
 from typing import TypedDict, Annotated, Sequence
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from llm_client import create_chat_model
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
+from intent_router import get_intent_router
+from conversation_memory import ConversationMemory
 from skills import search_knowledge_base, query_order, get_product_info, get_refund_policy
+from skills.store import get_store
 
 load_dotenv()
 
-ark_api_key = os.getenv("ARK_API_KEY").strip()
-ark_base_url = os.getenv("ARK_BASE_URL").strip()
-ark_chat_model = os.getenv("ARK_CHAT_MODEL").strip()
+ark_api_key = (os.getenv("ARK_API_KEY") or "").strip()
+ark_base_url = (os.getenv("ARK_BASE_URL") or "").strip()
+ark_chat_model = (os.getenv("ARK_CHAT_MODEL") or "").strip()
 
-llm = ChatOpenAI(
-    model=ark_chat_model,
-    api_key=ark_api_key,
-    base_url=ark_base_url,
-    temperature=0.7
-)
+_llm = None
+
+
+def get_llm():
+    """
+    获取客服系统使用的大模型，第一次调用时才创建客户端
+    通过 swarm_agent.llm = ... 替换过的模型（如测试中的假模型）优先
+
+    Returns:
+        ChatOpenAI 实例或替换后的模型
+    """
+    global _llm
+    override = globals().get("llm")
+    if override is not None:
+        return override
+    if _llm is None:
+        _llm = create_chat_model(
+            model=ark_chat_model,
+            api_key=ark_api_key,
+            base_url=ark_base_url,
+            temperature=0.7
+        )
+    return _llm
+
+
+def __getattr__(name):
+    # 兼容原来的模块属性 swarm_agent.llm，访问时才创建客户端
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], "add"]
     next: str
     question: str
+    history: str
 
 supervisor_prompt = ChatPromptTemplate.from_messages([
     ("system", """你是一个电商客服协调员。请分析用户的问题，判断它属于以下哪一类：
@@ -36,79 +69,124 @@ supervisor_prompt = ChatPromptTemplate.from_messages([
     ("human", "{question}")
 ])
 
+# 专家提示词只描述职责，订单/产品/政策数据由技能工具按问题查询后放在用户消息中，提示词大小与数据量无关
 tech_prompt = ChatPromptTemplate.from_messages([
-    ("system", "你是一个技术支持专家，请根据知识库信息回答用户的技术问题。你可以使用以下知识库信息：\n" + 
-     "登录问题：请检查您的用户名和密码是否正确，确保没有区分大小写错误。如果忘记密码，请点击'忘记密码'进行重置。\n" +
-     "APP崩溃：APP崩溃请尝试以下步骤：1. 清除APP缓存；2. 更新到最新版本；3. 重启设备。如问题仍然存在，请联系技术支持。"),
-    ("human", "{input}")
+    ("system", "你是一个技术支持专家，请根据知识库检索结果回答用户的技术问题。"),
+    ("human", "{input}\n\n知识库检索结果：\n{data}")
 ])
 
 order_prompt = ChatPromptTemplate.from_messages([
-    ("system", "你是一个订单查询专家，请回答用户的订单问题。你可以查询以下示例订单：\n" +
-     "ORD001：状态已发货，物流顺丰快递SF1234567890，金额¥299.00，商品无线蓝牙耳机x1\n" +
-     "ORD002：状态待支付，物流尚未发货，金额¥599.00，商品智能手表x1\n" +
-     "ORD003：状态已完成，物流已签收，金额¥199.00，商品手机壳x2"),
-    ("human", "{input}")
+    ("system", "你是一个订单查询专家，请根据订单查询结果回答用户的订单问题。用户没有提供订单号时，请引导用户提供订单号（格式如ORD001）。"),
+    ("human", "{input}\n\n订单查询结果：\n{data}")
 ])
 
 refund_prompt = ChatPromptTemplate.from_messages([
-    ("system", "你是一个退款售后专家，请指导用户完成退款申请流程。退款政策如下：\n" +
-     "1. 7天无理由退换：商品收到后7天内，未使用且包装完好可申请退换\n" +
-     "2. 质量问题：30天内出现质量问题，可免费退换或维修\n" +
-     "3. 退款流程：进入'我的订单'→选择订单→点击'申请退款'→填写原因提交→等待审核(1-3工作日)→款项3-5工作日原路返回"),
-    ("human", "{input}")
+    ("system", "你是一个退款售后专家，请根据退款售后政策指导用户完成退款申请流程。"),
+    ("human", "{input}\n\n{data}")
 ])
 
 product_prompt = ChatPromptTemplate.from_messages([
-    ("system", "你是一个产品咨询专家，请回答用户的产品问题。产品信息如下：\n" +
-     "无线蓝牙耳机：价格¥299.00，库存充足(50件)，规格：蓝牙5.3，续航24小时，主动降噪\n" +
-     "智能手表：价格¥599.00，库存紧张(3件)，规格：1.4英寸屏幕，心率监测，GPS定位\n" +
-     "手机壳：价格¥99.00，库存充足(100件)，规格：硅胶材质，防摔设计"),
-    ("human", "{input}")
+    ("system", "你是一个产品咨询专家，请根据产品查询结果回答用户的产品问题。"),
+    ("human", "{input}\n\n产品查询结果：\n{data}")
 ])
 
-def supervisor_node(state: AgentState):
+ORDER_ID_PATTERN = re.compile(r'ORD\d+', re.IGNORECASE)
+
+_memory = None
+
+async def _summarize_history(previous_summary, turns):
+    """把较早的对话轮次合并进滚动摘要"""
+    dialogue = "\n".join(f"{'用户' if role == 'human' else '客服'}: {content}" for role, content in turns)
+    prompt = f"""请把以下客服对话压缩为简洁的摘要，保留订单号、商品、用户诉求和已给出的处理结论。
+
+已有摘要：{previous_summary or '无'}
+
+新增对话：
+{dialogue}
+
+只返回摘要内容。"""
+    result = await get_llm().ainvoke(prompt)
+    return result.content.strip()
+
+def get_memory():
+    """获取对话记忆，数据库路径读取环境变量 SWARM_MEMORY_PATH"""
+    global _memory
+    if _memory is None:
+        _memory = ConversationMemory(
+            path=os.getenv("SWARM_MEMORY_PATH", ".cache/conversations.sqlite3"),
+            token_budget=int(os.getenv("SWARM_MEMORY_TOKENS", "1500")),
+            summarizer=_summarize_history
+        )
+    return _memory
+
+def _with_history(state: AgentState):
+    """有历史对话时把历史上下文放在当前问题前面"""
+    history = state.get("history")
+    if not history:
+        return state["question"]
+    return f"{history}\n\n当前问题：{state['question']}"
+
+async def supervisor_node(state: AgentState):
     print(f"\n【协调员】正在分析问题...")
     question = state["question"]
-    response = llm.invoke(supervisor_prompt.format(question=question))
-    category = response.content.strip()
-    print(f"【协调员】问题分类为：{category}")
+    # 本地规则/向量分类足够确定时直接返回，否则再请大模型分类
+    category, source = get_intent_router().route(question)
+    if category is not None:
+        response = AIMessage(content=category)
+    else:
+        response = await get_llm().ainvoke(supervisor_prompt.format(question=question))
+        category = response.content.strip()
+        source = "llm"
+    print(f"【协调员】问题分类为：{category}（{source}）")
     return {
         "messages": [response],
         "next": category
     }
 
-def tech_node(state: AgentState):
+async def tech_node(state: AgentState):
     print(f"\n【技术支持专家】正在处理...")
-    question = state["question"]
-    result = llm.invoke(tech_prompt.format(input=question))
+    question = _with_history(state)
+    data = await search_knowledge_base.ainvoke({"query": state["question"]})
+    result = await get_llm().ainvoke(tech_prompt.format(input=question, data=data))
     return {
         "messages": [AIMessage(content=result.content)],
         "next": "END"
     }
 
-def order_node(state: AgentState):
+async def order_node(state: AgentState):
     print(f"\n【订单查询专家】正在处理...")
-    question = state["question"]
-    result = llm.invoke(order_prompt.format(input=question))
+    question = _with_history(state)
+    # 当前问题没有订单号时，沿用历史对话中提到的订单号
+    order_ids = ORDER_ID_PATTERN.findall(state["question"]) or ORDER_ID_PATTERN.findall(state.get("history") or "")
+    order_ids = list(dict.fromkeys(order_id.upper() for order_id in order_ids))
+    if order_ids:
+        records = await asyncio.gather(*[query_order.ainvoke({"order_id": order_id}) for order_id in order_ids])
+        data = "\n\n".join(records)
+    else:
+        data = "用户未提供订单号"
+    result = await get_llm().ainvoke(order_prompt.format(input=question, data=data))
     return {
         "messages": [AIMessage(content=result.content)],
         "next": "END"
     }
 
-def refund_node(state: AgentState):
+async def refund_node(state: AgentState):
     print(f"\n【退款售后专家】正在处理...")
-    question = state["question"]
-    result = llm.invoke(refund_prompt.format(input=question))
+    question = _with_history(state)
+    data = await get_refund_policy.ainvoke({})
+    result = await get_llm().ainvoke(refund_prompt.format(input=question, data=data))
     return {
         "messages": [AIMessage(content=result.content)],
         "next": "END"
     }
 
-def product_node(state: AgentState):
+async def product_node(state: AgentState):
     print(f"\n【产品咨询专家】正在处理...")
-    question = state["question"]
-    result = llm.invoke(product_prompt.format(input=question))
+    question = _with_history(state)
+    names = get_store().product_names_in(state["question"]) or [state["question"]]
+    records = await asyncio.gather(*[get_product_info.ainvoke({"product_name": name}) for name in names])
+    data = "\n\n".join(records)
+    result = await get_llm().ainvoke(product_prompt.format(input=question, data=data))
     return {
         "messages": [AIMessage(content=result.content)],
         "next": "END"
@@ -146,18 +224,100 @@ workflow.add_edge("product_agent", END)
 
 app = workflow.compile()
 
-def process_question(question: str):
+async def aprocess_question(question: str, session_id: str = None):
+    """
+    回答客服问题
+    
+    Args:
+        question: 用户问题
+        session_id: 会话ID，非空时带上该会话的历史上下文，并在回答后记录本轮对话、在后台压缩历史
+    """
+    memory = get_memory() if session_id else None
     initial_state = {
         "messages": [HumanMessage(content=question)],
         "question": question,
+        "history": memory.format_context(session_id) if memory else "",
         "next": ""
     }
     
-    result = app.invoke(initial_state)
+    result = await app.ainvoke(initial_state)
     final_message = result["messages"][-1]
+    
+    if memory:
+        memory.add_turn(session_id, "human", question)
+        memory.add_turn(session_id, "ai", final_message.content)
+        memory.schedule_compaction(session_id)
+    
     return final_message.content
 
-def main():
+def process_question(question: str, session_id: str = None):
+    async def run():
+        answer = await aprocess_question(question, session_id)
+        # 同步调用结束后事件循环即关闭，需要等后台压缩完成
+        if session_id:
+            await get_memory().wait_for_compactions()
+        return answer
+    
+    return asyncio.run(run())
+
+async def handle_session(reader, writer):
+    """
+    处理一个客户端会话
+    每行一个 UTF-8 问题，按顺序逐行返回 JSON：{"answer": ...} 或 {"error": ...}
+    也可以发送 JSON 行 {"session_id": ..., "question": ...} 以恢复已有会话；纯文本行使用本连接的会话
+    不同会话之间并发处理，互不阻塞
+    """
+    peer = writer.get_extra_info("peername")
+    connection_session = uuid.uuid4().hex
+    print(f"【服务】会话接入: {peer}")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            question = line.decode("utf-8").strip()
+            if not question:
+                continue
+            if question.lower() in ['quit', 'exit', '退出']:
+                break
+            session_id = connection_session
+            if question.startswith("{"):
+                try:
+                    payload = json.loads(question)
+                    question = payload["question"]
+                    session_id = payload.get("session_id") or connection_session
+                except (ValueError, KeyError):
+                    pass
+            try:
+                reply = {"answer": await aprocess_question(question, session_id), "session_id": session_id}
+            except Exception as e:
+                reply = {"error": str(e)}
+            writer.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        print(f"【服务】会话结束: {peer}")
+
+async def serve(host="127.0.0.1", port=8765):
+    """
+    启动本地客服服务，多个会话共用一个进程并发处理
+    
+    Args:
+        host: 监听地址
+        port: 监听端口
+    """
+    server = await asyncio.start_server(handle_session, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"【服务】客服系统已启动: {addresses}")
+    async with server:
+        await server.serve_forever()
+
+async def interactive(session_id):
+    """交互式问答，整个会话共用一个事件循环，历史压缩在后台进行"""
+    loop = asyncio.get_running_loop()
+    
     print("=" * 70)
     print("🐝 蜂群式Agent智能客服系统 - 真正使用LangChain + LangGraph")
     print("=" * 70)
@@ -166,22 +326,38 @@ def main():
     print("  ✅ LangGraph - 状态机工作流")
     print("  ✅ 豆包大模型 - 火山方舟API")
     print("=" * 70)
+    print(f"\n会话ID: {session_id}")
     print("\n请输入您的问题（输入 'quit' 退出）：\n")
     
     while True:
-        user_input = input("用户: ")
+        user_input = await loop.run_in_executor(None, input, "用户: ")
         
         if user_input.lower() in ['quit', 'exit', '退出']:
+            await get_memory().wait_for_compactions()
             print("\n感谢使用，再见！")
             break
         
         try:
-            response = process_question(user_input)
+            response = await aprocess_question(user_input, session_id)
             print(f"\n客服: {response}\n")
             print("-" * 70)
         except Exception as e:
             print(f"\n【错误】发生异常: {str(e)}\n")
             print("-" * 70)
 
+def main():
+    parser = argparse.ArgumentParser(description="蜂群式Agent智能客服系统")
+    parser.add_argument("--serve", action="store_true", help="以本地 socket 服务方式运行，并发处理多个会话")
+    parser.add_argument("--host", default="127.0.0.1", help="服务监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="服务监听端口")
+    parser.add_argument("--session", default=None, help="恢复指定会话ID的对话记忆")
+    args = parser.parse_args()
+    
+    if args.serve:
+        asyncio.run(serve(args.host, args.port))
+        return
+    
+    asyncio.run(interactive(args.session or uuid.uuid4().hex))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,211 @@
+"""
+轻量级调用追踪
+按阶段（协调员规划、专家执行、充分性评审、汇总）、专家和轮次记录 span，
+每个 span 记录耗时、输入/输出Token数、命中服务端前缀缓存的输入Token数和排队等待时间。
+
+- 结束的 span 写入 JSONL 追踪文件（环境变量 AGENT_TRACE_FILE 或 configure_tracing() 指定）
+- 进程内按 span 名称维护耗时直方图，通过 get_tracer().summary() 查看 p50/p95/p99
+- 子 span 结束时把Token数累加到父 span，round/run 上即为整轮/整次调研的Token总数
+"""
+import os
+import json
+import math
+import time
+import uuid
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("agent_current_span", default=None)
+
+
+class Span:
+    """一次被追踪的操作"""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.attributes = dict(attributes or {})
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        """设置 span 属性"""
+        self.attributes.update(attributes)
+
+    def add_tokens(self, input_tokens=0, output_tokens=0, cached_tokens=0):
+        """累加Token数，cached_tokens 为输入中命中前缀缓存的部分"""
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.started_at, 3),
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+def _percentile(ordered, q):
+    """最近秩百分位数"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Tracer:
+    """
+    span 记录器
+
+    Args:
+        path: JSONL 追踪文件路径，None 表示只保留进程内直方图
+        max_samples: 每个直方图保留的最近样本数
+    """
+
+    def __init__(self, path=None, max_samples=10000):
+        self.path = path
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        记录一个 span，嵌套调用（包括 asyncio 子任务中）自动关联父 span
+
+        Args:
+            name: span 名称，如 plan/agent/summarize/llm
+            attributes: span 属性，含 agent 属性时额外按 "名称:agent" 统计直方图
+        """
+        parent = _current_span.get()
+        span = Span(name, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span):
+        span.duration = time.monotonic() - span._start
+        if span.parent is not None:
+            span.parent.add_tokens(span.input_tokens, span.output_tokens, span.cached_tokens)
+
+        self.observe(span.name, span.duration)
+        if "agent" in span.attributes:
+            self.observe(f"{span.name}:{span.attributes['agent']}", span.duration)
+
+        if self.path:
+            line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+            with self._lock:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+
+    def observe(self, name, value):
+        """向直方图记录一个样本（秒）"""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def histogram(self, name):
+        """
+        返回指定直方图的统计
+
+        Returns:
+            {"count", "mean", "p50", "p95", "p99", "max"}，没有样本时返回 None
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        return {
+            "count": len(samples),
+            "mean": round(sum(samples) / len(samples), 4),
+            "p50": round(_percentile(samples, 50), 4),
+            "p95": round(_percentile(samples, 95), 4),
+            "p99": round(_percentile(samples, 99), 4),
+            "max": round(samples[-1], 4)
+        }
+
+    def summary(self):
+        """返回全部直方图的统计 {名称: 统计}"""
+        with self._lock:
+            names = sorted(self._samples)
+        return {name: self.histogram(name) for name in names}
+
+    def reset(self):
+        """清空直方图"""
+        with self._lock:
+            self._samples.clear()
+
+
+_tracer = Tracer(path=os.getenv("AGENT_TRACE_FILE", "").strip() or None)
+
+
+def get_tracer():
+    """获取进程内共享的 Tracer"""
+    return _tracer
+
+
+def configure_tracing(path):
+    """
+    设置 JSONL 追踪文件
+
+    Args:
+        path: 文件路径，None 表示关闭文件导出
+    """
+    _tracer.path = path
+    return _tracer
+
+
+def span(name, **attributes):
+    """在共享 Tracer 上记录 span，用法：with span("plan"): ..."""
+    return _tracer.span(name, **attributes)
+
+
+def current_span():
+    """返回当前上下文中的 span，没有时返回 None"""
+    return _current_span.get()
+
+
+def cached_tokens_of(usage):
+    """从 usage_metadata 中取出命中前缀缓存的输入Token数（input_token_details.cache_read）"""
+    details = (usage or {}).get("input_token_details") or {}
+    return details.get("cache_read") or 0
+
+
+def record_usage(message):
+    """
+    把模型响应中的 usage_metadata 累加到当前 span
+
+    Args:
+        message: AIMessage / AIMessageChunk
+    """
+    current = _current_span.get()
+    usage = getattr(message, "usage_metadata", None)
+    if current is None or not usage:
+        return
+    current.add_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached_tokens_of(usage))
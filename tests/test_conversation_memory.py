@@ -0,0 +1,80 @@
+"""
+测试多轮对话记忆
+验证Token预算、滚动摘要压缩和会话恢复
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import tempfile
+from conversation_memory import ConversationMemory
+
+
+def test_budget_and_compaction():
+    """测试超出预算后较早轮次被压缩为摘要"""
+    print("\n" + "=" * 80)
+    print("测试1: 预算与压缩")
+    print("=" * 80)
+
+    summarized = []
+
+    async def summarizer(previous_summary, turns):
+        summarized.append(turns)
+        return (previous_summary + " | " if previous_summary else "") + f"{len(turns)}轮摘要"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memory.sqlite3")
+        memory = ConversationMemory(path=path, token_budget=100, summarizer=summarizer)
+
+        async def chat():
+            for i in range(10):
+                memory.add_turn("s1", "human", f"问题{i}" + "内容" * 5)
+                memory.add_turn("s1", "ai", f"回答{i}" + "内容" * 5)
+                memory.schedule_compaction("s1")
+                await asyncio.sleep(0)
+            await memory.wait_for_compactions()
+
+        asyncio.run(chat())
+        assert memory._compactions == {}
+
+        summary, recent = memory.get_context("s1")
+        assert summary.endswith("轮摘要")
+        assert recent[-1] == ("ai", "回答9" + "内容" * 5)
+        assert summarized
+
+        context = memory.format_context("s1")
+        assert context.startswith("更早对话摘要：")
+        assert "问题0" not in context
+        memory.close()
+
+        # 重新打开数据库恢复会话，只读取摘要和未压缩的轮次
+        resumed = ConversationMemory(path=path, token_budget=100)
+        assert resumed.get_context("s1") == (summary, recent)
+        assert resumed.get_context("other") == ("", [])
+        resumed.close()
+
+    print(f"✅ 压缩 {len(summarized)} 次，保留最近 {len(recent)} 轮原文")
+
+
+def test_context_without_summarizer():
+    """测试没有摘要函数时按预算截取最近轮次"""
+    print("\n" + "=" * 80)
+    print("测试2: 预算截取")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = ConversationMemory(path=os.path.join(tmp, "memory.sqlite3"), token_budget=10)
+        for i in range(5):
+            memory.add_turn("s1", "human", f"第{i}轮")
+        _, recent = memory.get_context("s1")
+        assert [content for _, content in recent] == ["第2轮", "第3轮", "第4轮"]
+        assert memory.schedule_compaction("s1") is None
+        memory.close()
+
+    print("✅ 最近轮次不超过预算")
+
+
+if __name__ == "__main__":
+    test_budget_and_compaction()
+    test_context_without_summarizer()
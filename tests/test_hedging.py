@@ -0,0 +1,245 @@
+"""
+测试对冲请求与自适应超时
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+import httpx
+import openai
+from langchain_core.messages import AIMessage
+from hedging import LatencyTracker, HedgedCaller, is_retryable
+from llm_dispatcher import LLMDispatcher
+from agent_framework import AgentConfig, CoordinatorAgent, AgentOrchestrator, TaskAssignment
+from mock_llm import MockChatModel, install_mock_llm
+
+
+def _warm_tracker(key, seconds, count=20):
+    tracker = LatencyTracker(min_samples=10)
+    for _ in range(count):
+        tracker.record(key, seconds)
+    return tracker
+
+
+def test_hedge_wins_over_slow_call():
+    """测试慢调用超过 p95 后由对冲请求胜出，慢调用被取消"""
+    print("\n" + "=" * 80)
+    print("测试1: 对冲请求")
+    print("=" * 80)
+
+    caller = HedgedCaller(tracker=_warm_tracker("expert", 0.02), min_timeout=1.0)
+    calls = []
+    cancelled = []
+
+    async def factory_call(index):
+        try:
+            await asyncio.sleep(2.0 if index == 0 else 0.01)
+            return f"结果{index}"
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+
+    def factory():
+        calls.append(len(calls))
+        return factory_call(calls[-1])
+
+    async def run():
+        result = await caller.call("expert", factory)
+        await asyncio.sleep(0)
+        return result
+
+    start = time.monotonic()
+    result = asyncio.run(run())
+    elapsed = time.monotonic() - start
+
+    assert result == "结果1"
+    assert elapsed < 0.5
+    assert cancelled == [0]
+    assert caller.stats()["hedges"] == 1
+    assert caller.stats()["hedge_wins"] == 1
+
+    print(f"✅ 对冲请求胜出，耗时 {elapsed:.2f}秒")
+
+
+def test_retry_with_backoff():
+    """测试失败后退避重试"""
+    print("\n" + "=" * 80)
+    print("测试2: 退避重试")
+    print("=" * 80)
+
+    caller = HedgedCaller(max_retries=2, backoff_base=0.01)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("连接被重置")
+        return "成功"
+
+    assert asyncio.run(caller.call("expert", flaky)) == "成功"
+    assert len(attempts) == 3
+    assert caller.stats()["retries"] == 2
+    assert all(0 <= caller.backoff(n) <= min(caller.backoff_max, caller.backoff_base * 2 ** n) for n in range(6))
+
+    print("✅ 第3次调用成功")
+
+
+def test_adaptive_timeout():
+    """测试自适应超时"""
+    print("\n" + "=" * 80)
+    print("测试3: 自适应超时")
+    print("=" * 80)
+
+    caller = HedgedCaller(default_timeout=0.05, max_retries=0)
+    assert caller.timeout_for("expert") == 0.05
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    try:
+        asyncio.run(caller.call("expert", hang))
+        assert False, "应当超时"
+    except asyncio.TimeoutError:
+        pass
+    assert caller.stats()["timeouts"] == 1
+
+    caller = HedgedCaller(tracker=_warm_tracker("expert", 2.0), timeout_multiplier=3.0, min_timeout=1.0)
+    assert caller.timeout_for("expert") == 6.0
+
+    print("✅ 超时时间随历史耗时调整")
+
+
+class _ConcurrencyProbe:
+    """记录同时进行的模型调用数的假模型"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.seconds)
+            return AIMessage(content="专家输出")
+        finally:
+            self.active -= 1
+
+
+def test_hedges_respect_dispatcher():
+    """测试对冲请求经调度器排队，不突破模型并发上限"""
+    print("\n" + "=" * 80)
+    print("测试4: 对冲请求与并发上限")
+    print("=" * 80)
+
+    configs = {
+        name: AgentConfig(name=name, role=name, system_prompt=f"你是{name}。", description=name)
+        for name in ["expert_a", "expert_b"]
+    }
+    tracker = LatencyTracker(min_samples=10)
+    for name in configs:
+        for _ in range(20):
+            tracker.record(name, 0.02)
+    hedger = HedgedCaller(tracker=tracker, min_timeout=5.0)
+    orchestrator = AgentOrchestrator(
+        coordinator=CoordinatorAgent(available_agents=configs),
+        agent_configs=configs,
+        dispatcher=LLMDispatcher(max_concurrency=1),
+        hedger=hedger
+    )
+    tasks = [TaskAssignment(name, "任务", task_id=name) for name in configs]
+
+    with install_mock_llm(_ConcurrencyProbe(0.1)) as probe:
+        results = asyncio.run(orchestrator.execute_tasks_concurrently(tasks))
+
+    assert all(result["success"] for result in results)
+    assert hedger.stats()["hedges"] >= 1
+    assert probe.peak == 1
+
+    print(f"✅ 发起 {hedger.stats()['hedges']} 次对冲请求，同时进行的模型调用最多 {probe.peak} 个")
+
+
+def _status_error(cls, status):
+    request = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+    return cls("错误", response=httpx.Response(status, request=request), body=None)
+
+
+def test_retry_only_transient_errors():
+    """测试只重试超时、限流、服务端错误和连接错误"""
+    print("\n" + "=" * 80)
+    print("测试5: 可重试的错误")
+    print("=" * 80)
+
+    request = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(openai.APITimeoutError(request=request))
+    assert is_retryable(openai.APIConnectionError(request=request))
+    assert is_retryable(_status_error(openai.RateLimitError, 429))
+    assert is_retryable(_status_error(openai.InternalServerError, 503))
+    assert not is_retryable(_status_error(openai.BadRequestError, 400))
+    assert not is_retryable(_status_error(openai.AuthenticationError, 401))
+    assert not is_retryable(ValueError("解析失败"))
+
+    caller = HedgedCaller(max_retries=2, backoff_base=0.01)
+    attempts = []
+
+    async def unauthorized():
+        attempts.append(1)
+        raise _status_error(openai.AuthenticationError, 401)
+
+    try:
+        asyncio.run(caller.call("expert", unauthorized))
+        assert False, "401 应当直接抛出"
+    except openai.AuthenticationError:
+        pass
+    assert len(attempts) == 1
+    assert caller.stats()["retries"] == 0
+
+    print("✅ 401 不重试，超时/429/5xx/连接错误可重试")
+
+
+def test_queue_wait_not_timed():
+    """测试排队等待槽位的时间不计入超时和耗时样本"""
+    print("\n" + "=" * 80)
+    print("测试6: 排队不计时")
+    print("=" * 80)
+
+    configs = {
+        f"expert_{i}": AgentConfig(name=f"expert_{i}", role=f"专家{i}", system_prompt=f"你是专家{i}。")
+        for i in range(4)
+    }
+    hedger = HedgedCaller(default_timeout=0.5, max_retries=0)
+    orchestrator = AgentOrchestrator(
+        coordinator=CoordinatorAgent(available_agents=configs),
+        agent_configs=configs,
+        dispatcher=LLMDispatcher(max_concurrency=1),
+        hedger=hedger
+    )
+    tasks = [TaskAssignment(name, "任务", task_id=name) for name in configs]
+
+    with install_mock_llm(MockChatModel(latency_ms=300)):
+        results = asyncio.run(orchestrator.execute_tasks_concurrently(tasks))
+
+    # 4个任务串行执行约1.2秒，每个只执行0.3秒，不应超时
+    assert all(result["success"] for result in results), results
+    assert hedger.stats()["timeouts"] == 0
+    assert all(hedger.tracker._samples[name][0] < 0.45 for name in configs)
+
+    print("✅ 排队1秒左右的任务未超时，耗时样本只含执行时间")
+
+
+if __name__ == "__main__":
+    test_hedge_wins_over_slow_call()
+    test_retry_with_backoff()
+    test_adaptive_timeout()
+    test_hedges_respect_dispatcher()
+    test_retry_only_transient_errors()
+    test_queue_wait_not_timed()
@@ -0,0 +1,78 @@
+"""
+测试客服问题意图快速分类
+只使用关键词规则（不依赖向量模型），验证确定时跳过大模型、不确定时回退
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from langchain_core.messages import AIMessage
+from intent_router import IntentRouter
+import intent_router
+import swarm_agent
+from mock_llm import install_mock_llm
+
+
+def test_keyword_rules():
+    """测试关键词规则"""
+    print("\n" + "=" * 80)
+    print("测试1: 关键词规则")
+    print("=" * 80)
+
+    router = IntentRouter(use_embeddings=False)
+
+    assert router.route("我的APP登录不上去了，怎么办？") == ("A", "rule")
+    assert router.route("帮我查一下ORD001这个订单的物流信息") == ("B", "rule")
+    assert router.route("帮我看看 ord002") == ("B", "rule")
+    assert router.route("我想申请退款，请问流程是怎样的？") == ("C", "rule")
+    assert router.route("无线蓝牙耳机多少钱？有什么功能？") == ("D", "rule")
+
+    # 同时命中多个类别或没有命中时不确定
+    assert router.route("ORD001 我想退款") == (None, None)
+    assert router.route("你好") == (None, None)
+    # 功能异常属于技术问题，同时命中产品咨询的"功能"时交给大模型判断
+    assert router.route("手表的心率功能异常") == (None, None)
+
+    assert router.stats() == {"rule": 5, "fallback": 3}
+
+    print("✅ 单一类别直接返回，多类别或未命中时回退")
+
+
+class CountingModel:
+    """记录调用次数的假模型"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        return AIMessage(content="C")
+
+
+def test_supervisor_fast_path():
+    """测试协调员节点只在不确定时调用大模型"""
+    print("\n" + "=" * 80)
+    print("测试2: 协调员快速分类")
+    print("=" * 80)
+
+    fake = CountingModel()
+    original_router = intent_router._shared_router
+    intent_router._shared_router = IntentRouter(use_embeddings=False)
+    try:
+        with install_mock_llm(fake, modules=("swarm_agent",)):
+            fast = asyncio.run(swarm_agent.supervisor_node({"question": "帮我查一下ORD001的物流", "messages": [], "next": ""}))
+            slow = asyncio.run(swarm_agent.supervisor_node({"question": "ORD001 我想退款", "messages": [], "next": ""}))
+    finally:
+        intent_router._shared_router = original_router
+
+    assert fast["next"] == "B"
+    assert slow["next"] == "C"
+    assert fake.calls == 1
+
+    print("✅ 规则命中时不调用大模型")
+
+
+if __name__ == "__main__":
+    test_keyword_rules()
+    test_supervisor_fast_path()
@@ -0,0 +1,115 @@
+"""
+测试技术知识库检索
+验证不同说法的召回、外部 FAQ 文件加载，以及数千条目（大量共用常见字词）时每次查询计分的候选数有上限
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import random
+import tempfile
+from skills import knowledge_base
+from skills.knowledge_base import KnowledgeBase, DEFAULT_ENTRIES, load_entries
+from skill_index import LexicalIndex, tokenize
+
+
+def test_fuzzy_match():
+    """测试换一种说法也能命中"""
+    print("\n" + "=" * 80)
+    print("测试1: 模糊匹配")
+    print("=" * 80)
+
+    kb = KnowledgeBase(use_embeddings=False)
+
+    assert kb.search("我登录不上去了")[0]["title"] == "登录问题"
+    assert kb.search("我的APP登录不上去了，怎么办？")[0]["title"] == "登录问题"
+    assert kb.search("登不上")[0]["title"] == "登录问题"
+    assert kb.search("APP一打开就闪退")[0]["title"] == "APP崩溃"
+    assert kb.search("付款失败了怎么办")[0]["title"] == "支付问题"
+    assert kb.search("我的订单在哪看")[0]["title"] == "订单查询"
+    assert kb.search("今天天气怎么样") == []
+
+    print("✅ 不同说法均命中对应条目，无关问题不返回")
+
+
+def test_load_faq_file():
+    """测试从外部文件加载"""
+    print("\n" + "=" * 80)
+    print("测试2: 加载 FAQ 文件")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "faq.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"question": "如何开发票", "answer": "在订单详情页申请电子发票。"}, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"title": "修改收货地址", "answer": "发货前可在订单详情页修改地址。"}, ensure_ascii=False) + "\n")
+
+        json_path = os.path.join(tmp, "faq.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(dict(DEFAULT_ENTRIES), f, ensure_ascii=False)
+
+        entries = load_entries(jsonl_path)
+        assert entries[1] == ("修改收货地址", "发货前可在订单详情页修改地址。")
+        assert load_entries(json_path) == DEFAULT_ENTRIES
+
+    kb = KnowledgeBase(entries + DEFAULT_ENTRIES, use_embeddings=False)
+    assert kb.search("发票怎么开")[0]["answer"] == "在订单详情页申请电子发票。"
+
+    print("✅ JSON 和 JSONL 文件均可加载")
+
+
+def test_query_cost():
+    """测试数千条目、查询与条目大量共用常见字词时，常见字组的倒排表被截断，每次查询计分的候选数有上限"""
+    print("\n" + "=" * 80)
+    print("测试3: 查询开销")
+    print("=" * 80)
+
+    rng = random.Random(0)
+    words = ["我的", "账号", "登录", "不上", "怎么", "办", "了", "密码", "忘记", "支付", "失败", "订单",
+             "查询", "打开", "发票", "退货", "积分", "会员", "物流", "地址", "客服", "设置", "是", "的",
+             "不", "能", "在", "哪里", "看"]
+    entries = [
+        (f"{''.join(rng.choice(words) for _ in range(3))}问题{i}", "".join(rng.choice(words) for _ in range(20)))
+        for i in range(5000)
+    ] + DEFAULT_ENTRIES
+    queries = ["我登录不上去了", "APP一打开就闪退", "付款失败了怎么办", "我的订单在哪看", "密码忘记了怎么办", "登不上"]
+
+    kb = KnowledgeBase(entries, use_embeddings=False)
+    # 不截断倒排表的索引作为对照
+    original_max_df = knowledge_base.MAX_DOC_FREQ
+    knowledge_base.MAX_DOC_FREQ = None
+    try:
+        exhaustive = KnowledgeBase(entries, use_embeddings=False)
+    finally:
+        knowledge_base.MAX_DOC_FREQ = original_max_df
+
+    cutoff = max(LexicalIndex.MIN_POSTINGS, int(knowledge_base.MAX_DOC_FREQ * len(entries)))
+    scored = {}
+    pairs = [
+        (kb._index, exhaustive._index, tokenize),
+        (kb._fallback, exhaustive._fallback, knowledge_base._unigrams),
+    ]
+    for index, full, tokenizer in pairs:
+        assert index.truncated
+        assert all(len(index._postings[token]) <= cutoff for token in index.truncated)
+        for query in queries:
+            # 候选只来自各查询词（截断后）的倒排表
+            candidates = len(index.scores(query))
+            assert candidates <= len(set(tokenizer(query))) * cutoff
+            scored[query] = scored.get(query, 0) + candidates
+            if set(tokenizer(query)) & index.truncated:
+                assert candidates < len(full.scores(query))
+
+    assert kb.search("APP一打开就闪退")[0]["title"] == "APP崩溃"
+    for query in queries:
+        assert kb.search(query)
+    assert kb.search("我登录不上去了") == exhaustive.search("我登录不上去了")
+
+    print(f"✅ {len(entries)} 条目，倒排表截断到 {cutoff} 条，每次查询最多计分 {max(scored.values())} 个候选")
+
+
+if __name__ == "__main__":
+    test_fuzzy_match()
+    test_load_faq_file()
+    test_query_cost()
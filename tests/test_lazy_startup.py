@@ -0,0 +1,74 @@
+"""
+测试延迟加载
+验证导入框架时不创建大模型客户端、命令行 --help 不加载 LangChain，以及替换 llm 后 get_llm 返回替换的模型
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+import agent_framework
+from benchmarks.import_profile import ROOT, _env, parse_importtime
+
+
+def _run(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=_env(), capture_output=True, text=True,
+                          encoding="utf-8")
+
+
+def test_import_does_not_create_client():
+    """测试导入框架不加载 langchain_openai，第一次调用 get_llm 时才创建"""
+    print("\n" + "=" * 80)
+    print("测试1: 延迟创建大模型客户端")
+    print("=" * 80)
+
+    completed = _run("-c", (
+        "import sys, agent_framework\n"
+        "assert 'langchain_openai' not in sys.modules\n"
+        "llm = agent_framework.get_llm()\n"
+        "assert 'langchain_openai' in sys.modules\n"
+        "assert agent_framework.llm is llm and agent_framework.get_llm() is llm\n"
+    ))
+    assert completed.returncode == 0, completed.stderr
+
+    print("✅ 导入时不创建客户端，第一次使用时创建且只创建一次")
+
+
+def test_help_skips_langchain():
+    """测试命令行 --help 不导入 LangChain"""
+    print("\n" + "=" * 80)
+    print("测试2: --help 快速路径")
+    print("=" * 80)
+
+    for script in ["legal_finance_swarm.py", "research_swarm.py", "run_legal_finance.py"]:
+        completed = _run("-X", "importtime", script, "--help")
+        assert completed.returncode == 0, completed.stderr
+        assert "usage:" in completed.stdout
+        modules = {name for name, _, _, _ in parse_importtime(completed.stderr)}
+        assert not any(name.startswith(("langchain", "langgraph", "openai")) for name in modules), script
+
+    print("✅ --help 只加载命令行解析所需的模块")
+
+
+def test_llm_override():
+    """测试替换 agent_framework.llm 后框架使用替换的模型"""
+    print("\n" + "=" * 80)
+    print("测试3: 替换模型")
+    print("=" * 80)
+
+    fake = object()
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        assert agent_framework.get_llm() is fake
+    finally:
+        agent_framework.llm = original
+    assert agent_framework.get_llm() is original
+
+    print("✅ get_llm 优先返回替换的模型")
+
+
+if __name__ == "__main__":
+    test_import_does_not_create_client()
+    test_help_skips_langchain()
+    test_llm_override()
@@ -0,0 +1,76 @@
+"""
+测试共享大模型客户端
+使用本地 HTTP 服务验证连接复用、多次 asyncio.run 之间共享异步客户端，以及事件循环结束后关闭其连接池
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import llm_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def do_GET(self):
+        _Handler.client_ports.append(self.client_address[1])
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_shared_clients():
+    """测试连接复用和跨事件循环使用"""
+    print("\n" + "=" * 80)
+    print("测试: 共享HTTP连接池")
+    print("=" * 80)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    _Handler.client_ports.clear()
+
+    try:
+        async def fetch_twice():
+            client = llm_client.get_async_http_client()
+            first = await client.get(url)
+            second = await client.get(url)
+            return first.text + second.text
+
+        assert asyncio.run(fetch_twice()) == "okok"
+        assert asyncio.run(fetch_twice()) == "okok"
+
+        # asyncio.run 结束时关闭该事件循环的连接池，不残留已关闭的事件循环和空闲连接
+        transport = llm_client.get_async_http_client()._transport
+        for _ in range(3):
+            asyncio.run(fetch_twice())
+        assert transport._transports == {}
+
+        sync_client = llm_client.get_http_client()
+        assert sync_client.get(url).text == "ok"
+        assert sync_client.get(url).text == "ok"
+    finally:
+        server.shutdown()
+
+    # 每个事件循环内两次请求复用同一连接，同步客户端同理
+    ports = _Handler.client_ports
+    assert ports[0] == ports[1] and ports[2] == ports[3] and ports[-2] == ports[-1]
+
+    model = llm_client.create_chat_model(model="m", api_key="k", base_url=url)
+    assert llm_client.create_chat_model(model="m", api_key="k", base_url=url) is model
+    assert model.http_async_client is llm_client.get_async_http_client()
+
+    print(f"✅ {len(ports)}次请求只建立了 {len(set(ports))} 个连接，事件循环结束后连接池已关闭")
+
+
+if __name__ == "__main__":
+    test_shared_clients()
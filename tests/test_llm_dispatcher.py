@@ -0,0 +1,169 @@
+"""
+测试大模型调用调度器
+验证并发上限、优先级排队和令牌桶限流，以及多个编排器的全部模型调用共用进程级调度器
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+import llm_dispatcher
+from llm_dispatcher import LLMDispatcher, TokenBucket, estimate_tokens, get_dispatcher
+from agent_framework import AgentConfig, CoordinatorAgent, AgentOrchestrator
+from mock_llm import MockChatModel, install_mock_llm
+
+
+def test_concurrency_cap():
+    """测试并发上限"""
+    print("\n" + "=" * 80)
+    print("测试1: 并发上限")
+    print("=" * 80)
+
+    dispatcher = LLMDispatcher(max_concurrency=3)
+    state = {"active": 0, "peak": 0}
+
+    async def fake_call():
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*[
+            dispatcher.submit(fake_call, model="m") for _ in range(20)
+        ])
+
+    results = asyncio.run(run())
+
+    assert len(results) == 20
+    assert all(r == "ok" for r, _ in results)
+    assert state["peak"] == 3
+
+    print(f"✅ 20个调用的最大并发数: {state['peak']}")
+
+
+def test_priority_order():
+    """测试槽位不足时按优先级执行"""
+    print("\n" + "=" * 80)
+    print("测试2: 优先级排队")
+    print("=" * 80)
+
+    dispatcher = LLMDispatcher(max_concurrency=1)
+    started = []
+
+    def make_call(tag):
+        async def call():
+            started.append(tag)
+            await asyncio.sleep(0.001)
+            return tag
+        return call
+
+    async def run():
+        tasks = [asyncio.ensure_future(dispatcher.submit(make_call("first"), priority=5, model="m"))]
+        await asyncio.sleep(0)
+        for tag, priority in [("low", 3), ("high", 1), ("mid", 2)]:
+            tasks.append(asyncio.ensure_future(dispatcher.submit(make_call(tag), priority=priority, model="m")))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert started == ["first", "high", "mid", "low"]
+
+    print(f"✅ 执行顺序: {started}")
+
+
+def test_token_bucket():
+    """测试令牌桶限流"""
+    print("\n" + "=" * 80)
+    print("测试3: 令牌桶限流")
+    print("=" * 80)
+
+    bucket = TokenBucket(per_minute=600)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(605):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    # 600个令牌立即可用，剩余5个按每秒10个补充
+    assert 0.4 <= elapsed < 1.5
+
+    print(f"✅ 605次获取耗时: {elapsed:.2f}秒")
+
+
+def test_estimate_tokens():
+    """测试Token估算"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("合同审查") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+    print("✅ Token估算正确")
+
+
+class _PeakMock(MockChatModel):
+    """记录同时进行的模型调用数"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().ainvoke(messages, **kwargs)
+        finally:
+            self.active -= 1
+
+
+def test_shared_dispatcher():
+    """测试多个编排器的专家、协调员和汇总调用共用进程级调度器的并发上限"""
+    print("\n" + "=" * 80)
+    print("测试5: 进程级调度器")
+    print("=" * 80)
+
+    configs = {
+        name: AgentConfig(name=name, role=name, system_prompt=f"你是{name}。", description=name)
+        for name in ["expert_a", "expert_b"]
+    }
+    original = llm_dispatcher._default_dispatcher
+    llm_dispatcher._default_dispatcher = LLMDispatcher(max_concurrency=2)
+    try:
+        orchestrators = [
+            AgentOrchestrator(
+                coordinator=CoordinatorAgent(available_agents=configs),
+                agent_configs=configs,
+                hedger=False
+            )
+            for _ in range(3)
+        ]
+        assert all(o.dispatcher is get_dispatcher() for o in orchestrators)
+
+        async def run():
+            return await asyncio.gather(*[o.run("分析市场", max_rounds=1) for o in orchestrators])
+
+        with install_mock_llm(_PeakMock(latency_ms=20, fan_out=2)) as mock:
+            summaries = asyncio.run(run())
+    finally:
+        llm_dispatcher._default_dispatcher = original
+
+    assert all(summaries)
+    # 每个编排器：规划 1 次、专家 2 次、汇总 1 次
+    assert mock.stats()["calls"] >= 12
+    assert mock.peak == 2
+
+    print(f"✅ 3个编排器共 {mock.stats()['calls']} 次模型调用，同时进行的最多 {mock.peak} 个")
+
+
+if __name__ == "__main__":
+    test_concurrency_cap()
+    test_priority_order()
+    test_token_bucket()
+    test_estimate_tokens()
+    test_shared_dispatcher()
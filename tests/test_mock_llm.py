@@ -0,0 +1,76 @@
+"""
+测试离线假大模型
+验证延迟分布、失败注入、协调员回复格式，以及替换 agent_framework.llm 驱动完整编排流程
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+import agent_framework
+from agent_framework import AgentConfig, CoordinatorAgent, AgentOrchestrator
+from mock_llm import MockChatModel, MockLLMError, install_mock_llm
+
+
+def test_latency_and_failures():
+    """测试延迟、输出速度与失败注入"""
+    print("\n" + "=" * 80)
+    print("测试1: 延迟与失败注入")
+    print("=" * 80)
+
+    model = MockChatModel(latency_ms=20, distribution="uniform", jitter=0.5, output_tokens=10,
+                          tokens_per_second=1000, seed=1)
+    start = time.perf_counter()
+    message = asyncio.run(model.ainvoke("你好"))
+    elapsed = time.perf_counter() - start
+    assert 0.01 <= elapsed < 0.2
+    assert message.usage_metadata["output_tokens"] > 0
+
+    for distribution in ("fixed", "lognormal", "exponential"):
+        sampler = MockChatModel(latency_ms=100, distribution=distribution, seed=2)
+        assert all(s >= 0 for s in (sampler._sample_latency() for _ in range(100)))
+
+    failing = MockChatModel(failure_rate=1.0)
+    try:
+        asyncio.run(failing.ainvoke("你好"))
+        assert False, "应注入失败"
+    except MockLLMError:
+        pass
+    assert failing.stats()["failures"] == 1
+
+    print(f"✅ 单次调用耗时 {elapsed * 1000:.1f}ms，失败注入生效")
+
+
+def test_orchestrator_with_mock():
+    """测试用假模型驱动编排器"""
+    print("\n" + "=" * 80)
+    print("测试2: 驱动编排流程")
+    print("=" * 80)
+
+    configs = {
+        name: AgentConfig(name=name, role=f"{name}角色", system_prompt=f"你是{name}。", description=name)
+        for name in ["expert_a", "expert_b", "expert_c"]
+    }
+    orchestrator = AgentOrchestrator(
+        coordinator=CoordinatorAgent(available_agents=configs),
+        agent_configs=configs,
+        hedger=False
+    )
+
+    original = agent_framework.llm
+    with install_mock_llm(MockChatModel(fan_out=3, seed=0)) as mock:
+        assert agent_framework.llm is mock
+        summary = asyncio.run(orchestrator.run("测试需求", max_rounds=2))
+    assert agent_framework.llm is original
+
+    assert summary.startswith("模拟调研报告")
+    # 规划 + 3个专家 + 汇总/推测规划/充分性评审，第二轮没有新任务提前结束
+    assert mock.stats()["calls"] == 7
+
+    print(f"✅ 编排完成，模型调用 {mock.stats()['calls']} 次")
+
+
+if __name__ == "__main__":
+    test_latency_and_failures()
+    test_orchestrator_with_mock()
@@ -0,0 +1,297 @@
+"""
+编排器离线测试
+使用本地假模型替换 agent_framework.llm，不访问大模型接口
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import asyncio
+from langchain_core.messages import AIMessage, AIMessageChunk
+import agent_framework
+from agent_framework import AgentConfig, CoordinatorAgent, AgentOrchestrator, TaskAssignment
+
+
+class FakeChatModel:
+    """按提示词内容返回固定回复的假模型，并记录每次调用的提示词"""
+
+    def __init__(self, plans, sufficient=False):
+        self.plans = list(plans)
+        self.sufficient = sufficient
+        self.prompts = []
+
+    def _reply(self, messages):
+        text = messages if isinstance(messages, str) else "\n".join(m.content for m in messages)
+        self.prompts.append(text)
+        if "任务协调员" in text:
+            plan = self.plans.pop(0) if self.plans else []
+            return json.dumps({"task_assignments": plan, "explanation": "测试"}, ensure_ascii=False)
+        if "调研质量评审员" in text:
+            return json.dumps({"sufficient": self.sufficient, "missing": ""})
+        if "调研报告汇总专家" in text:
+            return f"报告#{len(self.prompts)}"
+        return f"专家输出#{len(self.prompts)}"
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(0)
+        return AIMessage(content=self._reply(messages))
+
+    def invoke(self, messages, **kwargs):
+        return AIMessage(content=self._reply(messages))
+
+    async def astream(self, messages, **kwargs):
+        reply = self._reply(messages)
+        for i in range(0, len(reply), 4):
+            await asyncio.sleep(0)
+            yield AIMessageChunk(content=reply[i:i + 4])
+
+
+def _create_orchestrator(**kwargs):
+    configs = {
+        name: AgentConfig(name=name, role=f"{name}角色", system_prompt=f"你是{name}。", description=name)
+        for name in ["expert_a", "expert_b", "expert_c"]
+    }
+    coordinator = CoordinatorAgent(available_agents=configs)
+    return AgentOrchestrator(coordinator=coordinator, agent_configs=configs, **kwargs)
+
+
+def _run(orchestrator, fake, request="测试需求", max_rounds=2):
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        return asyncio.run(orchestrator.run(request, max_rounds=max_rounds))
+    finally:
+        agent_framework.llm = original
+
+
+def test_incremental_summary():
+    """测试增量汇总只发送本轮新结果"""
+    print("\n" + "=" * 80)
+    print("测试1: 增量汇总")
+    print("=" * 80)
+
+    fake = FakeChatModel([
+        [{"agent_name": "expert_a", "task_description": "第一轮任务", "priority": 1}],
+        [{"agent_name": "expert_b", "task_description": "第二轮任务", "priority": 1}],
+    ])
+    orchestrator = _create_orchestrator(incremental_summary=True)
+
+    summary = _run(orchestrator, fake)
+
+    summary_prompts = [p for p in fake.prompts if "调研报告汇总专家" in p]
+    assert len(summary_prompts) == 2
+    assert "expert_a角色" in summary_prompts[0]
+    assert "expert_a角色" not in summary_prompts[1]
+    assert "expert_b角色" in summary_prompts[1]
+    assert "已有调研报告" in summary_prompts[1]
+    assert summary.startswith("报告#")
+
+    print("✅ 第二轮汇总只包含本轮新增结果和上一轮报告")
+
+
+def test_astream_run():
+    """测试流式事件"""
+    print("\n" + "=" * 80)
+    print("测试2: 流式事件")
+    print("=" * 80)
+
+    fake = FakeChatModel([
+        [
+            {"agent_name": "expert_a", "task_description": "任务A", "priority": 1},
+            {"agent_name": "expert_b", "task_description": "任务B", "priority": 2},
+        ],
+    ])
+    orchestrator = _create_orchestrator()
+
+    async def collect():
+        return [event async for event in orchestrator.astream_run("测试需求", max_rounds=1)]
+
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        events = asyncio.run(collect())
+    finally:
+        agent_framework.llm = original
+
+    types = [e["type"] for e in events]
+    assert types[0] == "round_start"
+    assert types[1] == "plan"
+    assert types[-1] == "done"
+    assert types.count("agent_start") == 2
+    assert types.count("agent_end") == 2
+
+    for name in ["expert_a", "expert_b"]:
+        streamed = "".join(e["content"] for e in events if e["type"] == "token" and e["agent_name"] == name)
+        end = next(e for e in events if e["type"] == "agent_end" and e["agent_name"] == name)
+        assert streamed == end["result"]["output"]
+
+    streamed_summary = "".join(e["content"] for e in events if e["type"] == "summary_token")
+    assert streamed_summary == events[-1]["summary"]
+
+    print(f"✅ 共产出 {len(events)} 个事件，流式片段拼接结果与最终输出一致")
+
+
+def test_task_graph():
+    """测试依赖图调度"""
+    print("\n" + "=" * 80)
+    print("测试3: 依赖图调度")
+    print("=" * 80)
+
+    orchestrator = _create_orchestrator()
+    timeline = []
+
+    async def fake_ainvoke(agent, input_text):
+        timeline.append(("start", agent.name, input_text))
+        await asyncio.sleep(0.02)
+        timeline.append(("end", agent.name, input_text))
+        return {"output": f"{agent.name}的结论"}
+
+    for agent in orchestrator.agent_instances.values():
+        agent.ainvoke = lambda text, agent=agent: fake_ainvoke(agent, text)
+
+    task_assignments = [
+        TaskAssignment("expert_b", "汇总分析", task_id="t2", depends_on=["t1"]),
+        TaskAssignment("expert_a", "基础调研", task_id="t1"),
+        TaskAssignment("expert_c", "独立调研", task_id="t3"),
+    ]
+
+    results = asyncio.run(orchestrator.execute_tasks_concurrently(task_assignments))
+
+    assert [r["task_id"] for r in results] == ["t2", "t1", "t3"]
+    assert results[0]["task_description"] == "汇总分析"
+
+    events = [(kind, name) for kind, name, _ in timeline]
+    assert events.index(("end", "expert_a")) < events.index(("start", "expert_b"))
+    assert events.index(("start", "expert_c")) < events.index(("end", "expert_a"))
+
+    downstream_input = next(text for kind, name, text in timeline if kind == "start" and name == "expert_b")
+    assert "expert_a的结论" in downstream_input
+
+    print("✅ 下游任务在上游完成后启动并收到上游输出，独立任务并行执行")
+
+
+def test_task_graph_cycle():
+    """测试循环依赖和无效依赖不会卡住调度"""
+    print("\n" + "=" * 80)
+    print("测试4: 循环依赖")
+    print("=" * 80)
+
+    orchestrator = _create_orchestrator()
+
+    async def fake_ainvoke(text):
+        return {"output": "完成"}
+
+    for agent in orchestrator.agent_instances.values():
+        agent.ainvoke = fake_ainvoke
+
+    task_assignments = [
+        TaskAssignment("expert_a", "任务1", task_id="t1", depends_on=["t2"]),
+        TaskAssignment("expert_b", "任务2", task_id="t2", depends_on=["t1"]),
+        TaskAssignment("expert_c", "任务3", task_id="t3", depends_on=["t9"]),
+    ]
+
+    results = asyncio.run(asyncio.wait_for(orchestrator.execute_tasks_concurrently(task_assignments), 5))
+
+    assert all(r["success"] for r in results)
+
+    print("✅ 循环依赖被拆除，所有任务执行完成")
+
+
+def test_early_exit():
+    """测试推测规划没有新任务或需求已覆盖时提前结束"""
+    print("\n" + "=" * 80)
+    print("测试5: 提前结束")
+    print("=" * 80)
+
+    round_one = [{"agent_name": "expert_a", "task_description": "第一轮任务", "priority": 1}]
+
+    fake = FakeChatModel([round_one, round_one])
+    _run(_create_orchestrator(), fake, max_rounds=3)
+    expert_prompts = [p for p in fake.prompts if "你是expert_" in p]
+    assert len(expert_prompts) == 1
+
+    fake = FakeChatModel(
+        [round_one, [{"agent_name": "expert_a", "task_description": "补充任务", "priority": 1}]],
+        sufficient=True
+    )
+    _run(_create_orchestrator(), fake, max_rounds=3)
+    expert_prompts = [p for p in fake.prompts if "你是expert_" in p]
+    assert len(expert_prompts) == 1
+
+    fake = FakeChatModel(
+        [round_one, [{"agent_name": "expert_a", "task_description": "补充任务", "priority": 1}], []],
+        sufficient=False
+    )
+    _run(_create_orchestrator(), fake, max_rounds=3)
+    expert_prompts = [p for p in fake.prompts if "你是expert_" in p]
+    assert len(expert_prompts) == 2
+
+    fake = FakeChatModel([round_one, round_one])
+    _run(_create_orchestrator(early_exit=False), fake, max_rounds=2)
+    expert_prompts = [p for p in fake.prompts if "你是expert_" in p]
+    assert len(expert_prompts) == 2
+
+    print("✅ 无新任务或评审通过时只执行一轮，否则继续下一轮")
+
+
+def test_run_batch():
+    """测试批量执行共用编排器并限制并发，结果回调出错不影响其余需求"""
+    print("\n" + "=" * 80)
+    print("测试6: 批量执行")
+    print("=" * 80)
+
+    plan = [{"agent_name": "expert_a", "task_description": "任务", "priority": 1}]
+    fake = FakeChatModel([plan, plan, plan, plan])
+    orchestrator = _create_orchestrator()
+
+    in_flight = {"now": 0, "max": 0}
+    run = orchestrator.run
+
+    async def tracked_run(user_request, max_rounds=2):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            await asyncio.sleep(0.01)
+            if user_request == "失败需求":
+                raise RuntimeError("模拟失败")
+            return await run(user_request, max_rounds)
+        finally:
+            in_flight["now"] -= 1
+
+    orchestrator.run = tracked_run
+    completed = []
+
+    def on_result(item):
+        completed.append(item["index"])
+        if item["index"] == 3:
+            raise IOError("模拟写出报告失败")
+
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        results = asyncio.run(orchestrator.run_batch(
+            ["需求1", "失败需求", "需求3", "需求4"],
+            max_rounds=1,
+            concurrency=2,
+            on_result=on_result
+        ))
+    finally:
+        agent_framework.llm = original
+
+    assert [r["index"] for r in results] == [1, 2, 3, 4]
+    assert [r["success"] for r in results] == [True, False, True, True]
+    assert results[0]["summary"].startswith("报告#")
+    assert sorted(completed) == [1, 2, 3, 4]
+    assert in_flight["max"] == 2
+
+    print(f"✅ 4个需求共用一个编排器，最大并发 {in_flight['max']}")
+
+
+if __name__ == "__main__":
+    test_incremental_summary()
+    test_astream_run()
+    test_task_graph()
+    test_task_graph_cycle()
+    test_early_exit()
+    test_run_batch()
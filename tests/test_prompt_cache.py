@@ -0,0 +1,108 @@
+"""
+测试提示词前缀复用
+验证系统提示词只编译一次且前缀逐字节一致、前缀缓存命中后预填充耗时下降并记录命中Token数，
+以及开启 LLM_PROMPT_CACHE_KEY 时按系统提示词绑定 prompt_cache_key
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+from langchain_core.messages import AIMessage
+import agent_framework
+from agent_framework import AgentConfig
+from mock_llm import MockChatModel, install_mock_llm
+from telemetry import Tracer
+
+LONG_PROMPT = "你是合同审查专家。" + "审查要点说明。" * 300
+
+
+def test_static_prefix():
+    """测试相同配置的专家共用同一个系统消息"""
+    print("\n" + "=" * 80)
+    print("测试1: 系统提示词编译")
+    print("=" * 80)
+
+    config = AgentConfig(name="legal", role="法律专家", system_prompt=LONG_PROMPT)
+    first = asyncio.run(config.create_agent()._prepare_messages("审查合同A"))
+    second = asyncio.run(config.create_agent()._prepare_messages("审查合同B"))
+
+    assert first[0] is second[0]
+    assert first[0].content == second[0].content
+    assert first[1].content != second[1].content
+
+    print("✅ 固定内容在系统消息中，变化内容在用户消息中")
+
+
+def test_prefix_cache_latency():
+    """测试重复调用同一专家时命中前缀缓存，预填充耗时下降"""
+    print("\n" + "=" * 80)
+    print("测试2: 前缀缓存")
+    print("=" * 80)
+
+    agent = AgentConfig(name="legal", role="法律专家", system_prompt=LONG_PROMPT).create_agent()
+    mock = MockChatModel(prefill_tokens_per_second=20000, prefix_cache=True)
+    tracer = Tracer()
+
+    async def call(task):
+        with tracer.span("agent") as agent_span:
+            start = time.perf_counter()
+            await agent.ainvoke(task)
+            return time.perf_counter() - start, agent_span.cached_tokens
+
+    with install_mock_llm(mock):
+        cold, cold_cached = asyncio.run(call("审查合同A"))
+        warm, warm_cached = asyncio.run(call("审查合同B"))
+
+    assert cold_cached == 0
+    assert warm_cached > 2000
+    assert warm < cold / 2
+
+    print(f"✅ 首次 {cold * 1000:.0f}ms，命中 {warm_cached} 个缓存Token后 {warm * 1000:.0f}ms")
+
+
+class RecordingModel:
+    """记录 bind 参数的假模型"""
+
+    def __init__(self):
+        self.bound = []
+
+    def bind(self, **kwargs):
+        self.bound.append(kwargs)
+        return self
+
+    async def ainvoke(self, messages, **kwargs):
+        return AIMessage(content="好的")
+
+
+def test_prompt_cache_key():
+    """测试按系统提示词绑定 prompt_cache_key"""
+    print("\n" + "=" * 80)
+    print("测试3: prompt_cache_key")
+    print("=" * 80)
+
+    fake = RecordingModel()
+    original_namespace = agent_framework.prompt_cache_namespace
+    agent_framework.prompt_cache_namespace = "agents"
+    try:
+        with install_mock_llm(fake):
+            for name, prompt in [("a", "你是专家A。"), ("a", "你是专家A。"), ("b", "你是专家B。")]:
+                agent = AgentConfig(name=name, role=name, system_prompt=prompt).create_agent()
+                asyncio.run(agent.ainvoke("任务"))
+            asyncio.run(agent_framework._acall_llm("没有系统消息的提示词"))
+    finally:
+        agent_framework.prompt_cache_namespace = original_namespace
+
+    keys = [kwargs["extra_body"]["prompt_cache_key"] for kwargs in fake.bound]
+    assert len(keys) == 3
+    assert keys[0] == keys[1] != keys[2]
+    assert keys[0].startswith("agents-")
+
+    print(f"✅ 相同系统提示词使用相同的缓存键: {keys[0]}")
+
+
+if __name__ == "__main__":
+    test_static_prefix()
+    test_prefix_cache_latency()
+    test_prompt_cache_key()
@@ -0,0 +1,194 @@
+"""
+测试调研数据后端
+验证 SQLite 后端的精确/前缀/模糊/全文查询、CSV 和 JSON 批量导入、切换后端后重新注册触发词，
+数万条记录时查询走索引、模糊查询的候选数有上限，以及批量查询在各自线程的连接上并发执行
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csv
+import json
+import random
+import asyncio
+import tempfile
+import threading
+import research_skills
+from research_backends import SQLiteBackend, DictBackend, _trigrams
+from research_skills import DEFAULT_DATA, search_competitor_info, set_research_backend
+from tool_matcher import get_tool_triggers
+
+
+def _seeded_backend(tmp):
+    backend = SQLiteBackend(os.path.join(tmp, "research.sqlite3"))
+    for collection, records in DEFAULT_DATA.items():
+        backend.load(collection, records)
+    return backend
+
+
+def test_lookup_modes():
+    """测试精确、忽略大小写、前缀、文本中的名称、模糊和全文查询"""
+    print("\n" + "=" * 80)
+    print("测试1: 查询方式")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in [_seeded_backend(tmp), DictBackend(DEFAULT_DATA)]:
+            assert backend.lookup("competitor", "比亚迪")["name"] == "比亚迪"
+            assert backend.lookup("competitor", "openai")["name"] == "OpenAI"
+            assert backend.lookup("technical", "自动驾驶")["name"] == "自动驾驶技术"
+            assert backend.lookup("competitor", "分析一下特斯拉的竞争优势")["name"] == "特斯拉"
+            assert backend.lookup("market", "新能源车")["name"] == "新能源汽车"
+            assert backend.lookup("competitor", "苹果公司") is None
+            assert backend.search("competitor", "刀片电池")[0]["name"] == "比亚迪"
+
+            backend.lookup("competitor", "比亚迪")
+            assert backend.stats()["hits"] >= 1
+            backend.close()
+
+    print("✅ 两种后端查询结果一致，重复查询命中缓存")
+
+
+def test_bulk_load():
+    """测试从 CSV 和 JSON 批量导入，同名记录覆盖"""
+    print("\n" + "=" * 80)
+    print("测试2: 批量导入")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "companies.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["name", "公司简介", "核心产品"])
+            writer.writeheader()
+            writer.writerow({"name": "宁德时代", "公司简介": "动力电池制造商", "核心产品": "麒麟电池"})
+            writer.writerow({"name": "比亚迪", "公司简介": "新能源车企", "核心产品": ""})
+
+        json_path = os.path.join(tmp, "industries.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"储能行业": {"市场规模": "2025年全球约3000亿元"}}, f, ensure_ascii=False)
+
+        backend = _seeded_backend(tmp)
+        assert backend.load_file("competitor", csv_path) == 2
+        assert backend.load_file("market", json_path) == 1
+
+        assert backend.count("competitor") == 4
+        assert backend.lookup("competitor", "宁德时代")["fields"]["核心产品"] == "麒麟电池"
+        assert backend.lookup("competitor", "比亚迪")["fields"] == {"公司简介": "新能源车企"}
+        assert backend.search("competitor", "麒麟")[0]["name"] == "宁德时代"
+        assert backend.search("competitor", "刀片电池") == []
+        assert "2025年全球约3000亿元" in backend.lookup("market", "储能")["text"]
+
+        original = research_skills.get_research_backend()
+        set_research_backend(backend)
+        try:
+            assert "宁德时代" in get_tool_triggers(search_competitor_info)
+            assert search_competitor_info.invoke({"company": "宁德时代"}).startswith("【竞争对手信息】\n公司简介: 动力电池制造商")
+        finally:
+            set_research_backend(original)
+            backend.close()
+
+    assert "宁德时代" not in get_tool_triggers(search_competitor_info)
+    assert search_competitor_info.invoke({"company": "宁德时代"}) == "未找到宁德时代的信息"
+
+    print("✅ CSV/JSON 导入后工具和触发词立即生效")
+
+
+def test_lookup_plan():
+    """测试两万条记录时查询都走索引，模糊查询召回的候选数有上限"""
+    print("\n" + "=" * 80)
+    print("测试3: 查询计划")
+    print("=" * 80)
+
+    rng = random.Random(0)
+    syllables = "华为腾讯阿里字节美团京东小米百度网易拼多快手滴蔚来理想鹏宁德海康大疆联想中兴格力美的尔"
+    records = [
+        {
+            "name": f"{''.join(rng.sample(syllables, 4))}科技{i}",
+            "公司简介": f"第{i}家公司，主营{''.join(rng.sample(syllables, 6))}",
+            "核心产品": f"产品{i}"
+        }
+        for i in range(20000)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "research.sqlite3"))
+        backend.load("competitor", records)
+
+        names = [record["name"] for record in rng.sample(records, 100)]
+        typos = [name[:3] + "某" + name[4:] for name in names]
+
+        # 记录查询实际执行的语句（本线程的只读连接），逐条查看查询计划
+        statements = []
+        with backend._reader() as conn:
+            conn.set_trace_callback(statements.append)
+            exact = [backend.lookup("competitor", name) for name in names]
+            fuzzy = [backend.lookup("competitor", typo) for typo in typos]
+            conn.set_trace_callback(None)
+
+            plans = {
+                sql: [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                for sql in set(statements) if sql.startswith("SELECT")
+            }
+            # 模糊查询用于召回的三元字组的文档频率之和
+            candidate_docs = []
+            for typo in typos:
+                rare = backend._rare_trigrams(conn, _trigrams(typo))
+                placeholders = ",".join("?" * len(rare))
+                candidate_docs.append((len(rare), conn.execute(
+                    f"SELECT SUM(doc) FROM entries_vocab WHERE term IN ({placeholders})", rare
+                ).fetchone()[0]))
+        backend.close()
+
+    assert [record["name"] for record in exact] == names
+    assert sum(record is not None and record["name"] == name for record, name in zip(fuzzy, names)) >= 95
+
+    details = [detail for plan in plans.values() for detail in plan]
+    assert "SCAN entries" not in details
+    assert any("USING INDEX sqlite_autoindex_entries_1 (collection=? AND name=?)" in d for d in details)
+    # 全文查询走 MATCH，文档频率按词直接查找而不是扫描整个词表
+    assert any(d.startswith("SCAN entries_fts VIRTUAL TABLE") and ":M" in d for d in details)
+    assert all(d.endswith("INDEX 1:") for d in details if d.startswith("SCAN entries_vocab"))
+    assert all(count == 1 or docs <= 500 for count, docs in candidate_docs)
+
+    print(f"✅ 两万条记录：查询均走索引，模糊查询最多召回 {max(docs for _, docs in candidate_docs)} 个候选")
+
+
+class BarrierBackend(SQLiteBackend):
+    """精确查询在屏障处等待，只有多条查询同时在不同线程中执行时才能全部通过"""
+
+    def __init__(self, path, parties):
+        super().__init__(path)
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.connections = set()
+
+    def _exact(self, collection, name):
+        self.barrier.wait()
+        with self._reader() as conn:
+            self.connections.add(id(conn))
+        return super()._exact(collection, name)
+
+
+def test_concurrent_lookup_many():
+    """测试批量查询在多个线程中并发执行，各线程使用自己的只读连接"""
+    print("\n" + "=" * 80)
+    print("测试4: 并发批量查询")
+    print("=" * 80)
+
+    names = ["比亚迪", "特斯拉", "OpenAI"]
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = BarrierBackend(os.path.join(tmp, "research.sqlite3"), parties=len(names))
+        backend.load("competitor", DEFAULT_DATA["competitor"])
+        records = asyncio.run(backend.alookup_many("competitor", names))
+        backend.close()
+
+    assert [record["name"] for record in records] == names
+    assert len(backend.connections) == len(names)
+
+    print(f"✅ {len(names)} 条查询同时执行，使用 {len(backend.connections)} 个连接")
+
+
+if __name__ == "__main__":
+    test_lookup_modes()
+    test_bulk_load()
+    test_lookup_plan()
+    test_concurrent_lookup_many()
@@ -0,0 +1,97 @@
+"""
+测试大模型响应缓存
+验证缓存键、命中统计、TTL过期和LRU淘汰
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+from langchain_core.messages import SystemMessage, HumanMessage
+from response_cache import ResponseCache
+
+
+def _messages(text):
+    return [SystemMessage(content="你是测试助手。"), HumanMessage(content=text)]
+
+
+def test_cache_key():
+    """测试缓存键区分模型、温度和消息"""
+    print("\n" + "=" * 80)
+    print("测试1: 缓存键")
+    print("=" * 80)
+
+    key = ResponseCache.make_key("m", 0.7, _messages("问题"))
+
+    assert key == ResponseCache.make_key("m", 0.7, _messages("问题"))
+    assert key != ResponseCache.make_key("m", 0.2, _messages("问题"))
+    assert key != ResponseCache.make_key("m2", 0.7, _messages("问题"))
+    assert key != ResponseCache.make_key("m", 0.7, _messages("另一个问题"))
+
+    print("✅ 缓存键区分模型、温度和消息内容")
+
+
+def test_hit_and_miss():
+    """测试命中统计"""
+    print("\n" + "=" * 80)
+    print("测试2: 命中统计")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=os.path.join(tmp, "cache.sqlite3"))
+        key = cache.make_key("m", 0.7, _messages("问题"))
+
+        assert cache.get(key) is None
+        cache.put(key, "回答", model="m", latency=1.5)
+        assert cache.get(key) == "回答"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        assert stats["saved_seconds"] == 1.5
+        cache.close()
+
+        reopened = ResponseCache(path=os.path.join(tmp, "cache.sqlite3"))
+        assert reopened.get(key) == "回答"
+        reopened.close()
+
+    print(f"✅ 命中统计: {stats}")
+
+
+def test_ttl_and_lru():
+    """测试TTL过期和LRU淘汰"""
+    print("\n" + "=" * 80)
+    print("测试3: TTL过期和LRU淘汰")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=os.path.join(tmp, "ttl.sqlite3"), ttl=0.05)
+        cache.put("k", "v")
+        time.sleep(0.1)
+        assert cache.get("k") is None
+        cache.close()
+
+        cache = ResponseCache(path=os.path.join(tmp, "lru.sqlite3"), max_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        assert cache.get("a") == "1"
+        time.sleep(0.01)
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        assert cache.stats()["evictions"] == 1
+        cache.close()
+
+    print("✅ 过期条目失效，最久未访问的条目被淘汰")
+
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_hit_and_miss()
+    test_ttl_and_lru()
@@ -0,0 +1,117 @@
+"""
+测试 SKILL.md 分块检索索引
+使用 BM25 检索（不依赖向量模型）验证切分、排序和分类过滤
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+from pathlib import Path
+from skill_loader import SkillLoader
+from skill_index import SkillIndex, split_markdown, tokenize
+
+
+CONTRACT_SKILL = """---
+name: contract-review
+description: Review contracts
+---
+
+# Contract Review
+
+## Limitation of Liability
+
+Check whether the liability cap is mutual and covers indirect damages.
+
+## Indemnification
+
+Indemnification obligations should be mutual and capped.
+"""
+
+CLOSE_SKILL = """---
+name: close-management
+description: Month-end close
+---
+
+# Close Management
+
+## Checklist
+
+Month-end close checklist with task dependencies and reconciliation steps.
+"""
+
+
+def _build_index(tmp):
+    plugins = Path(tmp) / "plugins"
+    for category, name, content in [
+        ("legal", "contract-review", CONTRACT_SKILL),
+        ("finance", "close-management", CLOSE_SKILL),
+    ]:
+        skill_dir = plugins / category / "skills" / name
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(content, encoding="utf-8")
+
+    loader = SkillLoader(str(plugins), manifest_path=os.path.join(tmp, "manifest.json"))
+    return SkillIndex(loader=loader, cache_dir=os.path.join(tmp, "cache"), use_embeddings=False)
+
+
+def test_split_markdown():
+    """测试按标题切分"""
+    print("\n" + "=" * 80)
+    print("测试1: Markdown切分")
+    print("=" * 80)
+
+    chunks = split_markdown(CONTRACT_SKILL.split("---", 2)[2])
+    headings = [heading for heading, _ in chunks]
+
+    assert "Contract Review > Limitation of Liability" in headings
+    assert "Contract Review > Indemnification" in headings
+    assert tokenize("合同审查 GDPR") == ["gdpr", "合同", "同审", "审查"]
+
+    print(f"✅ 切分出 {len(chunks)} 个片段: {headings}")
+
+
+def test_search():
+    """测试检索排序与分类过滤"""
+    print("\n" + "=" * 80)
+    print("测试2: 片段检索")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _build_index(tmp)
+
+        hits = index.search("liability cap", k=1)
+        assert hits[0]["heading"].endswith("Limitation of Liability")
+        assert "indirect damages" in hits[0]["text"]
+
+        assert index.search("reconciliation", category="legal") == []
+        assert index.search("reconciliation", category="finance")[0]["name"] == "close-management"
+
+        cached = SkillIndex(loader=index.loader, cache_dir=os.path.join(tmp, "cache"), use_embeddings=False)
+        assert len(cached.chunks) == len(index.chunks)
+
+    print("✅ 只返回最相关的片段，分类过滤生效")
+
+
+def test_vector_cache_per_model():
+    """测试向量缓存按向量模型区分"""
+    print("\n" + "=" * 80)
+    print("测试3: 向量缓存")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _build_index(tmp)
+        fingerprint = index._fingerprint()
+        other = SkillIndex(loader=index.loader, cache_dir=os.path.join(tmp, "cache"), use_embeddings=False,
+                           model_path=os.path.join(tmp, "other-model"))
+
+        assert other._vectors_path(fingerprint) != index._vectors_path(fingerprint)
+        assert other._vectors_path(fingerprint) == other._vectors_path(other._fingerprint())
+
+    print("✅ 更换向量模型后不会复用旧模型的向量")
+
+
+if __name__ == "__main__":
+    test_split_markdown()
+    test_search()
+    test_vector_cache_per_model()
@@ -0,0 +1,95 @@
+"""
+测试 SKILL.md 加载器
+验证正文延迟加载、清单缓存热启动和共享实例
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+from pathlib import Path
+from skill_loader import SkillLoader, create_skill_loader
+
+
+def _write_skill(root, category, name, body):
+    skill_dir = Path(root) / category / "skills" / name
+    skill_dir.mkdir(parents=True, exist_ok=True)
+    (skill_dir / "SKILL.md").write_text(
+        f"---\nname: {name}\ndescription: {name} 描述\n---\n\n{body}\n",
+        encoding="utf-8"
+    )
+
+
+def test_lazy_body():
+    """测试启动时只读取元数据，正文按需加载"""
+    print("\n" + "=" * 80)
+    print("测试1: 正文延迟加载")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plugins = os.path.join(tmp, "plugins")
+        _write_skill(plugins, "legal", "contract-review", "# 合同审查正文")
+        _write_skill(plugins, "finance", "variance-analysis", "# 差异分析正文")
+
+        loader = SkillLoader(plugins, manifest_path=os.path.join(tmp, "manifest.json"))
+
+        skill = loader.get_skill("legal", "contract-review")
+        assert skill["description"] == "contract-review 描述"
+        assert "content" not in skill
+        assert skill["content"].strip() == "# 合同审查正文"
+        assert skill.get("full_content").startswith("---")
+        assert len(loader.get_skills_by_category("finance")) == 1
+
+    print("✅ 元数据在启动时加载，正文在首次访问时加载")
+
+
+def test_manifest_warm_start():
+    """测试热启动跳过目录遍历，文件变化时重新读取"""
+    print("\n" + "=" * 80)
+    print("测试2: 清单缓存热启动")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plugins = os.path.join(tmp, "plugins")
+        manifest = os.path.join(tmp, "manifest.json")
+        _write_skill(plugins, "legal", "compliance", "# 合规")
+
+        SkillLoader(plugins, manifest_path=manifest)
+        assert os.path.exists(manifest)
+
+        class NoScanLoader(SkillLoader):
+            def _scan_tree(self):
+                raise AssertionError("热启动不应遍历目录")
+
+        warm = NoScanLoader(plugins, manifest_path=manifest)
+        assert warm.get_skill("legal", "compliance") is not None
+
+        time.sleep(0.01)
+        _write_skill(plugins, "finance", "audit-support", "# 审计")
+        rescanned = SkillLoader(plugins, manifest_path=manifest)
+        assert rescanned.get_skill("finance", "audit-support") is not None
+
+        skill_file = Path(plugins) / "legal" / "skills" / "compliance" / "SKILL.md"
+        skill_file.write_text("---\nname: compliance\ndescription: 新描述\n---\n\n# 合规\n", encoding="utf-8")
+        updated = NoScanLoader(plugins, manifest_path=manifest)
+        assert updated.get_skill("legal", "compliance")["description"] == "新描述"
+
+    print("✅ 目录未变化时直接使用清单，新增或修改的文件被重新读取")
+
+
+def test_shared_loader():
+    """测试同一目录共用一个加载器实例"""
+    with tempfile.TemporaryDirectory() as tmp:
+        plugins = os.path.join(tmp, "plugins")
+        _write_skill(plugins, "legal", "nda-triage", "# NDA")
+
+        assert create_skill_loader(plugins) is create_skill_loader(plugins)
+
+    print("✅ 共享加载器实例")
+
+
+if __name__ == "__main__":
+    test_lazy_body()
+    test_manifest_warm_start()
+    test_shared_loader()
@@ -0,0 +1,97 @@
+"""
+测试客服技能数据存储
+验证订单/产品索引查询、读穿缓存，以及专家提示词大小不随数据量增长
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import tempfile
+from langchain_core.messages import AIMessage
+import swarm_agent
+import skills.store
+from skills import query_order, get_product_info
+from skills.store import SkillStore
+from mock_llm import install_mock_llm
+
+
+def test_store_lookup():
+    """测试查询与缓存"""
+    print("\n" + "=" * 80)
+    print("测试1: 索引查询与读穿缓存")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SkillStore(path=os.path.join(tmp, "skills.sqlite3"))
+
+        assert store.get_order("ord001")["status"] == "已发货"
+        assert store.get_order("ORD999") is None
+        assert store.find_product("智能手表")["price"] == "¥599.00"
+        assert store.find_product("无线蓝牙耳机多少钱")["name"] == "无线蓝牙耳机"
+        assert store.find_product("耳机")["name"] == "无线蓝牙耳机"
+        assert store.product_names_in("手机壳和智能手表哪个便宜") == ["手机壳", "智能手表"]
+
+        store.get_order("ORD001")
+        assert store.stats()["hits"] == 1
+
+        store.load_products([{"name": "平板电脑", "price": "¥1999.00", "stock": "库存充足 (20件)", "spec": "11英寸"}])
+        assert store.find_product("平板电脑多少钱")["price"] == "¥1999.00"
+        store.close()
+
+    print("✅ 订单号、产品名查询和缓存均正常")
+
+
+class RecordingModel:
+    """记录提示词的假模型"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return AIMessage(content="好的")
+
+
+def test_prompt_size_constant():
+    """测试数据量增长后专家提示词大小不变"""
+    print("\n" + "=" * 80)
+    print("测试2: 提示词大小")
+    print("=" * 80)
+
+    state = {"question": "ORD001和智能手表的情况", "history": "", "messages": [], "next": ""}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SkillStore(path=os.path.join(tmp, "skills.sqlite3"))
+        fake = RecordingModel()
+        original_store = skills.store._shared_store
+        skills.store._shared_store = store
+        try:
+            with install_mock_llm(fake, modules=("swarm_agent",)):
+                asyncio.run(swarm_agent.order_node(state))
+                asyncio.run(swarm_agent.product_node(state))
+
+                store.load_orders([(f"ORD{i:05d}", "已发货", "顺丰快递", "¥1.00", "商品") for i in range(5000)])
+                store.load_products([(f"商品{i}", "¥1.00", "库存充足", "规格") for i in range(5000)])
+
+                asyncio.run(swarm_agent.order_node(state))
+                asyncio.run(swarm_agent.product_node(state))
+
+            assert "顺丰快递 SF1234567890" in query_order.invoke({"order_id": "ORD001"})
+            assert "¥599.00" in get_product_info.invoke({"product_name": "智能手表"})
+        finally:
+            skills.store._shared_store = original_store
+            store.close()
+
+    order_before, product_before, order_after, product_after = [len(p) for p in fake.prompts]
+    assert order_before == order_after
+    assert product_before == product_after
+    assert "SF1234567890" in fake.prompts[0]
+    assert "1.4英寸屏幕" in fake.prompts[1]
+
+    print(f"✅ 5000个订单和SKU后提示词长度不变: 订单 {order_after} 字符，产品 {product_after} 字符")
+
+
+if __name__ == "__main__":
+    test_store_lookup()
+    test_prompt_size_constant()
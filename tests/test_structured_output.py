@@ -0,0 +1,204 @@
+"""
+测试结构化输出解析
+验证容错 JSON 解析、协调员在结构化输出不可用时的降级，以及临时错误和并发请求下不误降级
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import httpx
+import openai
+from langchain_core.messages import AIMessage
+import agent_framework
+from agent_framework import AgentConfig, CoordinatorAgent
+from structured_output import parse_json_object
+
+
+def test_parse_json_object():
+    """测试代码块、说明文字和尾随逗号的修复"""
+    print("\n" + "=" * 80)
+    print("测试1: 容错JSON解析")
+    print("=" * 80)
+
+    assert parse_json_object('{"a": 1}') == {"a": 1}
+    assert parse_json_object('```json\n{"a": [1, 2]}\n```') == {"a": [1, 2]}
+    assert parse_json_object('好的，计划如下：\n{"a": {"b": "x}"}}\n以上。') == {"a": {"b": "x}"}}
+    assert parse_json_object('{"a": [1, 2,], "b": "c, ]",\n}') == {"a": [1, 2], "b": "c, ]"}
+
+    try:
+        parse_json_object("没有JSON")
+        assert False, "应当抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✅ 常见格式问题均可在本地修复")
+
+
+PLAN_REPLY = ('```json\n{"task_assignments": [{"agent_name": "expert_a", '
+              '"task_description": "任务", "priority": 1,},], "explanation": "测试"}\n```')
+
+
+def _bad_request(message, body=None):
+    request = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+    return openai.BadRequestError(message, response=httpx.Response(400, request=request), body=body)
+
+
+class FormatModel:
+    """
+    按 response_format 返回的假模型，返回带代码块和尾随逗号的计划
+
+    Args:
+        errors: {格式类型: 调用该格式时抛出的异常}
+        delay: 每次调用的耗时（秒）
+    """
+
+    def __init__(self, errors=None, delay=0.0):
+        self.errors = errors if errors is not None else {
+            "json_schema": _bad_request("response_format json_schema is not supported")
+        }
+        self.delay = delay
+        self.formats = []
+
+    def bind(self, response_format=None, **kwargs):
+        return _BoundFormatModel(self, response_format["type"])
+
+
+class _BoundFormatModel:
+
+    def __init__(self, model, format_type):
+        self.model = model
+        self.format_type = format_type
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.model.delay)
+        if self.format_type in self.model.errors:
+            raise self.model.errors[self.format_type]
+        self.model.formats.append(self.format_type)
+        return AIMessage(content=PLAN_REPLY)
+
+
+def test_coordinator_fallback():
+    """测试协调员结构化输出降级后仍能解析计划"""
+    print("\n" + "=" * 80)
+    print("测试2: 协调员结构化输出降级")
+    print("=" * 80)
+
+    configs = {"expert_a": AgentConfig(name="expert_a", role="专家A", system_prompt="你是专家A。")}
+    coordinator = CoordinatorAgent(available_agents=configs)
+
+    fake = FormatModel()
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        first = asyncio.run(coordinator.analyze_and_assign("测试需求"))
+        second = asyncio.run(coordinator.analyze_and_assign("测试需求"))
+    finally:
+        agent_framework.llm = original
+
+    assert [(ta.agent_name, ta.task_description) for ta in first] == [("expert_a", "任务")]
+    assert len(second) == 1
+    assert fake.formats == ["json_object", "json_object"]
+
+    print("✅ json_schema 不可用时降级为 json_object，带代码块的计划解析成功")
+
+
+def test_transient_error_keeps_formats():
+    """测试超时等临时错误不移除结构化输出格式"""
+    print("\n" + "=" * 80)
+    print("测试3: 临时错误不降级")
+    print("=" * 80)
+
+    configs = {"expert_a": AgentConfig(name="expert_a", role="专家A", system_prompt="你是专家A。")}
+    coordinator = CoordinatorAgent(available_agents=configs)
+    request = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+
+    fake = FormatModel(errors={"json_schema": openai.APITimeoutError(request=request)})
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        try:
+            asyncio.run(coordinator.analyze_and_assign("测试需求"))
+            assert False, "临时错误应当抛出"
+        except openai.APITimeoutError:
+            pass
+        fake.errors.clear()
+        plan = asyncio.run(coordinator.analyze_and_assign("测试需求"))
+    finally:
+        agent_framework.llm = original
+
+    assert len(plan) == 1
+    assert fake.formats == ["json_schema"]
+
+    print("✅ 超时后结构化输出格式保留，恢复后继续使用 json_schema")
+
+
+def test_unrelated_bad_request_keeps_formats():
+    """测试与输出格式无关的 400（上下文超长）不降级，指明 response_format 参数的 400 才降级"""
+    print("\n" + "=" * 80)
+    print("测试4: 无关的 400 不降级")
+    print("=" * 80)
+
+    configs = {"expert_a": AgentConfig(name="expert_a", role="专家A", system_prompt="你是专家A。")}
+    coordinator = CoordinatorAgent(available_agents=configs)
+    too_long = _bad_request(
+        "This model's maximum context length is 8192 tokens",
+        body={"code": "context_length_exceeded", "param": "messages",
+              "message": "This model's maximum context length is 8192 tokens"}
+    )
+
+    fake = FormatModel(errors={"json_schema": too_long})
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        try:
+            asyncio.run(coordinator.analyze_and_assign("测试需求"))
+            assert False, "上下文超长应当抛出"
+        except openai.BadRequestError:
+            pass
+        assert len(coordinator._response_formats) == 2
+
+        fake.errors = {"json_schema": _bad_request("Invalid parameter", body={"param": "response_format"})}
+        plan = asyncio.run(coordinator.analyze_and_assign("测试需求"))
+    finally:
+        agent_framework.llm = original
+
+    assert len(plan) == 1
+    assert [f["type"] for f in coordinator._response_formats] == ["json_object"]
+
+    print("✅ 上下文超长时保留结构化输出格式，参数不被支持时才降级")
+
+
+def test_concurrent_fallback():
+    """测试共用协调员的并发请求同时降级时只移除失败的格式"""
+    print("\n" + "=" * 80)
+    print("测试5: 并发降级")
+    print("=" * 80)
+
+    configs = {"expert_a": AgentConfig(name="expert_a", role="专家A", system_prompt="你是专家A。")}
+    coordinator = CoordinatorAgent(available_agents=configs)
+
+    async def run_both():
+        return await asyncio.gather(*[coordinator.analyze_and_assign(f"需求{i}") for i in range(2)])
+
+    fake = FormatModel(delay=0.01)
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        plans = asyncio.run(run_both())
+    finally:
+        agent_framework.llm = original
+
+    assert all(len(plan) == 1 for plan in plans)
+    assert [f["type"] for f in coordinator._response_formats] == ["json_object"]
+    assert fake.formats == ["json_object", "json_object"]
+
+    print("✅ 两个请求同时降级后仍保留 json_object")
+
+
+if __name__ == "__main__":
+    test_parse_json_object()
+    test_coordinator_fallback()
+    test_transient_error_keeps_formats()
+    test_unrelated_bad_request_keeps_formats()
+    test_concurrent_fallback()
@@ -0,0 +1,86 @@
+"""
+测试客服系统异步处理
+使用假模型验证多个会话并发处理，而不是逐个排队
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import asyncio
+import tempfile
+from langchain_core.messages import AIMessage
+import intent_router
+import swarm_agent
+import skills.store
+from mock_llm import install_mock_llm
+from conversation_memory import ConversationMemory
+from skills.store import SkillStore
+
+
+class SlowModel:
+    """每次调用耗时 0.2 秒的假模型"""
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(0.2)
+        return AIMessage(content="您好，已为您处理")
+
+
+def test_concurrent_sessions():
+    """测试多个会话并发处理"""
+    print("\n" + "=" * 80)
+    print("测试: 并发会话")
+    print("=" * 80)
+
+    questions = [
+        "我的APP登录不上去了，怎么办？",
+        "帮我查一下ORD001这个订单的物流信息",
+        "我想申请退款，请问流程是怎样的？",
+        "无线蓝牙耳机多少钱？有什么功能？",
+    ] * 2
+
+    async def ask(port, question):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((question + "\n").encode("utf-8"))
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        writer.close()
+        return reply
+
+    async def run():
+        server = await asyncio.start_server(swarm_agent.handle_session, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            start = time.monotonic()
+            replies = await asyncio.gather(*[ask(port, q) for q in questions])
+            return replies, time.monotonic() - start
+
+    tmp = tempfile.TemporaryDirectory()
+    original_router = intent_router._shared_router
+    original_memory = swarm_agent._memory
+    original_store = skills.store._shared_store
+    skills.store._shared_store = SkillStore(path=os.path.join(tmp.name, "skills.sqlite3"))
+    intent_router._shared_router = intent_router.IntentRouter(use_embeddings=False)
+    swarm_agent._memory = ConversationMemory(path=os.path.join(tmp.name, "memory.sqlite3"))
+    try:
+        with install_mock_llm(SlowModel(), modules=("swarm_agent",)):
+            replies, elapsed = asyncio.run(run())
+    finally:
+        swarm_agent._memory.close()
+        skills.store._shared_store.close()
+        skills.store._shared_store = original_store
+        intent_router._shared_router = original_router
+        swarm_agent._memory = original_memory
+        tmp.cleanup()
+
+    assert all(r["answer"] == "您好，已为您处理" for r in replies)
+    assert len({r["session_id"] for r in replies}) == len(questions)
+    # 串行需要 8 × 0.2 秒
+    assert elapsed < 0.8
+
+    print(f"✅ {len(questions)} 个会话并发处理耗时 {elapsed:.2f}秒")
+
+
+if __name__ == "__main__":
+    test_concurrent_sessions()
@@ -0,0 +1,104 @@
+"""
+测试调用追踪
+验证 span 的父子关系、Token累加、排队等待时间、JSONL 导出和直方图统计
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import asyncio
+import tempfile
+from langchain_core.messages import AIMessage
+import agent_framework
+from telemetry import Tracer, get_tracer, configure_tracing
+from test_orchestrator import FakeChatModel, _create_orchestrator
+
+
+class UsageChatModel(FakeChatModel):
+    """每次调用报告固定Token用量的假模型"""
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(0)
+        usage = {"input_tokens": 50, "output_tokens": 5, "total_tokens": 55}
+        return AIMessage(content=self._reply(messages), usage_metadata=usage)
+
+
+def test_histogram():
+    """测试直方图百分位"""
+    print("\n" + "=" * 80)
+    print("测试1: 直方图")
+    print("=" * 80)
+
+    tracer = Tracer()
+    for i in range(1, 101):
+        tracer.observe("agent", i / 100)
+
+    stats = tracer.histogram("agent")
+    assert stats["count"] == 100
+    assert stats["p50"] == 0.5
+    assert stats["p95"] == 0.95
+    assert stats["p99"] == 0.99
+    assert tracer.histogram("missing") is None
+
+    print(f"✅ {stats}")
+
+
+def test_orchestrator_spans():
+    """测试一次调研产生的 span"""
+    print("\n" + "=" * 80)
+    print("测试2: 调研流程追踪")
+    print("=" * 80)
+
+    fake = UsageChatModel([[
+        {"agent_name": "expert_a", "task_description": "任务A", "priority": 1},
+        {"agent_name": "expert_b", "task_description": "任务B", "priority": 1},
+    ]])
+    orchestrator = _create_orchestrator()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path = os.path.join(tmp, "trace.jsonl")
+        previous_path = get_tracer().path
+        configure_tracing(trace_path)
+        get_tracer().reset()
+
+        original = agent_framework.llm
+        agent_framework.llm = fake
+        try:
+            asyncio.run(orchestrator.run("测试需求", max_rounds=1))
+        finally:
+            agent_framework.llm = original
+            configure_tracing(previous_path)
+
+        with open(trace_path, 'r', encoding='utf-8') as f:
+            spans = [json.loads(line) for line in f]
+
+    by_id = {s["span_id"]: s for s in spans}
+    names = [s["name"] for s in spans]
+    for name in ["run", "round", "plan", "agent", "summarize", "llm"]:
+        assert name in names
+
+    run = next(s for s in spans if s["name"] == "run")
+    assert len({s["trace_id"] for s in spans}) == 1
+
+    agents = [s for s in spans if s["name"] == "agent"]
+    assert len(agents) == 2
+    for agent_span in agents:
+        assert by_id[agent_span["parent_id"]]["name"] == "round"
+        assert "queue_wait" in agent_span["attributes"]
+        assert agent_span["input_tokens"] == 50
+
+    # plan + 2个专家 + summarize，每次调用 50/5 Token
+    assert run["input_tokens"] == 200
+    assert run["output_tokens"] == 20
+
+    summary = get_tracer().summary()
+    assert summary["agent:expert_a"]["count"] == 1
+    assert summary["queue_wait"]["count"] == 2
+
+    print(f"✅ 共 {len(spans)} 个 span，run 总Token: {run['input_tokens']}/{run['output_tokens']}")
+
+
+if __name__ == "__main__":
+    test_histogram()
+    test_orchestrator_spans()
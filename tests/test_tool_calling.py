@@ -0,0 +1,116 @@
+"""
+测试函数调用模式
+模型通过 tool_calls 请求工具，Agent 并行执行后回传结果，并记录每轮Token与耗时
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+from langchain.tools import tool
+from langchain_core.messages import AIMessage, ToolMessage
+import agent_framework
+from agent_framework import BaseAgent
+
+
+class FakeToolModel:
+    """第一轮请求两个工具，拿到工具结果后给出最终回答"""
+
+    def __init__(self):
+        self.bound = []
+        self.received = []
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound.append(kwargs.get("tool_choice"))
+        return self
+
+    async def ainvoke(self, messages):
+        self.received.append(list(messages))
+        tool_results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        usage = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+        if not tool_results:
+            return AIMessage(content="", usage_metadata=usage, tool_calls=[
+                {"name": "slow_lookup", "args": {"topic": "主题一"}, "id": "call_1"},
+                {"name": "slow_lookup", "args": {"topic": "主题二"}, "id": "call_2"},
+            ])
+        return AIMessage(content="结论: " + "；".join(tool_results), usage_metadata=usage)
+
+
+def test_tool_calling_loop():
+    """测试模型请求的工具并行执行并回传"""
+    print("\n" + "=" * 80)
+    print("测试: 函数调用工具循环")
+    print("=" * 80)
+
+    @tool
+    def slow_lookup(topic: str) -> str:
+        """按主题查询数据"""
+        time.sleep(0.2)
+        return f"{topic}的数据"
+
+    fake = FakeToolModel()
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        agent = BaseAgent(name="tester", role="测试Agent", system_prompt="测试",
+                          tools=[slow_lookup], tool_calling=True)
+        start = time.monotonic()
+        result = asyncio.run(agent.ainvoke("请分析主题一和主题二"))
+        elapsed = time.monotonic() - start
+    finally:
+        agent_framework.llm = original
+
+    assert result["output"] == "结论: 主题一的数据；主题二的数据"
+    assert elapsed < 0.4
+
+    turns = result["tool_turns"]
+    assert [t["tool_calls"] for t in turns] == [["slow_lookup", "slow_lookup"], []]
+    assert all(t["input_tokens"] == 100 and t["output_tokens"] == 10 for t in turns)
+    assert turns[0]["tool_latency"] > 0
+
+    # 首轮提示词中不再预取关键词工具数据
+    assert "参考数据" not in fake.received[0][1].content
+
+    print(f"✅ 2个工具并行执行耗时 {elapsed:.2f}秒，共 {len(turns)} 轮")
+
+
+def test_tool_turn_limit():
+    """测试超过最大轮数后禁止继续调用工具"""
+    print("\n" + "=" * 80)
+    print("测试: 工具调用轮数上限")
+    print("=" * 80)
+
+    @tool
+    def slow_lookup(topic: str) -> str:
+        """按主题查询数据"""
+        return f"{topic}的数据"
+
+    class LoopingModel(FakeToolModel):
+        async def ainvoke(self, messages):
+            if self.bound[-1] == "none":
+                return AIMessage(content="最终回答")
+            return AIMessage(content="", tool_calls=[
+                {"name": "slow_lookup", "args": {"topic": "主题"}, "id": f"call_{len(messages)}"}
+            ])
+
+    fake = LoopingModel()
+    original = agent_framework.llm
+    agent_framework.llm = fake
+    try:
+        agent = BaseAgent(name="tester", role="测试Agent", system_prompt="测试",
+                          tools=[slow_lookup], tool_calling=True, max_tool_turns=2)
+        result = asyncio.run(agent.ainvoke("请分析"))
+    finally:
+        agent_framework.llm = original
+
+    assert result["output"] == "最终回答"
+    assert fake.bound == [None, None, "none"]
+    assert len(result["tool_turns"]) == 3
+
+    print("✅ 达到上限后最后一轮强制给出回答")
+
+
+if __name__ == "__main__":
+    test_tool_calling_loop()
+    test_tool_turn_limit()
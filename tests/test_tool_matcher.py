@@ -0,0 +1,102 @@
+"""
+测试工具触发词匹配
+验证 Aho-Corasick 自动机与逐词扫描结果一致，以及命中工具的并发调用
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import random
+import asyncio
+from langchain.tools import tool
+from tool_matcher import AhoCorasick, ToolMatcher, register_tool_triggers
+from agent_framework import BaseAgent
+
+
+def test_automaton_matches_naive_scan():
+    """测试自动机命中结果与逐词子串扫描一致"""
+    print("\n" + "=" * 80)
+    print("测试1: Aho-Corasick 自动机")
+    print("=" * 80)
+
+    rng = random.Random(7)
+    alphabet = "ab新能源汽车"
+    patterns = list({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(200)})
+    automaton = AhoCorasick(patterns)
+
+    for _ in range(50):
+        text = "".join(rng.choice(alphabet) for _ in range(60))
+        found = {automaton.patterns[i] for _, i in automaton.finditer(text)}
+        expected = {p for p in patterns if p in text}
+        assert found == expected
+
+    automaton = AhoCorasick(["OpenAI"])
+    assert [automaton.patterns[i] for _, i in automaton.finditer("openai的产品")] == ["OpenAI"]
+
+    print(f"✅ {len(patterns)} 个模式串的命中结果与逐词扫描一致")
+
+
+def test_tool_matcher_order():
+    """测试按工具顺序返回并去重"""
+    print("\n" + "=" * 80)
+    print("测试2: 多工具匹配")
+    print("=" * 80)
+
+    @tool
+    def lookup_industry(industry: str) -> str:
+        """查询行业"""
+        return industry
+
+    @tool
+    def lookup_company(company: str) -> str:
+        """查询公司"""
+        return company
+
+    register_tool_triggers(lookup_industry, ["AI行业", "智能家居"])
+    register_tool_triggers(lookup_company, ["OpenAI", "特斯拉"])
+
+    matcher = ToolMatcher([lookup_industry, lookup_company])
+    matches = matcher.match("特斯拉和OpenAI在AI行业的布局，以及OpenAI的竞品")
+
+    assert [(t.name, k) for t, k in matches] == [
+        ("lookup_industry", "AI行业"),
+        ("lookup_company", "特斯拉"),
+        ("lookup_company", "OpenAI"),
+    ]
+
+    register_tool_triggers(lookup_industry, ["新能源汽车"])
+    assert matcher.stale
+
+    print("✅ 命中结果按工具顺序排列并去重，触发词更新后匹配器标记为过期")
+
+
+def test_concurrent_tool_calls():
+    """测试命中的工具并发调用"""
+    print("\n" + "=" * 80)
+    print("测试3: 工具并发调用")
+    print("=" * 80)
+
+    @tool
+    def slow_lookup(topic: str) -> str:
+        """慢速查询"""
+        time.sleep(0.2)
+        return f"{topic}的数据"
+
+    register_tool_triggers(slow_lookup, ["主题一", "主题二", "主题三"])
+    agent = BaseAgent(name="tester", role="测试Agent", system_prompt="测试", tools=[slow_lookup])
+
+    start = time.monotonic()
+    results = asyncio.run(agent._call_tools("请分析主题一、主题二和主题三"))
+    elapsed = time.monotonic() - start
+
+    assert results == ["主题一的数据", "主题二的数据", "主题三的数据"]
+    assert elapsed < 0.5
+
+    print(f"✅ 3个工具调用耗时 {elapsed:.2f}秒")
+
+
+if __name__ == "__main__":
+    test_automaton_matches_naive_scan()
+    test_tool_matcher_order()
+    test_concurrent_tool_calls()
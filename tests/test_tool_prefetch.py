@@ -0,0 +1,86 @@
+"""
+测试调研工具批量并发查询
+验证请求中提到多个行业/公司时每个工具只调用一次批量版本、各条查询并发执行（耗时取最慢的一条而不是总和），
+以及批量结果与逐个调用的结果一致
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+import research_skills
+from agent_framework import BaseAgent
+from research_backends import DictBackend
+from research_skills import (
+    DEFAULT_DATA, search_market_info, search_competitor_info,
+    search_competitor_info_batch, set_research_backend
+)
+
+REQUEST = "对比AI行业和新能源汽车的市场，并分析比亚迪、特斯拉和OpenAI的竞争力"
+
+
+class SlowBackend(DictBackend):
+    """每次未命中缓存的查询模拟 100ms 的 I/O"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.batches = []
+
+    def _exact(self, collection, name):
+        time.sleep(0.1)
+        return super()._exact(collection, name)
+
+    async def alookup_many(self, collection, queries):
+        self.batches.append((collection, list(queries)))
+        return await super().alookup_many(collection, queries)
+
+
+def test_batch_fan_out():
+    """测试每个工具一次批量调用，多条查询并发执行"""
+    print("\n" + "=" * 80)
+    print("测试1: 批量并发查询")
+    print("=" * 80)
+
+    backend = SlowBackend(DEFAULT_DATA)
+    original = research_skills.get_research_backend()
+    set_research_backend(backend)
+    try:
+        agent = BaseAgent(name="market_analyst", role="市场分析师", system_prompt="测试",
+                          tools=[search_market_info, search_competitor_info])
+        start = time.monotonic()
+        messages = asyncio.run(agent._prepare_messages(REQUEST))
+        elapsed = time.monotonic() - start
+    finally:
+        set_research_backend(original)
+
+    assert backend.batches == [
+        ("market", ["AI行业", "新能源汽车"]),
+        ("competitor", ["比亚迪", "特斯拉", "OpenAI"]),
+    ]
+    content = messages[1].content
+    assert content.index("2025年全球AI市场规模") < content.index("全球最大新能源车企") < content.index("成立于2015年")
+    assert elapsed < 0.3
+
+    print(f"✅ 5条查询耗时 {elapsed:.2f}秒（逐个查询约0.5秒）")
+
+
+def test_batch_matches_single():
+    """测试批量结果与逐个调用一致"""
+    print("\n" + "=" * 80)
+    print("测试2: 批量结果")
+    print("=" * 80)
+
+    companies = ["比亚迪", "特斯拉", "苹果"]
+    batch = asyncio.run(search_competitor_info_batch.ainvoke({"companies": companies}))
+    single = [search_competitor_info.invoke({"company": company}) for company in companies]
+
+    assert batch == single
+    assert batch[2] == "未找到苹果的信息"
+
+    print("✅ 批量版本与逐个调用结果一致")
+
+
+if __name__ == "__main__":
+    test_batch_fan_out()
+    test_batch_matches_single()
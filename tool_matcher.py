@@ -0,0 +1,164 @@
+"""
+工具触发词匹配
+工具通过 register_tool_triggers() 声明触发词表，Agent 把所有工具的触发词编译成一个 Aho-Corasick 自动机，
+一次扫描输入文本即可找出全部命中的 (工具, 触发词)，复杂度与触发词数量无关；
+工具可通过 register_batch_tool() 声明批量版本，同一工具命中多个触发词时一次调用批量版本
+"""
+import threading
+from collections import deque
+
+# 工具名 -> 触发词列表
+TOOL_TRIGGERS = {}
+# 工具名 -> 批量版本工具
+BATCH_TOOLS = {}
+_registry_version = 0
+_registry_lock = threading.Lock()
+
+
+def register_tool_triggers(tool, keywords):
+    """
+    声明工具的触发词表，输入文本中出现任一触发词时以该触发词为参数调用工具
+
+    Args:
+        tool: 工具对象或工具名
+        keywords: 触发词列表，重复注册时覆盖
+    """
+    global _registry_version
+    name = tool if isinstance(tool, str) else tool.name
+    with _registry_lock:
+        TOOL_TRIGGERS[name] = list(dict.fromkeys(k for k in keywords if k))
+        _registry_version += 1
+
+
+def get_tool_triggers(tool):
+    """返回工具已声明的触发词表"""
+    name = tool if isinstance(tool, str) else tool.name
+    return TOOL_TRIGGERS.get(name, [])
+
+
+def register_batch_tool(tool, batch_tool):
+    """
+    声明工具的批量版本
+
+    Args:
+        tool: 工具对象或工具名
+        batch_tool: 批量版本工具，只有一个列表参数，接收多个触发词，按顺序返回每个触发词的结果列表
+    """
+    name = tool if isinstance(tool, str) else tool.name
+    with _registry_lock:
+        BATCH_TOOLS[name] = batch_tool
+
+
+def get_batch_tool(tool):
+    """返回工具声明的批量版本，未声明时返回 None"""
+    name = tool if isinstance(tool, str) else tool.name
+    return BATCH_TOOLS.get(name)
+
+
+def registry_version():
+    """触发词表的版本号，每次注册后递增，用于判断已编译的匹配器是否过期"""
+    return _registry_version
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    Args:
+        patterns: 模式串列表
+        ignore_case: 是否忽略大小写
+    """
+
+    def __init__(self, patterns, ignore_case=True):
+        self.ignore_case = ignore_case
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.patterns = []
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build_fail_links()
+
+    def _normalize(self, text):
+        return text.lower() if self.ignore_case else text
+
+    def _add(self, pattern):
+        if not pattern:
+            return
+        state = 0
+        for char in self._normalize(pattern):
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def finditer(self, text):
+        """
+        扫描文本
+
+        Yields:
+            (结束位置, 模式串下标)，重叠的命中全部产出
+        """
+        state = 0
+        for position, char in enumerate(self._normalize(text)):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                yield position, pattern_id
+
+
+class ToolMatcher:
+    """
+    多工具触发词匹配器
+    把一组工具的触发词编译进同一个自动机，match() 返回需要调用的 (工具, 触发词) 列表
+    """
+
+    def __init__(self, tools):
+        self.version = registry_version()
+        self._targets = []
+        patterns = []
+        for tool in tools:
+            for keyword in get_tool_triggers(tool):
+                patterns.append(keyword)
+                self._targets.append((tool, keyword))
+        self._tool_order = {id(tool): i for i, tool in enumerate(tools)}
+        self._automaton = AhoCorasick(patterns)
+
+    @property
+    def stale(self):
+        return self.version != registry_version()
+
+    def match(self, text):
+        """
+        找出文本中命中的全部 (工具, 触发词)，按工具顺序、命中位置排序并去重
+        """
+        first_seen = {}
+        for position, pattern_id in self._automaton.finditer(text):
+            if pattern_id not in first_seen:
+                first_seen[pattern_id] = position
+
+        ordered = sorted(
+            first_seen.items(),
+            key=lambda item: (self._tool_order[id(self._targets[item[0]][0])], item[1])
+        )
+        return [self._targets[pattern_id] for pattern_id, _ in ordered]